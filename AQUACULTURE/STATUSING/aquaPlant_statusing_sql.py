@@ -13,6 +13,7 @@ import warnings
 warnings.simplefilter(action='ignore')
 
 import os
+import sys
 import oracledb
 import pandas as pd
 import geopandas as gpd
@@ -22,6 +23,10 @@ import tempfile
 from pathlib import Path
 from datetime import datetime
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'STATUSING'))
+from bcgw_metadata_cache import MetadataCache
+from local_dataset_cache import LocalDatasetCache
+
 
 def connect_to_DB (username,password,hostname):
     """ Returns a connection and cursor to Oracle database"""
@@ -172,16 +177,6 @@ def get_wkb_srid(gdf):
 
 def load_queries ():
     sql = {}
-
-    sql ['geomCol'] = """
-                    SELECT column_name GEOM_NAME
-                    
-                    FROM  ALL_SDO_GEOM_METADATA
-                    
-                    WHERE owner = :owner
-                        AND table_name = :tab_name
-                        
-                    """                   
                                          
     sql ['intersect_wkb'] = """
                     SELECT {cols}, 
@@ -198,15 +193,9 @@ def load_queries ():
     return sql
 
 
-def get_geom_colname (connection,cursor,table,geomQuery):
+def get_geom_colname (cursor,table,md_cache):
     """ Returns the geometry column of BCGW table name: can be either SHAPE or GEOMETRY"""
-    el_list = table.split('.')
-
-    bvars_geom = {'owner':el_list[0].strip(),
-                  'tab_name':el_list[1].strip()}
-    df_g = read_query(connection,cursor,geomQuery, bvars_geom)
-    
-    geom_col = df_g['GEOM_NAME'].iloc[0]
+    geom_col = md_cache.get_geom_colname(cursor,table)
 
     return geom_col
 
@@ -276,6 +265,8 @@ if __name__ == "__main__":
     
     print ('\nRunning Analysis.')
     sql = load_queries ()
+    md_cache = MetadataCache ()
+    ds_cache = LocalDatasetCache ()
 
     results = {} 
     c_names = 1
@@ -304,8 +295,7 @@ if __name__ == "__main__":
             wkb_aoi,srid = get_wkb_srid (gdf_ha)
             
             if table.startswith('WHSE'):
-                geomQuery = sql ['geomCol']
-                geom_col = get_geom_colname (connection,cursor,table,geomQuery)
+                geom_col = get_geom_colname (cursor,table,md_cache)
                 
                 query = sql ['intersect_wkb'].format(cols=cols,tab=table,
                                                      def_query=def_query, geom_col=geom_col)
@@ -314,7 +304,7 @@ if __name__ == "__main__":
                 df = read_query(connection,cursor,query,bvars)
            
             else:
-                gdf_trg = esri_to_gdf (table)
+                gdf_trg = ds_cache.read (table, esri_to_gdf, bbox=tuple(gdf_ha.total_bounds))
                 if not gdf_trg.crs.to_epsg() == 3005:
                         gdf_trg = gdf_trg.to_crs({'init': 'epsg:3005'})
                         
@@ -349,6 +339,8 @@ if __name__ == "__main__":
         results[name] =  df_res  
         
     
+    md_cache.save()
+    
     print ('\nGenerating the statusing Report.')    
     filename = 'aquaPlants_wild_2025_Applics_statusing'
     df_list = list(results.values())
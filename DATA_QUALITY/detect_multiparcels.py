@@ -27,6 +27,7 @@ def connect_to_DB (username,password,hostname):
     """ Returns a connection to Oracle database"""
     try:
         connection = cx_Oracle.connect(username, password, hostname, encoding="UTF-8")
+        connection.outputtypehandler = output_type_handler
         print  ("Successffuly connected to the database")
     except:
         raise Exception('Connection failed! Please verifiy your login parameters')
@@ -35,6 +36,14 @@ def connect_to_DB (username,password,hostname):
 
 
 
+def output_type_handler (cursor, name, default_type, size, precision, scale):
+    """Fetches BLOBs (WKB geometries) as bytes with the rows,
+       instead of LOB locators that need one round-trip each"""
+    if default_type == cx_Oracle.DB_TYPE_BLOB:
+        return cursor.var(cx_Oracle.DB_TYPE_LONG_RAW, arraysize=cursor.arraysize)
+
+
+
 def read_query(connection,query):
     "Returns a df containing SQL Query results"
     cursor = connection.cursor()
@@ -51,14 +60,9 @@ def read_query(connection,query):
 
 
 def df_2_gdf (df, crs):
-    """ Return a geopandas gdf based on a df with Geometry column"""
-    df['SHAPE'] = df['SHAPE'].astype(str)
-    df['geometry'] = gpd.GeoSeries.from_wkt(df['SHAPE'])
-    gdf = gpd.GeoDataFrame(df, geometry='geometry')
-    #df['geometry'] = df['SHAPE'].apply(wkt.loads)
-    #gdf = gpd.GeoDataFrame(df, geometry = df['geometry'])
-    gdf.crs = "EPSG:" + str(crs)
-    del gdf['SHAPE']
+    """ Return a geopandas gdf based on a df with a WKB Geometry column"""
+    geoms = gpd.GeoSeries.from_wkb(df['SHAPE'], index=df.index, crs="EPSG:" + str(crs))
+    gdf = gpd.GeoDataFrame(df.drop(columns='SHAPE'), geometry=geoms)
     
     return gdf
 
@@ -73,7 +77,7 @@ def load_queries ():
            a.TENURE_STATUS, a.TENURE_STAGE, a.TENURE_TYPE, a.TENURE_SUBTYPE, a.TENURE_PURPOSE, a.TENURE_SUBPURPOSE, 
            a.TENURE_LOCATION, a.TENURE_LEGAL_DESCRIPTION,
            ROUND(SDO_GEOM.SDO_AREA(a.SHAPE, 0.005, 'unit=HECTARE'), 5) PARCEL_HECTARE, 
-           SDO_UTIL.TO_WKTGEOMETRY(a.SHAPE) SHAPE
+           SDO_UTIL.TO_WKBGEOMETRY(a.SHAPE) SHAPE
            
     FROM WHSE_TANTALIS.TA_CROWN_TENURES_SVW a
       INNER JOIN (SELECT CROWN_LANDS_FILE, DISPOSITION_TRANSACTION_SID
@@ -94,7 +98,7 @@ def load_queries ():
            a.TENURE_STATUS, a.TENURE_STAGE, a.TENURE_TYPE, a.TENURE_SUBTYPE, a.TENURE_PURPOSE, a.TENURE_SUBPURPOSE, 
            a.TENURE_LOCATION, a.TENURE_LEGAL_DESCRIPTION,
            ROUND(SDO_GEOM.SDO_AREA(a.SHAPE, 0.005, 'unit=HECTARE'), 5) PARCEL_HECTARE, 
-           SDO_UTIL.TO_WKTGEOMETRY(a.SHAPE) SHAPE
+           SDO_UTIL.TO_WKBGEOMETRY(a.SHAPE) SHAPE
            
     FROM WHSE_TANTALIS.TA_CROWN_TENURES_SVW a
       INNER JOIN (SELECT CROWN_LANDS_FILE, DISPOSITION_TRANSACTION_SID
@@ -22,28 +22,766 @@ warnings.simplefilter(action='ignore')
 import os
 import sys
 import time
+import struct
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
-import cx_Oracle
 import pandas as pd
 #import numpy as np
 
-import openpyxl
-from openpyxl import load_workbook
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.table import Table, TableStyleInfo
-from openpyxl.drawing.image import Image
-
 from datetime import date, timedelta
 
-import plotly.express as px
-import plotly.graph_objects as go
-
-from PIL import Image as PILImage
+# cx_Oracle, openpyxl and plotly are imported by the stages using them,
+# so that the window opens without loading them.
 
+from PyQt5.QtCore import QThread, pyqtSignal
 from PyQt5.QtWidgets import QApplication, QWidget, QPushButton, QFileDialog, QLabel, QVBoxLayout, QMessageBox,QSpacerItem,QSizePolicy
 
 
 
+class ReportWorker(QThread):
+    """ Generates the reports off the GUI thread and reports the
+        progress (elapsed time of each stage) with signals"""
+    message = pyqtSignal(str)
+    stage_started = pyqtSignal(str)
+    stage_finished = pyqtSignal(str, float)
+    warning = pyqtSignal(str, str)
+    succeeded = pyqtSignal(float)
+    failed = pyqtSignal(str)
+    
+    def __init__(self, tracker):
+        super().__init__()
+        self.tracker = tracker
+        
+    @contextmanager
+    def stage(self, text):
+        """Reports the start and elapsed time of a stage"""
+        print (text)
+        self.stage_started.emit(text)
+        start_t = time.perf_counter()
+        yield
+        self.stage_finished.emit(text, time.perf_counter() - start_t)
+    
+    def run(self):
+        start_t = time.perf_counter()
+        try:
+            self.tracker.generate_reports(self)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.succeeded.emit(time.perf_counter() - start_t)
+
+
+
+# Reports of the lands application process. Each report is defined by:
+#   source:  rows the report starts from: 'tnt' (TITAN tasks), 'ats' (ATS
+#            authorizations) or the id of the report it is derived from
+#            (its rows, without its metrics)
+#   filter:  rows of the source in the report, function of the engine and source df
+#   join:    'asof': ATS authorization of each TITAN task (ReportEngine.join_asof)
+#            'file': ATS authorizations of the TITAN file
+#            'tnt': TITAN tasks of the ATS file, kept if the file has no TITAN status
+#   ats:     ATS authorizations joined (ReportEngine.ats_sets)
+#   sort:    column the report is sorted by (most recent first)
+#   prepare: optional step run on the report before the metrics
+#   metrics: metric ID: (end date, start date) in days. RPT_DATE is the report date
+#   split:   returns the (new, replacement) rows of the report
+#   hitlist: metric of the hitlist (10 longest files)
+RPT_DATE = 'rpt_date'
+
+# TITAN tasks are joined to the ATS authorizations accepted within 6 months
+JOIN_WINDOW = pd.Timedelta(days=183)
+
+APP_TASKS = ['NEW APPLICATION', 'REPLACEMENT APPLICATION']
+
+
+
+def split_task (df):
+    """Splits a report into new and replacement applications (TITAN task)"""
+    return (df['TASK DESCRIPTION'] == 'NEW APPLICATION',
+            df['TASK DESCRIPTION'] == 'REPLACEMENT APPLICATION')
+
+
+
+def split_auth_type (df):
+    """Splits a report into new and replacement applications (ATS authorization type)"""
+    replacement = df['Authorization Type'] == 'Replacements'
+    
+    return ~replacement, replacement
+
+
+
+def use_received_date (df):
+    """For replacements, use RECEIVED DATE instead of submisson review date to calculate mtr04"""
+    df.loc[df['TASK DESCRIPTION'] == 'REPLACEMENT APPLICATION', 'Submission Review Complete Date'] = df['RECEIVED DATE']
+
+
+
+REPORTS = [
+    {'id': 'rpt01', # Files with FCBC
+     'source': 'ats',
+     'filter': lambda e, df: ((df['Authorization Status'] == 'Active') &
+                              (df['Received Date'].notnull()) &
+                              (df['Received Date'] <= e.rpt_date) &
+                              (df['Submission Review Complete Date'].isnull())),
+     'join': 'tnt',
+     'sort': 'Received Date',
+     'metrics': {'mtr01': (RPT_DATE, 'Received Date')},
+     'split': split_auth_type,
+     'hitlist': 'mtr01'},
+    
+    {'id': 'rpt02', # Files in Queue
+     'source': 'tnt',
+     'filter': lambda e, df: (e.tnt_apps &
+                              (df['FILE NUMBER'].isin(e.ats_files['active'])) &
+                              (e.tnt_wcr | df['OTHER EMPLOYEES ASSIGNED TO'].isnull()) &
+                              e.tnt_accepted &
+                              (df['CREATED DATE'] <= e.rpt_date)),
+     'join': 'asof', 'ats': 'all',
+     'sort': 'CREATED DATE',
+     'metrics': {'mtr02': ('Submission Review Complete Date', 'Received Date'),
+                 'mtr03': (RPT_DATE, 'Submission Review Complete Date')},
+     'split': split_task,
+     'hitlist': 'mtr03'},
+    
+    {'id': 'rpt03', # Files in Active Review
+     'source': 'tnt',
+     'filter': lambda e, df: ((~e.tnt_wcr & df['OTHER EMPLOYEES ASSIGNED TO'].notnull()) &
+                              (df['REPORTED DATE'].isnull()) &
+                              (~df['FILE NUMBER'].isin(e.ats_files['on_hold'])) &
+                              e.tnt_apps &
+                              e.tnt_accepted &
+                              (df['CREATED DATE'] <= e.rpt_date)),
+     'join': 'asof', 'ats': 'all',
+     'sort': 'CREATED DATE',
+     'prepare': use_received_date,
+     'metrics': {'mtr04': ('Bring Forward Date', 'Submission Review Complete Date'),
+                 'mtr06': ('First Nation Completion Date', 'First Nation Start Date'),
+                 'mtr07': (RPT_DATE, 'Bring Forward Date')},
+     'split': split_task,
+     'hitlist': 'mtr07'},
+    
+    {'id': 'rpt03-1', # Files in Consultation
+     'source': 'rpt03',
+     'filter': lambda e, df: ((df['First Nation Start Date'].notnull()) &
+                              (df['First Nation Completion Date'].isnull())),
+     'sort': 'First Nation Start Date',
+     'metrics': {'mtr05': (RPT_DATE, 'First Nation Start Date')},
+     'split': split_task,
+     'hitlist': 'mtr05'},
+    
+    {'id': 'rpt04', # Files Awaiting Decision
+     'source': 'tnt',
+     'filter': lambda e, df: ((df['REPORTED DATE'].notnull()) &
+                              (df['ADJUDICATED DATE'].isnull()) &
+                              e.tnt_apps &
+                              e.tnt_accepted &
+                              (df['REPORTED DATE'] <= e.rpt_date)),
+     'join': 'asof', 'ats': 'active_closed',
+     'sort': 'REPORTED DATE',
+     'metrics': {'mtr08': ('REPORTED DATE', 'Bring Forward Date'),
+                 'mtr09': (RPT_DATE, 'REPORTED DATE')},
+     'split': split_task,
+     'hitlist': 'mtr09'},
+    
+    {'id': 'rpt05', # Files Awaiting Offer
+     'source': 'tnt',
+     'filter': lambda e, df: ((df['ADJUDICATED DATE'].notnull()) &
+                              (df['OFFERED DATE'].isnull()) &
+                              e.tnt_apps &
+                              e.tnt_accepted &
+                              (df['ADJUDICATED DATE'] <= e.rpt_date)),
+     'join': 'asof', 'ats': 'active_closed',
+     'sort': 'ADJUDICATED DATE',
+     'metrics': {'mtr10': ('ADJUDICATED DATE', 'REPORTED DATE'),
+                 'mtr11': (RPT_DATE, 'ADJUDICATED DATE')},
+     'split': split_task,
+     'hitlist': 'mtr11'},
+    
+    {'id': 'rpt06', # Files awaiting Offer Acceptance
+     'source': 'tnt',
+     'filter': lambda e, df: ((df['OFFERED DATE'].notnull()) &
+                              (df['OFFER ACCEPTED DATE'].isnull()) &
+                              e.tnt_apps &
+                              (df['STATUS'] == 'OFFERED') &
+                              (df['OFFERED DATE'] <= e.rpt_date)),
+     'join': 'asof', 'ats': 'active_closed',
+     'sort': 'OFFERED DATE',
+     'metrics': {'mtr12': ('OFFERED DATE', 'ADJUDICATED DATE'),
+                 'mtr13': (RPT_DATE, 'OFFERED DATE')},
+     'split': split_task,
+     'hitlist': 'mtr13'},
+    
+    {'id': 'rpt07', # Files with Offer Accepted
+     'source': 'tnt',
+     'filter': lambda e, df: ((df['OFFER ACCEPTED DATE'].notnull()) &
+                              e.tnt_apps &
+                              (df['STATUS'] == 'OFFER ACCEPTED') &
+                              (df['OFFER ACCEPTED DATE'] <= e.rpt_date)),
+     'join': 'asof', 'ats': 'active_closed',
+     'sort': 'OFFER ACCEPTED DATE',
+     'metrics': {'mtr14': ('OFFER ACCEPTED DATE', 'OFFERED DATE'),
+                 'mtr15': (RPT_DATE, 'OFFER ACCEPTED DATE')},
+     'split': split_task,
+     'hitlist': 'mtr15'},
+    
+    {'id': 'rpt08', # Files Completed
+     'source': 'tnt',
+     'filter': lambda e, df: ((df['COMPLETED DATE'].notnull()) &
+                              (df['COMPLETED DATE'] >= e.rpt_date.replace(day=1)) &
+                              e.tnt_apps &
+                              (df['STATUS'] == 'DISPOSITION IN GOOD STANDING') &
+                              (df['COMPLETED DATE'] <= e.rpt_date)),
+     'join': 'asof', 'ats': 'active_closed',
+     'sort': 'COMPLETED DATE',
+     'metrics': {'mtr16': ('COMPLETED DATE', 'ADJUDICATED DATE'),
+                 'mtr17': ('COMPLETED DATE', 'RECEIVED DATE')},
+     'split': split_task,
+     'hitlist': 'mtr17'},
+    
+    {'id': 'rpt09', # Files On Hold
+     'source': 'tnt',
+     'filter': lambda e, df: (e.tnt_accepted &
+                              (df['FILE NUMBER'].isin(e.ats_files['held']))),
+     'join': 'file', 'ats': 'held',
+     'sort': 'CREATED DATE',
+     'metrics': {'mtr18': (RPT_DATE, 'On Hold Start Date')},
+     'split': split_task,
+     'hitlist': 'mtr18'},
+    ]
+
+
+
+class ReportEngine:
+    """ Computes the reports (REPORTS) from the TITAN and ATS inputs. The
+        filters and ATS joins shared by the reports are computed once, and
+        the reports run concurrently (derived reports after their source)"""
+    
+    def __init__(self, rpt_date, df_tnt, df_ats, workers=4):
+        self.rpt_date = rpt_date
+        self.workers = workers
+        
+        self.tnt = df_tnt
+        self.tnt_apps = df_tnt['TASK DESCRIPTION'].isin(APP_TASKS)
+        self.tnt_accepted = df_tnt['STATUS'] == 'ACCEPTED'
+        self.tnt_wcr = df_tnt['OTHER EMPLOYEES ASSIGNED TO'].str.contains('WCR_', na=False)
+        
+        # ATS authorizations (most recent first) by status, and their files
+        self.ats = df_ats.sort_values(by='Received Date', ascending=False)
+        ats_status = self.ats['Authorization Status']
+        
+        self.ats_sets = {'all': self.ats,
+                         'active': self.ats.loc[ats_status == 'Active'],
+                         'on_hold': self.ats.loc[ats_status == 'On Hold'],
+                         'active_closed': self.ats.loc[ats_status.isin(['Active','Closed'])]}
+        
+        ats_h = self.ats_sets['on_hold']
+        self.ats_sets['held'] = ats_h.loc[(ats_h['Accepted Date'].notnull()) &
+                                          (ats_h['On Hold Start Date'] <= rpt_date)]
+        
+        self.ats_files = {name: df['File Number'].unique() for name, df in self.ats_sets.items()}
+        
+        # ATS sides of the asof joins, shared by the reports
+        self.ats_joins = {}
+        for spec in REPORTS:
+            if spec.get('join') == 'asof' and spec['ats'] not in self.ats_joins:
+                self.ats_joins[spec['ats']] = self.prepare_asof_join (self.ats_sets[spec['ats']])
+    
+    
+    def prepare_asof_join (self, df_ats):
+        """Returns the ATS authorizations with an accepted date, sorted by
+           accepted date (join_date)"""
+        df_ats = df_ats.loc[df_ats['Accepted Date'].notnull()]
+        df_ats = df_ats.assign(join_date=pd.to_datetime(df_ats['Accepted Date'], errors='coerce'))
+        
+        return df_ats.sort_values(by='join_date')
+    
+    
+    def join_asof (self, df, ats):
+        """Joins each TITAN task to the ATS authorization of its file accepted
+           nearest to the task creation, within the join window. Tasks with
+           no authorization in the window have empty ATS columns"""
+        df_ats = self.ats_joins[ats]
+        
+        df = df.assign(join_date=pd.to_datetime(df['CREATED DATE'], errors='coerce'))
+        dated = df['join_date'].notnull()
+        
+        df_join = pd.merge_asof(df.loc[dated].sort_values(by='join_date'), df_ats,
+                                on='join_date',
+                                left_by='FILE NUMBER',
+                                right_by='File Number',
+                                direction='nearest',
+                                tolerance=JOIN_WINDOW)
+        
+        # tasks with no created date cannot be matched
+        df = pd.concat([df_join, df.loc[~dated]], ignore_index=True)
+        
+        return df.drop('join_date', axis=1)
+    
+    
+    def join_tnt (self, df):
+        """Joins the ATS authorizations to the TITAN tasks of their file.
+           Keeps the authorizations with no TITAN status"""
+        df = pd.merge(df, self.tnt, how='left',
+                      left_on='File Number',
+                      right_on='FILE NUMBER')
+        
+        df = df.loc[df['STATUS'].isnull()]
+        df['DISTRICT OFFICE'] = df['Decision-making Office Name']
+        
+        return df
+    
+    
+    def calculate_metrics(self, df, grp_col, mtr_ids):
+        """ Calculates Median and Mean metrics and return in df"""
+        df_mtrs = []
+        for mtr_id in mtr_ids:
+            df_mtr = df.groupby(grp_col)[[mtr_id]].agg(['median', 'mean'])
+            df_mtr.fillna(0, inplace=True)
+            
+            df_mtr.columns = [mtr_id+'_med',mtr_id+'_avg']
+            
+            df_mtr = df_mtr.reset_index()
+            
+            offices = ['AQUACULTURE','CAMPBELL RIVER','HAIDA GWAII',
+                       'NANAIMO', 'PORT ALBERNI','PORT MCNEILL']
+            
+            if set(offices) != set(df_mtr['DISTRICT OFFICE'].unique()):
+                new_rows = pd.DataFrame({'DISTRICT OFFICE': offices})
+                df_mtr = pd.merge(new_rows, df_mtr, how='outer', on='DISTRICT OFFICE')
+                df_mtr = df_mtr.fillna(0)
+            else:
+                df_mtr = df_mtr.sort_values(by='DISTRICT OFFICE')        
+            
+            
+            df_mtr = pd.melt(df_mtr, id_vars=[grp_col])
+            
+            df_mtr = df_mtr.pivot_table(values='value', 
+                                        index='variable', 
+                                        columns=grp_col)
+            
+            vals = []
+            for col in df_mtr.columns:
+                vals.extend(df_mtr[col].to_list())
+                
+            mtr_cols = ['AQ avg','AQ med','CR avg','CR med',
+                        'HG avg','HG med','NA avg','NA med',
+                        'PA avg','PA med','PM avg','PM med']
+            
+            df_mtr = pd.DataFrame(data=[vals], columns=mtr_cols)
+    
+            df_mtr['WC avg'] = df.loc[df[mtr_id] != 0, mtr_id].mean()
+            df_mtr['WC med'] = df.loc[df[mtr_id] != 0, mtr_id].median()
+    
+            df_mtr.fillna(0, inplace=True)        
+            df_mtr = df_mtr.round().astype(int)
+            
+            df_mtr['METRIC ID'] = mtr_id
+            
+            df_mtrs.append(df_mtr)
+        
+        df_mtr = pd.concat(df_mtrs)
+     
+        
+        return df_mtr
+    
+    
+    def compute_report (self, spec, df_src=None):
+        """Creates a report. Returns the report, its new and replacement rows,
+           and their metrics"""
+        if spec['source'] == 'tnt':
+            df_src = self.tnt
+        elif spec['source'] == 'ats':
+            df_src = self.ats
+        else:
+            df_src = df_src.drop(df_src.filter(regex='^mtr').columns, axis=1)
+        
+        df = df_src.loc[spec['filter'](self, df_src)]
+        
+        join = spec.get('join')
+        if join == 'asof':
+            df = self.join_asof (df, spec['ats'])
+        elif join == 'file':
+            df = pd.merge(df, self.ats_sets[spec['ats']], how='left',
+                          left_on='FILE NUMBER',
+                          right_on='File Number')
+        elif join == 'tnt':
+            df = self.join_tnt (df)
+        
+        df = df.sort_values(by=[spec['sort']], ascending=False)
+        df.reset_index(drop = True, inplace = True)
+        
+        df['Total On Hold Time'].fillna(0, inplace=True)
+        
+        if 'prepare' in spec:
+            spec['prepare'](df)
+        
+        #Calulcate metrics
+        rpt_date = pd.to_datetime(self.rpt_date)
+        
+        date_cols = {col for cols in spec['metrics'].values() for col in cols if col != RPT_DATE}
+        for col in date_cols:
+            df[col] = pd.to_datetime(df[col].fillna(pd.NaT), errors='coerce')
+        
+        for mtr_id, (end_col, start_col) in spec['metrics'].items():
+            end = rpt_date if end_col == RPT_DATE else df[end_col]
+            df[mtr_id] = (end - df[start_col]).dt.days
+        
+        is_nw, is_rp = spec['split'](df)
+        df_nw = df.loc[is_nw]
+        df_rp = df.loc[is_rp]
+        
+        metrics = list(spec['metrics'])
+        df_mtr_nw = self.calculate_metrics(df_nw, 'DISTRICT OFFICE', metrics)
+        df_mtr_rp = self.calculate_metrics(df_rp, 'DISTRICT OFFICE', metrics)
+        
+        return df,df_nw,df_rp,df_mtr_nw,df_mtr_rp
+    
+    
+    def run_report (self, spec, src_future, on_done):
+        """Creates a report once its source report is done"""
+        df_src = src_future.result()[0] if src_future is not None else None
+        
+        start_t = time.perf_counter()
+        rpt = self.compute_report (spec, df_src)
+        if on_done is not None:
+            on_done(spec['id'], time.perf_counter() - start_t)
+        
+        return rpt
+    
+    
+    def run (self, on_done=None):
+        """Creates the reports concurrently. Returns the reports in REPORTS
+           order. on_done(report ID, seconds) is called as each report completes"""
+        futures = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # source reports are listed (submitted) before the reports derived from them
+            for spec in REPORTS:
+                futures[spec['id']] = executor.submit(self.run_report, spec,
+                                                      futures.get(spec['source']), on_done)
+        
+        return [futures[spec['id']].result() for spec in REPORTS]
+
+
+
+# Charts of the summary sheets: 'native' (Excel charts of the analysis tables)
+# or 'image' (plotly PNG charts, rendered by ChartRenderer)
+CHART_BACKEND = 'native'
+
+# Parsed templates: (path, parser): (modification time, template)
+_templates = {}
+
+# openpyxl border styles: xlsxwriter border indexes
+BORDER_STYLES = {'thin': 1, 'medium': 2, 'dashed': 3, 'dotted': 4, 'thick': 5,
+                 'double': 6, 'hair': 7, 'mediumDashed': 8, 'dashDot': 9,
+                 'mediumDashDot': 10, 'dashDotDot': 11, 'mediumDashDotDot': 12,
+                 'slantDashDot': 13}
+
+H_ALIGNS = {'left': 'left', 'center': 'center', 'right': 'right', 'fill': 'fill',
+            'justify': 'justify', 'centerContinuous': 'center_across',
+            'distributed': 'distributed'}
+V_ALIGNS = {'top': 'top', 'center': 'vcenter', 'bottom': 'bottom',
+            'justify': 'vjustify', 'distributed': 'vdistributed'}
+
+
+
+def read_template (path, parser):
+    """Returns a template read by parser(path). Templates are read once per
+       session, and again if the file is modified"""
+    key = (path, parser.__name__)
+    mtime = os.path.getmtime(path)
+    
+    if key not in _templates or _templates[key][0] != mtime:
+        _templates[key] = (mtime, parser(path))
+    
+    return _templates[key][1]
+
+
+
+def get_color (color):
+    """Returns the hex code of an openpyxl (rgb) color"""
+    if color is not None and color.type == 'rgb' and isinstance(color.rgb, str):
+        return '#' + color.rgb[-6:]
+    
+    return None
+
+
+
+def get_cell_format (cell):
+    """Returns the xlsxwriter format properties of an openpyxl cell"""
+    props = {}
+    
+    font = cell.font
+    if font.name:
+        props['font_name'] = font.name
+    if font.sz:
+        props['font_size'] = font.sz
+    if font.b:
+        props['bold'] = True
+    if font.i:
+        props['italic'] = True
+    if font.u:
+        props['underline'] = 2 if font.u.startswith('double') else 1
+    if font.strike:
+        props['font_strikeout'] = True
+    if get_color(font.color):
+        props['font_color'] = get_color(font.color)
+    
+    if cell.fill.fill_type == 'solid' and get_color(cell.fill.fgColor):
+        props['pattern'] = 1
+        props['bg_color'] = get_color(cell.fill.fgColor)
+    
+    for side in ['left', 'right', 'top', 'bottom']:
+        border = getattr(cell.border, side)
+        if border is not None and border.style in BORDER_STYLES:
+            props[side] = BORDER_STYLES[border.style]
+            if get_color(border.color):
+                props[side + '_color'] = get_color(border.color)
+    
+    alignment = cell.alignment
+    if alignment.horizontal in H_ALIGNS:
+        props['align'] = H_ALIGNS[alignment.horizontal]
+    if alignment.vertical in V_ALIGNS:
+        props['valign'] = V_ALIGNS[alignment.vertical]
+    if alignment.wrap_text:
+        props['text_wrap'] = True
+    if alignment.indent:
+        props['indent'] = int(alignment.indent)
+    if alignment.text_rotation:
+        props['rotation'] = alignment.text_rotation
+    
+    if cell.number_format != 'General':
+        props['num_format'] = cell.number_format
+    
+    return props
+
+
+
+def parse_readme (readme_xlsx):
+    """Returns the cells (value and format) and column widths of the README template"""
+    import openpyxl
+    
+    sheet = openpyxl.load_workbook(readme_xlsx)['README']
+    
+    cells = []
+    for row in sheet.iter_rows():
+        for cell in row:
+            props = get_cell_format(cell) if cell.has_style else {}
+            if cell.value is not None or props:
+                cells.append((cell.row - 1, cell.col_idx - 1, cell.value, props))
+    
+    widths = [sheet.column_dimensions[col[0].column_letter].width for col in sheet.columns]
+    
+    return {'title': sheet.title, 'cells': cells, 'widths': widths}
+
+
+
+def get_chart_title (df, title_tag):
+    """Returns the lines of the title of a processing times chart"""
+    exld= ['Files in Consultation (with LO)','Files On Hold']
+    df_sum= df.loc[~df['Stage'].isin(exld)]
+    nbr_files= int(df_sum['# Files at Stage'].sum())
+    
+    return ['WCR Lands Applications Workflow Status - {}'.format(title_tag),
+            '[{} Total Files in Process, excl On Hold]'.format(nbr_files)]
+
+
+
+class ChartRenderer:
+    """ Renders plotly figures to PNG in batches, through one kaleido
+        renderer kept alive for the following batches of the session"""
+    
+    def __init__(self, width=1200, height=800, scale=2):
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self._figures = [] # (fig, out_file)
+        self._server = False
+        
+    
+    def add (self, fig, out_file):
+        """Queues a figure to render"""
+        self._figures.append((fig, out_file))
+    
+    
+    def render (self):
+        """Renders the queued figures"""
+        import plotly.io as pio
+        
+        figs = [fig for fig, _ in self._figures]
+        out_files = [out_file for _, out_file in self._figures]
+        
+        if hasattr(pio, 'write_images'):
+            # kaleido 1.x: one browser process renders all the figures
+            import kaleido
+            if not self._server and hasattr(kaleido, 'start_sync_server'):
+                kaleido.start_sync_server(silence_warnings=True)
+                self._server = True
+            pio.write_images(figs, out_files, width=self.width, height=self.height, scale=self.scale)
+        
+        else:
+            # kaleido 0.x keeps its renderer process between calls
+            for fig, out_file in zip(figs, out_files):
+                pio.write_image(fig, out_file, width=self.width, height=self.height, scale=self.scale)
+        
+        self._figures = []
+    
+    
+    def close (self):
+        """Stops the renderer process"""
+        if self._server:
+            import kaleido
+            kaleido.stop_sync_server(silence_warnings=True)
+            self._server = False
+
+
+
+def get_png_size (image_path):
+    """Returns the size (pixels) of a PNG image"""
+    with open(image_path, 'rb') as f:
+        header = f.read(24)
+    
+    return struct.unpack('>II', header[16:24])
+
+
+
+class WorkbookComposer:
+    """ Builds a report workbook (sheets, analysis tables, charts and README
+        page) with xlsxwriter, and saves it once"""
+    
+    def __init__(self, out_file):
+        self.out_file = out_file
+        self.writer = pd.ExcelWriter(out_file, engine='xlsxwriter')
+        self.workbook = self.writer.book
+        self._formats = {}
+        self._anz_tim = {} # sheet: (header row, number of rows) of the processing times table
+        
+    
+    def get_format (self, props):
+        """Returns the workbook format of format properties (created once)"""
+        if not props:
+            return None
+        
+        key = tuple(sorted(props.items()))
+        if key not in self._formats:
+            self._formats[key] = self.workbook.add_format(props)
+        
+        return self._formats[key]
+    
+    
+    def add_readme (self, readme):
+        """Adds the README page (parsed template) as the first and active sheet"""
+        worksheet = self.workbook.add_worksheet(readme['title'])
+        
+        for row, col, value, props in readme['cells']:
+            worksheet.write(row, col, value, self.get_format(props))
+        
+        for col, width in enumerate(readme['widths']):
+            worksheet.set_column(col, col, width)
+        
+        worksheet.activate()
+    
+    
+    def add_sheets (self, df_list, sheet_list):
+        """Adds a sheet (table) per dataframe"""
+        for dataframe, sheet in zip(df_list, sheet_list):
+            dataframe = dataframe.reset_index(drop=True)
+            dataframe.index = dataframe.index + 1
+    
+            dataframe.to_excel(self.writer, sheet_name=sheet, index=False, startrow=0 , startcol=0)
+    
+            worksheet = self.writer.sheets[sheet]
+            
+            if sheet in ['Summary - NEW Applics','Summary - REP Applics']:
+                worksheet.set_column(0, 0, 11)
+                worksheet.set_column(1, 1, 27)
+                worksheet.set_column(2, 2, 11)
+                worksheet.set_column(3, 3, 37)
+                worksheet.set_column(4, dataframe.shape[1], 10)
+            
+            else:
+                worksheet.set_column(0, dataframe.shape[1], 20)
+    
+            col_names = [{'header': col_name} for col_name in dataframe.columns[:]]
+    
+            worksheet.add_table(0, 0, dataframe.shape[0], dataframe.shape[1]-1, 
+                                {'columns': col_names})
+    
+    
+    def add_analysis_tables (self, sheet, df_anz_tim, df_anz_off, table_names, start_row=21):
+        """Adds the Executive Summaries (analysis tables) to a summary sheet"""
+        worksheet = self.writer.sheets[sheet]
+        self._anz_tim[sheet] = (start_row, df_anz_tim.shape[0])
+        
+        rows = start_row
+        for df, name in zip([df_anz_tim, df_anz_off], table_names):
+            df.to_excel(self.writer, sheet_name=sheet, 
+                        startrow=rows,
+                        startcol=1,
+                        index=False)
+            
+            worksheet.add_table(rows, 1, rows + df.shape[0], df.shape[1],
+                                {'name': name,
+                                 'style': 'Table Style Medium 9',
+                                 'first_column': True,
+                                 'banded_columns': True,
+                                 'columns': [{'header': str(col)} for col in df.columns]})
+            
+            rows += df.shape[0] + 3
+    
+    
+    def add_chart (self, sheet, title, cell='J22', width_cm=27, height_cm=17, dpi=96):
+        """Adds a chart of the processing times table of a sheet: # of files
+           at stage (columns) and average/median times (markers, right axis)"""
+        header_row, nbr_rows = self._anz_tim[sheet]
+        
+        def get_range (col):
+            return [sheet, header_row + 1, col, header_row + nbr_rows, col]
+        
+        chart = self.workbook.add_chart({'type': 'column'})
+        chart.add_series({'name': '# Files at Stage',
+                          'categories': get_range(1),
+                          'values': get_range(2),
+                          'data_labels': {'value': True, 'font': {'bold': True}}})
+        
+        times = self.workbook.add_chart({'type': 'line'})
+        for name, col, marker, color in [('Average Time', 3, 'x', 'red'),
+                                         ('Median Time', 4, 'circle', 'orange')]:
+            times.add_series({'name': name,
+                              'categories': get_range(1),
+                              'values': get_range(col),
+                              'y2_axis': True,
+                              'line': {'none': True},
+                              'marker': {'type': marker, 'size': 9,
+                                         'border': {'color': color},
+                                         'fill': {'color': color}}})
+        
+        chart.combine(times)
+        chart.set_title({'name': '\n'.join(title)})
+        chart.set_y_axis({'name': '# Files at Stage'})
+        times.set_y2_axis({'name': 'Time (Days)'})
+        chart.set_legend({'position': 'top'})
+        chart.set_size({'width': int(width_cm * dpi / 2.54),
+                        'height': int(height_cm * dpi / 2.54)})
+        
+        self.writer.sheets[sheet].insert_chart(cell, chart)
+    
+    
+    def add_chart_image (self, sheet, image_path, cell='J22', width_cm=27, height_cm=17, dpi=96):
+        """Adds a chart image to a sheet, scaled to width x height cm"""
+        width_px, height_px = get_png_size (image_path)
+        
+        self.writer.sheets[sheet].insert_image(cell, image_path,
+                                               {'x_scale': width_cm * dpi / 2.54 / width_px,
+                                                'y_scale': height_cm * dpi / 2.54 / height_px})
+    
+    
+    def save (self):
+        """Saves the workbook"""
+        self.writer.close()
+
+
+
 class LandsTracker(QWidget):
     
     def __init__(self):
@@ -122,6 +860,12 @@ class LandsTracker(QWidget):
         self.setLayout(self.layout)
         self.setGeometry(100, 100, 300, 360)
 
+        # Background worker generating the reports
+        self.worker = None
+        
+        # PNG chart renderer (image chart backend), kept for the session
+        self.renderer = None
+        
         # Initialize the DataFrames
         self.df_tnt = None
         self.df_ats = None
@@ -139,6 +883,7 @@ class LandsTracker(QWidget):
        hostname = 'bcgw.bcgov/idwprod1.bcgov'
 
        try:
+           #import cx_Oracle
            #self.connection = cx_Oracle.connect(username, password, hostname, encoding="UTF-8")
            print  ("...Successffuly connected to the database")
            cnx_rslt = QLabel('BCGW Login Successful!',self)
@@ -175,1103 +920,364 @@ class LandsTracker(QWidget):
                 
  
     def execute_program(self):
-        """Executes the main Program"""
+        """Starts the report generation in a background worker"""
+        if self.worker is not None and self.worker.isRunning():
+            return
         
-        # The first day of previous month. Will be used to calculate Metrics
-        today = date.today()
-        first_day_month = today.replace(day=1)
-        rpt_date= first_day_month - timedelta(days=1)
+        self.exec_button.setEnabled(False)
         
-        rpt_month_str = rpt_date.strftime("%b%Y").lower()
-
-
-        proc_label = QLabel(self)
-        proc_label.setText('Program is running... ')
-        proc_label.setStyleSheet("color: green;")
-        self.layout.addWidget(proc_label)
+        self.proc_label = QLabel(self)
+        self.proc_label.setText('Program is running... ')
+        self.proc_label.setStyleSheet("color: green;")
+        self.layout.addWidget(self.proc_label)
         
-        QApplication.processEvents()
+        # only the input paths are captured on the GUI thread (widgets are not
+        # thread-safe): the files are imported by the worker
+        self.file_paths = {'tnt': self.path_label_tnt.text(),
+                           'ats': self.path_label_ats.text(),
+                           'ats_f': self.path_label_ats_f.text(),
+                           'ats_h': self.path_label_ats_h.text()}
+        self.stage_labels = {}
+        
+        self.worker = ReportWorker(self)
+        self.worker.message.connect(self.on_message)
+        self.worker.stage_started.connect(self.on_stage_started)
+        self.worker.stage_finished.connect(self.on_stage_finished)
+        self.worker.warning.connect(lambda title, msg: QMessageBox.warning(self, title, msg))
+        self.worker.succeeded.connect(self.on_succeeded)
+        self.worker.failed.connect(self.on_failed)
+        self.worker.start()
         
-        try:
-            time.sleep(1) 
-            print ('\nImporting Input files')
-            rd_label = QLabel(self)
-            rd_label.setText('Importing Input files')
-            rd_label.setStyleSheet("color: black;")
-            self.layout.addWidget(rd_label)
-            
-            QApplication.processEvents()
-            
-            time.sleep(1) 
-            print ('...TITAN workledger spreadsheet')
-            tnt_label = QLabel(self)
-            tnt_label.setText('...TITAN workledger spreadsheet')
-            tnt_label.setStyleSheet("color: black;")
-            self.layout.addWidget(tnt_label)
-            
-            QApplication.processEvents()
-            
-            df_tnt =  self.import_titan ()
-            
-            
-            print ('...ATS bring-forward spreadsheet')
-            ats_label_f = QLabel(self)
-            ats_label_f.setText('...ATS bring-forward spreadsheet')
-            ats_label_f.setStyleSheet("color: black;")
-            self.layout.addWidget(ats_label_f)
-            
-            QApplication.processEvents()
-            
-            df_bfw= self.import_ats_bf ()            
-            
-            
-            print ('...ATS on-hold spreadsheet')
-            ats_label_h = QLabel(self)
-            ats_label_h.setText('...ATS report: on-hold')
-            ats_label_h.setStyleSheet("color: black;")
-            self.layout.addWidget(ats_label_h)
-            
-            QApplication.processEvents()
-            
-            df_onh= self.import_ats_oh ()             
-            
-            
-            print ('...ATS report: processing time')
-            ats_label = QLabel(self)
-            ats_label.setText('...ATS report: processing time')
-            ats_label.setStyleSheet("color: black;")
-            self.layout.addWidget(ats_label)
-            
-            QApplication.processEvents()
-            
-            df_ats= self.import_ats_pt (df_bfw,df_onh)
-            
-            
-            time.sleep(1) 
-            print('\nComputing Reports.')
-            crt_label = QLabel(self)
-            crt_label.setText('Computing Reports')
-            crt_label.setStyleSheet("color: black;")
-            self.layout.addWidget(crt_label)
-            
-            QApplication.processEvents()
-            
-            dfs = []
-            dfs_nw = []
-            dfs_rp = []
-            df_mtrs_nw = []
-            df_mtrs_rp = []
-            
     
-            time.sleep(1) 
-            print('...report 01')
-            rp1_label = QLabel(self)
-            rp1_label.setText('...report 01')
-            rp1_label.setStyleSheet("color: black;")
-            self.layout.addWidget(rp1_label)
-            
-            QApplication.processEvents()
-            
-            df_01,df_01_nw,df_01_rp,df_01_mtr_nw,df_01_mtr_rp= self.create_rpt_01 (rpt_date,df_tnt,df_ats)
-            dfs.append(df_01)
-            dfs_nw.append(df_01_nw)
-            dfs_rp.append(df_01_rp)
-            df_mtrs_nw.append(df_01_mtr_nw)
-            df_mtrs_rp.append(df_01_mtr_rp)
-            
-            
-            time.sleep(1) 
-            print('...report 02')
-            rp2_label = QLabel(self)
-            rp2_label.setText('...report 02')
-            rp2_label.setStyleSheet("color: black;")
-            self.layout.addWidget(rp2_label)
-            
-            QApplication.processEvents()
-            
-            df_02,df_02_nw,df_02_rp,df_02_mtr_nw,df_02_mtr_rp= self.create_rpt_02 (rpt_date,df_tnt,df_ats)
-            dfs.append(df_02)
-            dfs_nw.append(df_02_nw)
-            dfs_rp.append(df_02_rp)
-            df_mtrs_nw.append(df_02_mtr_nw)
-            df_mtrs_rp.append(df_02_mtr_rp)
-            
-            
-            time.sleep(1) 
-            print('...report 03')
-            rp3_label = QLabel(self)
-            rp3_label.setText('...report 03')
-            rp3_label.setStyleSheet("color: black;")
-            self.layout.addWidget(rp3_label)
-            
-            QApplication.processEvents()
-            
-            df_03,df_03_nw,df_03_rp,df_03_mtr_nw,df_03_mtr_rp,onhold= self.create_rpt_03 (rpt_date,df_tnt,df_ats)
-            dfs.append(df_03)
-            dfs_nw.append(df_03_nw)
-            dfs_rp.append(df_03_rp)
-            df_mtrs_nw.append(df_03_mtr_nw)
-            df_mtrs_rp.append(df_03_mtr_rp)
-            
-            
-            time.sleep(1) 
-            print('...report 03-1')
-            rp31_label = QLabel(self)
-            rp31_label.setText('...report 03-1')
-            rp31_label.setStyleSheet("color: black;")
-            self.layout.addWidget(rp31_label)
-            
-            QApplication.processEvents()
-            
-            df_031,df_031_nw,df_031_rp,df_031_mtr_nw,df_031_mtr_rp= self.create_rpt_03_1 (rpt_date,df_03)
-            dfs.append(df_031)
-            dfs_nw.append(df_031_nw)
-            dfs_rp.append(df_031_rp)
-            df_mtrs_nw.append(df_031_mtr_nw)
-            df_mtrs_rp.append(df_031_mtr_rp)
-            
-            
-            time.sleep(1) 
-            print('...report 04')
-            rp4_label = QLabel(self)
-            rp4_label.setText('...report 04')
-            rp4_label.setStyleSheet("color: black;")
-            self.layout.addWidget(rp4_label)
-            
-            QApplication.processEvents()
-            
-            df_04,df_04_nw,df_04_rp,df_04_mtr_nw,df_04_mtr_rp= self.create_rpt_04 (rpt_date,df_tnt,df_ats)
-            dfs.append(df_04)
-            dfs_nw.append(df_04_nw)
-            dfs_rp.append(df_04_rp)
-            df_mtrs_nw.append(df_04_mtr_nw)
-            df_mtrs_rp.append(df_04_mtr_rp)
-            
-            
-            time.sleep(1) 
-            print('...report 05')
-            rp5_label = QLabel(self)
-            rp5_label.setText('...report 05')
-            rp5_label.setStyleSheet("color: black;")
-            self.layout.addWidget(rp5_label)
-            
-            QApplication.processEvents()
-            
-            df_05,df_05_nw,df_05_rp,df_05_mtr_nw,df_05_mtr_rp= self.create_rpt_05 (rpt_date,df_tnt,df_ats)
-            dfs.append(df_05)
-            dfs_nw.append(df_05_nw)
-            dfs_rp.append(df_05_rp)
-            df_mtrs_nw.append(df_05_mtr_nw)
-            df_mtrs_rp.append(df_05_mtr_rp)
-            
-            
-            time.sleep(1) 
-            print('...report 06')
-            rp6_label = QLabel(self)
-            rp6_label.setText('...report 06')
-            rp6_label.setStyleSheet("color: black;")
-            self.layout.addWidget(rp6_label)
-            
-            QApplication.processEvents()
-            
-            df_06,df_06_nw,df_06_rp,df_06_mtr_nw,df_06_mtr_rp= self.create_rpt_06 (rpt_date,df_tnt,df_ats)
-            dfs.append(df_06)
-            dfs_nw.append(df_06_nw)
-            dfs_rp.append(df_06_rp)
-            df_mtrs_nw.append(df_06_mtr_nw)
-            df_mtrs_rp.append(df_06_mtr_rp)
-            
-            
-            time.sleep(1) 
-            print('...report 07')
-            rp7_label = QLabel(self)
-            rp7_label.setText('...report 07')
-            rp7_label.setStyleSheet("color: black;")
-            self.layout.addWidget(rp7_label)
-            
-            QApplication.processEvents()
-            
-            df_07,df_07_nw,df_07_rp,df_07_mtr_nw,df_07_mtr_rp= self.create_rpt_07 (rpt_date,df_tnt,df_ats)
-            dfs.append(df_07)
-            dfs_nw.append(df_07_nw)
-            dfs_rp.append(df_07_rp)
-            df_mtrs_nw.append(df_07_mtr_nw)
-            df_mtrs_rp.append(df_07_mtr_rp)
-            
-            
-            time.sleep(1) 
-            print('...report 08')
-            rp8_label = QLabel(self)
-            rp8_label.setText('...report 08')
-            rp8_label.setStyleSheet("color: black;")
-            self.layout.addWidget(rp8_label)
-            
-            QApplication.processEvents()
-            
-            df_08,df_08_nw,df_08_rp,df_08_mtr_nw,df_08_mtr_rp= self.create_rpt_08 (rpt_date,df_tnt,df_ats)
-            dfs.append(df_08)
-            dfs_nw.append(df_08_nw)
-            dfs_rp.append(df_08_rp)
-            df_mtrs_nw.append(df_08_mtr_nw)
-            df_mtrs_rp.append(df_08_mtr_rp)
-            
-            
-            time.sleep(1) 
-            print('...report 09')
-            rp9_label = QLabel(self)
-            rp9_label.setText('...report 09')
-            rp9_label.setStyleSheet("color: black;")
-            self.layout.addWidget(rp9_label)
-            
-            QApplication.processEvents()
-            
-            df_09,df_09_nw,df_09_rp,df_09_mtr_nw,df_09_mtr_rp= self.create_rpt_09 (rpt_date,df_tnt,df_ats)
-            dfs.append(df_09)
-            dfs_nw.append(df_09_nw)
-            dfs_rp.append(df_09_rp)
-            df_mtrs_nw.append(df_09_mtr_nw)
-            df_mtrs_rp.append(df_09_mtr_rp)
-            
-            
-            time.sleep(1) 
-            print('\nFormatting Reports')
-            frm_label = QLabel(self)
-            frm_label.setText('Formatting Reports')
-            frm_label.setStyleSheet("color: black;")
-            self.layout.addWidget(frm_label)
-            
-            QApplication.processEvents()
-            
-            df_rpts = self.set_rpt_colums (dfs)
-            df_rpts_nw = self.set_rpt_colums (dfs_nw)
-            df_rpts_rp = self.set_rpt_colums (dfs_rp)
-            
- 
-            time.sleep(1) 
-            print('\nCalculating Summary Stats')
-            sum_label = QLabel(self)
-            sum_label.setText('Calculating Summary Stats')
-            sum_label.setStyleSheet("color: black;")
-            self.layout.addWidget(sum_label)
-            
-            QApplication.processEvents()
-            
-            
-            df_sum_rpt_nw,rpt_ids = self.create_summary_rpt (df_rpts_nw)
-            df_sum_rpt_rp,rpt_ids = self.create_summary_rpt (df_rpts_rp)
-            
-            df_sum_mtr_nw= self.create_summary_mtr(df_mtrs_nw)
-            df_sum_mtr_rp= self.create_summary_mtr(df_mtrs_rp)
-            
-
-            time.sleep(1) 
-            print ('\nCreating Analysis tables')
-            wks= r'\\spatialfiles.bcgov\Work\lwbc\visr\Workarea\moez_labiadh\FILE_TRACKING'
-            tmplt_anlz = os.path.join(wks,'00_TEMPLATE/anz_template.xlsx')
-            df_anz_tim_nw, df_anz_off_nw= self.analysis_tables (tmplt_anlz,df_sum_rpt_nw,df_sum_mtr_nw)
-            df_anz_tim_rp, df_anz_off_rp= self.analysis_tables (tmplt_anlz,df_sum_rpt_rp,df_sum_mtr_rp)
-            anz_label = QLabel(self)
-            anz_label.setText('Creating Analysis tables')
-            anz_label.setStyleSheet("color: black;")
-            self.layout.addWidget(anz_label)
-            
-            QApplication.processEvents()
-                
-            template = os.path.join(wks,'00_TEMPLATE/rpt_template.xlsx')
-
-            df_sum_all_nw= self.create_summary_all(template,df_sum_rpt_nw,df_sum_mtr_nw)
-            df_sum_all_rp= self.create_summary_all(template,df_sum_rpt_rp,df_sum_mtr_rp)
-            
-            # set the first 3 rows of the replacement summary to N/A.
-            rows_range = slice(0, 3)
-            cols_range = slice(4, 26)
-            df_sum_all_rp.iloc[rows_range, cols_range] = 'n/a'
-            
-            print('\nCreating an Output folder')
-            out_folder = os.path.join(wks, rpt_month_str)
-            
-            if not os.path.exists(out_folder):
-                os.makedirs(out_folder)
-    
-            
-            time.sleep(1)
-            print('\nExporting the Main Report')
-            fnr_label = QLabel(self)
-            fnr_label.setText('Exporting the Main Report')
-            fnr_label.setStyleSheet("color: black;")
-            self.layout.addWidget(fnr_label)
-            
-            QApplication.processEvents()
-            
-            df_list = [df_sum_all_nw,df_sum_all_rp] + df_rpts 
-            sheet_list = ['Summary - NEW Applics','Summary - REP Applics'] + rpt_ids
-            outfile_main_rpt = rpt_month_str + '_landFiles_tracker'
-            self. create_report (df_list, sheet_list,out_folder,outfile_main_rpt)
-            
-            nw_rp= 'NEW'
-            self.add_analysis_tables(df_anz_tim_nw,df_anz_off_nw,nw_rp,out_folder,outfile_main_rpt)
-            nw_rp= 'REP'
-            self.add_analysis_tables(df_anz_tim_rp,df_anz_off_rp,nw_rp,out_folder,outfile_main_rpt)
-            
-            time.sleep(1)
-            print ('\nExporting the Hitlists Report')
-            hit_label = QLabel(self)
-            hit_label.setText('Exporting the Hitlists Report')
-            hit_label.setStyleSheet("color: black;")
-            self.layout.addWidget(hit_label)
-            
-            QApplication.processEvents()
-            
-            dfs_htlst= self.create_hitlists (df_rpts)
-            
-            dfs_htlst_lbls= ['hitlist_rpt01','hitlist_rpt02','hitlist_rpt03','hitlist_rpt03-1',
-                             'hitlist_rpt04','hitlist_rpt05','hitlist_rpt06','hitlist_rpt07',
-                             'hitlist_rpt08','hitlist_rpt09']
-            
-            outfile_hit = rpt_month_str + '_landFiles_tracker_hitlists'
-            self.create_report (dfs_htlst, dfs_htlst_lbls, out_folder, outfile_hit)            
-            
-            
-            print ('\nAdding Charts to Main Report')
-            figname_nw= rpt_month_str+'_chart_processingTimes_new'
-            title_tag_nw= 'New Files'
-            self.compute_chart (df_anz_tim_nw, title_tag_nw, out_folder, figname_nw)
-            
-            figname_rp= rpt_month_str+'_chart_processingTimes_rep'
-            title_tag_rp= 'Replacement Files'
-            self.compute_chart (df_anz_tim_rp, title_tag_rp, out_folder, figname_rp)
-            
-            nw_rp= 'NEW'
-            self.add_charts(nw_rp, out_folder, outfile_main_rpt,figname_nw)
-            nw_rp= 'REP'
-            self. add_charts(nw_rp, out_folder, outfile_main_rpt,figname_rp)
-            
-            readme_xlsx= os.path.join(wks,'00_TEMPLATE/readme_template.xlsx')
-            self.add_readme_page(readme_xlsx, out_folder, outfile_main_rpt)
-            
- 
-            time.sleep(1)
-            print('\nProgram Completed Successfully!')
-            proc_label.setText('Program Completed Successfully!')
-            proc_label.setStyleSheet("color: green;")
-            self.layout.addWidget(proc_label)
-             
-    
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
-            print('\nProgram Failed!')
-            proc_label.setText('Program Failed!')
-            proc_label.setStyleSheet("color: red;")
-            self.layout.addWidget(proc_label)
-            
-    
-
-    def import_titan (self):
-        """Reads the Titan work ledger report into a df"""
-        # Get the selected file paths
-        file_path_tnt = self.path_label_tnt.text()
-        
-         # Read the Excel file as pandas DataFrame
-        if file_path_tnt.endswith('.xlsx'):
-            df = pd.read_excel(file_path_tnt,'TITAN_RPT009',
-                           converters={'FILE NUMBER':str})
-        elif file_path_tnt.endswith('.xls'):
-            df = pd.read_excel(file_path_tnt,'TITAN_RPT009',
-                           converters={'FILE NUMBER':str}, engine='xlrd')
-        else:
-            df = None
-        
-        # Display a message box if any of the DataFrames is empty
-        if df is not None and df.empty:
-            QMessageBox.warning(self, 'Empty File', 'The selected Excel file is empty.')
-              
-        tasks = ['NEW APPLICATION','REPLACEMENT APPLICATION','AMENDMENT','ASSIGNMENT']
-        df = df.loc[df['TASK DESCRIPTION'].isin(tasks)]
-        
-        df.rename(columns={'COMMENTS': 'TANTALIS COMMENTS'}, inplace=True)
-     
-        del_col = ['ORG. UNIT','MANAGING AGENCY','BCGS','LEGAL DESCRIPTION',
-                  'FDISTRICT','ADDRESS LINE 1','ADDRESS LINE 2','ADDRESS LINE 3',
-                  'CITY','PROVINCE','POSTAL CODE','COUNTRY','STATE','ZIP CODE']
-        
-        for col in df:
-            if 'DATE' in col:
-                df[col] =  pd.to_datetime(df[col],
-                                       infer_datetime_format=True,
-                                       errors = 'coerce').dt.date
-            elif 'Unnamed' in col:
-                df.drop(col, axis=1, inplace=True)
-            
-            elif col in del_col:
-                df.drop(col, axis=1, inplace=True)
-                
-            else:
-                pass
-                
-        df.loc[df['PURPOSE'] == 'AQUACULTURE', 'DISTRICT OFFICE'] = 'AQUACULTURE'
-        df.loc[df['DISTRICT OFFICE'] == 'COURTENAY', 'DISTRICT OFFICE'] = 'AQUACULTURE'
-        df['DISTRICT OFFICE'] = df['DISTRICT OFFICE'].fillna(value='NANAIMO')
-        
-        return df
-    
-    
-    def import_ats_bf (self):
-        """Reads the ATS Bring Forward report into a df"""
-        warnings.filterwarnings("ignore", category=pd.errors.ParserWarning)
-        
-        # Get the selected file paths
-        file_path_ats_f = self.path_label_ats_f.text()
-        
-        df = pd.read_csv(file_path_ats_f, delimiter="\t",encoding='cp1252',error_bad_lines=False)
-
-        # Display a message box if any of the DataFrames is empty
-        if df is not None and df.empty:
-            QMessageBox.warning(self, 'Empty File', 'The selected Excel file is empty.')
-            
-        cols_onh = ['Project Number','Authorization Assigned To', 
-                    'Bring Forward Date']
-        
-        df = df[cols_onh]
-        df.dropna(subset=['Project Number'],inplace=True)
-        
-        return df    
-    
-
-    def import_ats_oh (self):
-        """Reads the ATS Auth. On Hold report into a df"""
-        # Get the selected file paths
-        file_path_ats_h = self.path_label_ats_h.text()
-        
-        df = pd.read_html(file_path_ats_h)[5]
-        
-        # Display a message box if any of the DataFrames is empty
-        if df is not None and df.empty:
-            QMessageBox.warning(self, 'Empty File', 'The selected Excel file is empty.')
-            
-        df.columns = df.iloc[1]
-        df.drop([0, 1],inplace=True)
-        
-        df['On Hold End Date']=''
-        cols_onh = ['Project Number','On Hold Start Date', 
-                    'On Hold End Date','Reason For Hold']
-        
-        df = df[cols_onh]
+    def on_message(self, text):
+        """Shows a progress message"""
+        msg_label = QLabel(text, self)
+        msg_label.setStyleSheet("color: black;")
+        self.layout.addWidget(msg_label)
         
-        return df    
     
-
-    def import_ats_pt (self,df_bfw,df_onh):
-        """Reads the ATS Processing Time report into a df"""
-        
-        # Get the selected file paths
-        file_path_ats = self.path_label_ats.text()
-        
-        # Read the Excel file as pandas DataFrame
-        df = pd.read_csv(file_path_ats, delimiter = "\t",encoding='cp1252',error_bad_lines=False)
-        
-        # Display a message box if any of the DataFrames is empty
-        if df is not None and df.empty:
-            QMessageBox.warning(self, 'Empty File', 'The selected Excel file is empty.')
-        
-        df.rename(columns={'Comments': 'ATS Comments'}, inplace=True)
-        
-        df.loc[(df['Accepted Date'].isnull()) & 
-           (df['Rejected Date'].isnull()) & 
-           (df['Submission Review Complete Date'].notnull()),
-           'Accepted Date'] = df['Submission Review Complete Date']
-        
-        df['Decision-making Office Name'].fillna(df['Intake Office Name'], inplace=True)
-        df.loc[df['Authorization Type'].str.contains('Aquaculture'), 
-               'Decision-making Office Name'] = 'Aquaculture'
-        
-        df['Decision-making Office Name'] = df['Decision-making Office Name'].str.upper()
-        
-        for index,row in df.iterrows():
-            z_nbr = 7 - len(str(row['File Number']))
-            df.loc[index, 'File Number'] = z_nbr * '0' + str(row['File Number'])
-         
-        # fill na Onhold time with 0
-        df['Total On Hold Time'].fillna(0, inplace=True)
+    def on_stage_started(self, text):
+        """Shows a running stage"""
+        stg_label = QLabel(text, self)
+        stg_label.setStyleSheet("color: black;")
+        self.layout.addWidget(stg_label)
+        self.stage_labels[text] = stg_label
         
     
-        #add on-hold cols
-        df['Project Number'] = df['Project Number'].astype(str)
-        df = pd.merge(df, df_onh, how='left', on='Project Number')
-        
-        #add bring-forward cols
-        df = pd.merge(df, df_bfw, how='left', on='Project Number')
+    def on_stage_finished(self, text, seconds):
+        """Shows the elapsed time of a completed stage"""
+        self.stage_labels[text].setText('{} ({:.1f} s)'.format(text, seconds))
         
-        for col in df:
-            if 'Date' in col:
-                df[col] =  pd.to_datetime(df[col],
-                                   infer_datetime_format=True,
-                                   errors = 'coerce').dt.date
-            elif 'Unnamed' in col:
-                df.drop(col, axis=1, inplace=True)
-        
-        else:
-            pass
-                
     
-        return df
-    
-    
-    def calculate_metrics(self, df, grp_col, mtr_ids):
-        """ Calculates Median and Mean metrics and return in df"""
-        df_mtrs = []
-        for mtr_id in mtr_ids:
-            df_mtr = df.groupby(grp_col)[[mtr_id]].agg(['median', 'mean'])
-            df_mtr.fillna(0, inplace=True)
-            
-            df_mtr.columns = [mtr_id+'_med',mtr_id+'_avg']
-            
-            df_mtr = df_mtr.reset_index()
-            
-            offices = ['AQUACULTURE','CAMPBELL RIVER','HAIDA GWAII',
-                       'NANAIMO', 'PORT ALBERNI','PORT MCNEILL']
-            
-            if set(offices) != set(df_mtr['DISTRICT OFFICE'].unique()):
-                new_rows = pd.DataFrame({'DISTRICT OFFICE': offices})
-                df_mtr = pd.merge(new_rows, df_mtr, how='outer', on='DISTRICT OFFICE')
-                df_mtr = df_mtr.fillna(0)
-            else:
-                df_mtr = df_mtr.sort_values(by='DISTRICT OFFICE')        
-            
-            
-            df_mtr = pd.melt(df_mtr, id_vars=[grp_col])
-            
-            df_mtr = df_mtr.pivot_table(values='value', 
-                                        index='variable', 
-                                        columns=grp_col)
-            
-            vals = []
-            for col in df_mtr.columns:
-                vals.extend(df_mtr[col].to_list())
-                
-            mtr_cols = ['AQ avg','AQ med','CR avg','CR med',
-                        'HG avg','HG med','NA avg','NA med',
-                        'PA avg','PA med','PM avg','PM med']
-            
-            df_mtr = pd.DataFrame(data=[vals], columns=mtr_cols)
-    
-            df_mtr['WC avg'] = df.loc[df[mtr_id] != 0, mtr_id].mean()
-            df_mtr['WC med'] = df.loc[df[mtr_id] != 0, mtr_id].median()
-    
-            df_mtr.fillna(0, inplace=True)        
-            df_mtr = df_mtr.round().astype(int)
-            
-            df_mtr['METRIC ID'] = mtr_id
-            
-            df_mtrs.append(df_mtr)
-        
-        df_mtr = pd.concat(df_mtrs)
-     
-        
-        return df_mtr
-    
-    
-    def create_rpt_01(self,rpt_date,df_tnt,df_ats):
-        """ Creates Report 01- Files with FCBC"""
-        ats_a = df_ats.loc[df_ats['Authorization Status'] == 'Active']
-        #active = ats_a['File Number'].to_list()
-        
-        df_01= ats_a.loc[(ats_a['Received Date'].notnull()) &
-                         (ats_a['Received Date'] <= rpt_date) &
-                         (ats_a['Submission Review Complete Date'].isnull())]
-        
-        
-        df_01 = pd.merge(df_01, df_tnt, how='left',
-                         left_on='File Number',
-                         right_on='FILE NUMBER')
-        
-        df_01= df_01.loc[(df_01['STATUS'].isnull())]
-        
-        df_01.sort_values(by=['Received Date'], ascending=False, inplace=True)
-        df_01.reset_index(drop = True, inplace = True)
-        
-        df_01['DISTRICT OFFICE'] = df_01['Decision-making Office Name'] 
-        
-        df_01['Total On Hold Time'].fillna(0, inplace=True)
-        
-        #Calulcate metrics
-        df_01_nw= df_01.loc[df_01['Authorization Type']!='Replacements']
-        df_01_rp= df_01.loc[df_01['Authorization Type']=='Replacements']
-        
-        #rpt_date = date.rpt_date()
-    
-        for df in [df_01,df_01_nw,df_01_rp]:
-            
-            df['mtr01']  = (rpt_date - df['Received Date']).dt.days
-            
-        metrics = ['mtr01']
-        df_01_mtr_nw = self.calculate_metrics(df_01_nw , 'DISTRICT OFFICE',metrics)
-        df_01_mtr_rp = self.calculate_metrics(df_01_rp , 'DISTRICT OFFICE',metrics )
-        
-    
-        return df_01,df_01_nw,df_01_rp,df_01_mtr_nw,df_01_mtr_rp
-    
-    
-    def create_rpt_02(self, rpt_date,df_tnt,df_ats):
-        """ Creates Report 02- Files in Queue"""
-        ats_r = df_ats.loc[df_ats['Authorization Status']=='Active']
-        active = ats_r['File Number'].to_list()
-        
-        df_02= df_tnt.loc[(df_tnt['TASK DESCRIPTION'].isin(['NEW APPLICATION','REPLACEMENT APPLICATION'])) &
-                          (df_tnt['FILE NUMBER'].isin(active)) &
-                          (df_tnt['OTHER EMPLOYEES ASSIGNED TO'].str.contains('WCR_', na=False) | 
-                           df_tnt['OTHER EMPLOYEES ASSIGNED TO'].isnull()) &
-                          (df_tnt['STATUS'] == 'ACCEPTED') &
-                          (df_tnt['CREATED DATE'] <= rpt_date)]
-    
-        df_02.sort_values(by='RECEIVED DATE', ascending=False,inplace=True)
-        df_ats.sort_values(by='Received Date', ascending=False,inplace=True)
-        
-        df_ats['Join Start Date'] = df_ats['Accepted Date'] - pd.DateOffset(months=6)
-        df_ats['Join End Date'] = df_ats['Accepted Date'] + pd.DateOffset(months=6)
-        
-        df_02['count'] = df_02.groupby('FILE NUMBER').cumcount()
-        df_ats['count'] = df_ats.groupby('File Number').cumcount()
-        
-        df_02 = pd.merge(df_02, df_ats, how='left',
-                         left_on=['FILE NUMBER','count'],
-                         right_on=['File Number','count'])
-        
-        
-        for index, row in df_02.iterrows():
-            if not (row['CREATED DATE'] >= row['Join Start Date'] and row['CREATED DATE'] <= row['Join End Date']): 
-                for col in df_ats.columns:
-                    df_02.at[index, col] = None
-    
-        df_02.reset_index(drop = True, inplace = True)
-        df_02.sort_values(by=['CREATED DATE'], ascending=False, inplace=True)
-        
-        df_02['Total On Hold Time'].fillna(0, inplace=True)
-    
-        #Calulcate metrics
-        
-        rpt_date = pd.to_datetime(rpt_date)
-        
-        df_02['Submission Review Complete Date'] = pd.to_datetime(df_02['Submission Review Complete Date']
-                                                 .fillna(pd.NaT), errors='coerce')
-        df_02['Received Date'] = pd.to_datetime(df_02['Received Date']
-                                                 .fillna(pd.NaT), errors='coerce')        
-            
-        df_02_nw= df_02.loc[df_02['TASK DESCRIPTION']=='NEW APPLICATION']
-        df_02_rp= df_02.loc[df_02['TASK DESCRIPTION']=='REPLACEMENT APPLICATION']
-        
-        
-        for df in [df_02,df_02_nw,df_02_rp]:
-            df['mtr02'] = (df['Submission Review Complete Date'] - df['Received Date']).dt.days
-            df['mtr03']  = (rpt_date - df['Submission Review Complete Date']).dt.days
-    
-        metrics= ['mtr02','mtr03']
-        df_02_mtr_nw = self.calculate_metrics(df_02_nw , 'DISTRICT OFFICE',metrics) 
-        df_02_mtr_rp = self.calculate_metrics(df_02_rp , 'DISTRICT OFFICE',metrics) 
-        
-        return df_02,df_02_nw,df_02_rp,df_02_mtr_nw,df_02_mtr_rp
-    
-    
-    def create_rpt_03 (self, rpt_date,df_tnt,df_ats):
-        """ Creates Report 03- Files in Active Review"""
-        df_ats_h = df_ats.loc[df_ats['Authorization Status'] == 'On Hold']
-        onhold= df_ats_h['File Number'].to_list()
-        #df_ats = df_ats.loc[df_ats['Authorization Status'].isin(['Active','Closed'])]
-       
-        
-        df_03= df_tnt.loc[((~df_tnt['OTHER EMPLOYEES ASSIGNED TO'].str.contains('WCR_',na=False)) & 
-                           (df_tnt['OTHER EMPLOYEES ASSIGNED TO'].notnull())) &
-                           (df_tnt['REPORTED DATE'].isnull()) &
-                           (~df_tnt['FILE NUMBER'].isin(onhold)) &
-                           (df_tnt['TASK DESCRIPTION'].isin(['NEW APPLICATION', 'REPLACEMENT APPLICATION'])) &            
-                           (df_tnt['STATUS'] == 'ACCEPTED') &
-                           (df_tnt['CREATED DATE'] <= rpt_date)]
-     
-        df_03.sort_values(by='RECEIVED DATE', ascending=False,inplace=True)
-        df_ats.sort_values(by='Received Date', ascending=False,inplace=True)
-        
-        df_ats['Join Start Date'] = df_ats['Accepted Date'] - pd.DateOffset(months=6)
-        df_ats['Join End Date'] = df_ats['Accepted Date'] + pd.DateOffset(months=6)
-        
-        df_03['count'] = df_03.groupby('FILE NUMBER').cumcount()
-        df_ats['count'] = df_ats.groupby('File Number').cumcount()
-        
-        df_03 = pd.merge(df_03, df_ats, how='left',
-                         left_on=['FILE NUMBER','count'],
-                         right_on=['File Number','count'])
-         
-        for index, row in df_03.iterrows():
-            if not (row['CREATED DATE'] >= row['Join Start Date'] and row['CREATED DATE'] <= row['Join End Date']): 
-                for col in df_ats.columns:
-                    df_03.at[index, col] = None
-        
-        df_03.sort_values(by=['CREATED DATE'], ascending=False, inplace=True)
-        df_03.reset_index(drop = True, inplace = True)
-        
-        df_03['Total On Hold Time'].fillna(0, inplace=True)
-    
-        #Calulcate metrics
-        rpt_date = pd.to_datetime(rpt_date)
-        
-        # for replacements only, use RECEIVED DATE instead of submisson review date to calculate mtr4
-        df_03.loc[df_03['TASK DESCRIPTION'] == 'REPLACEMENT APPLICATION', 'Submission Review Complete Date'] = df_03['RECEIVED DATE']
+    def on_succeeded(self, seconds):
+        print('\nProgram Completed Successfully in {:.1f} seconds!'.format(seconds))
+        self.proc_label.setText('Program Completed Successfully! ({:.1f} s)'.format(seconds))
+        self.proc_label.setStyleSheet("color: green;")
+        self.exec_button.setEnabled(True)
         
-        df_03['Bring Forward Date'] = pd.to_datetime(df_03['Bring Forward Date']
-                                                     .fillna(pd.NaT), errors='coerce')
-        df_03['Submission Review Complete Date'] = pd.to_datetime(df_03['Submission Review Complete Date']
-                                                                  .fillna(pd.NaT), errors='coerce')
-        df_03['RECEIVED DATE'] = pd.to_datetime(df_03['RECEIVED DATE']
-                                               .fillna(pd.NaT), errors='coerce')
-        df_03['First Nation Start Date'] = pd.to_datetime(df_03['First Nation Start Date']
-                                                          .fillna(pd.NaT), errors='coerce')
-        df_03['First Nation Completion Date'] = pd.to_datetime(df_03['First Nation Completion Date']
-                                                               .fillna(pd.NaT), errors='coerce')
-        
-        df_03_nw= df_03.loc[df_03['TASK DESCRIPTION']=='NEW APPLICATION']
-        df_03_rp= df_03.loc[df_03['TASK DESCRIPTION']=='REPLACEMENT APPLICATION']    
-        
-        
-        for df in [df_03,df_03_nw,df_03_rp]:
-            df['mtr04'] = (df['Bring Forward Date'] - df['Submission Review Complete Date']).dt.days
-            #df['mtr05'] = (rpt_date - df['First Nation Start Date']).dt.days
-            df['mtr06'] = (df['First Nation Completion Date'] - df['First Nation Start Date']).dt.days
-            df['mtr07'] = (rpt_date - df['Bring Forward Date']).dt.days
     
-        metrics= ['mtr04','mtr06','mtr07']
-        df_03_mtr_nw = self.calculate_metrics(df_03_nw , 'DISTRICT OFFICE', metrics ) 
-        df_03_mtr_rp = self.calculate_metrics(df_03_rp , 'DISTRICT OFFICE', metrics ) 
-    
-    
-        return df_03,df_03_nw,df_03_rp,df_03_mtr_nw,df_03_mtr_rp,onhold
-
-
-    def create_rpt_03_1 (self, rpt_date,df03):
-        """ Creates Report 03-1- Files in Consultation"""
-        df_031= df03.loc[(df03['First Nation Start Date'].notnull()) &
-                         (df03['First Nation Completion Date'].isnull())]
-    
-        df_031.drop(['mtr04','mtr06','mtr07'], axis=1, inplace=True)
-        
-        df_031.sort_values(by=['First Nation Start Date'], ascending=False, inplace=True)
-        df_031.reset_index(drop = True, inplace = True)
+    def on_failed(self, error):
+        QMessageBox.critical(self, "Error", error)
+        print('\nProgram Failed!')
+        self.proc_label.setText('Program Failed!')
+        self.proc_label.setStyleSheet("color: red;")
+        self.exec_button.setEnabled(True)
         
-        df_031['Total On Hold Time'].fillna(0, inplace=True)
     
-        #Calulcate metrics
-        rpt_date = pd.to_datetime(rpt_date)
-        
-        # for replacements only, use RECEIVED DATE instead of submisson review date to calculate mtr4
-        df_031.loc[df_031['TASK DESCRIPTION'] == 'REPLACEMENT APPLICATION', 'Submission Review Complete Date'] = df_031['RECEIVED DATE']
+    def closeEvent(self, event):
+        """Waits for a running report generation before closing"""
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.wait()
+        if self.renderer is not None:
+            self.renderer.close()
+        event.accept()
         
     
-        df_031['First Nation Start Date'] = pd.to_datetime(df_031['First Nation Start Date'])
-    
-        
-        df_031_nw= df_031.loc[df_031['TASK DESCRIPTION']=='NEW APPLICATION']
-        df_031_rp= df_031.loc[df_031['TASK DESCRIPTION']=='REPLACEMENT APPLICATION']    
-        
+    def generate_reports(self, worker):
+        """Generates the reports. Runs in the background worker: progress
+           is reported through the worker signals"""
         
-        for df in [df_031,df_031_nw,df_031_rp]:
-    
-            df['mtr05'] = (rpt_date - df['First Nation Start Date']).dt.days
-    
-        metrics= ['mtr05']
-        df_031_mtr_nw = self.calculate_metrics(df_031_nw , 'DISTRICT OFFICE', metrics ) 
-        df_031_mtr_rp = self.calculate_metrics(df_031_rp , 'DISTRICT OFFICE', metrics ) 
-    
-    
-        return df_031,df_031_nw,df_031_rp,df_031_mtr_nw,df_031_mtr_rp    
-    
-
-    def create_rpt_04 (self, rpt_date,df_tnt,df_ats):
-        """ Creates Report 04- Files Awaiting Decision"""
-        df_ats = df_ats.loc[df_ats['Authorization Status'].isin(['Active','Closed'])]
+        # The first day of previous month. Will be used to calculate Metrics
+        today = date.today()
+        first_day_month = today.replace(day=1)
+        rpt_date= first_day_month - timedelta(days=1)
         
-        df_04= df_tnt.loc[(df_tnt['REPORTED DATE'].notnull()) &
-                        (df_tnt['ADJUDICATED DATE'].isnull()) &
-                        (df_tnt['TASK DESCRIPTION'].isin(['NEW APPLICATION', 'REPLACEMENT APPLICATION'])) &
-                        (df_tnt['STATUS'] == 'ACCEPTED') &
-                        (df_tnt['REPORTED DATE'] <= rpt_date)]
-    
-        df_04.sort_values(by='RECEIVED DATE', ascending=False,inplace=True)
-        df_ats.sort_values(by='Received Date', ascending=False,inplace=True)
+        rpt_month_str = rpt_date.strftime("%b%Y").lower()
         
-        df_ats['Join Start Date'] = df_ats['Accepted Date'] - pd.DateOffset(months=6)
-        df_ats['Join End Date'] = df_ats['Accepted Date'] + pd.DateOffset(months=6)
         
-        df_04['count'] = df_04.groupby('FILE NUMBER').cumcount()
-        df_ats['count'] = df_ats.groupby('File Number').cumcount()
+        print ('\nImporting Input files')
+        worker.message.emit('Importing Input files')
         
-        df_04 = pd.merge(df_04, df_ats, how='left',
-                         left_on=['FILE NUMBER','count'],
-                         right_on=['File Number','count'])
+        with worker.stage('...TITAN workledger spreadsheet'):
+            df_tnt =  self.import_titan ()
         
-        for index, row in df_04.iterrows():
-            if not (row['CREATED DATE'] >= row['Join Start Date'] and row['CREATED DATE'] <= row['Join End Date']): 
-                for col in df_ats.columns:
-                    df_04.at[index, col] = None
+        with worker.stage('...ATS bring-forward spreadsheet'):
+            df_bfw= self.import_ats_bf ()            
         
-        df_04.sort_values(by=['REPORTED DATE'], ascending=False, inplace=True)
-        df_04.reset_index(drop = True, inplace = True)
+        with worker.stage('...ATS report: on-hold'):
+            df_onh= self.import_ats_oh ()             
         
-        df_04['Total On Hold Time'].fillna(0, inplace=True)
-    
-        #Calulcate metrics
-        rpt_date = pd.to_datetime(rpt_date)
-    
-        df_04['Bring Forward Date'] = pd.to_datetime(df_04['Bring Forward Date']
-                                                     .fillna(pd.NaT), errors='coerce')
-    
-        df_04['REPORTED DATE'] = pd.to_datetime(df_04['REPORTED DATE']
-                                                     .fillna(pd.NaT), errors='coerce') 
+        with worker.stage('...ATS report: processing time'):
+            df_ats= self.import_ats_pt (df_bfw,df_onh)
         
-        df_04_nw= df_04.loc[df_04['TASK DESCRIPTION']=='NEW APPLICATION']
-        df_04_rp= df_04.loc[df_04['TASK DESCRIPTION']=='REPLACEMENT APPLICATION']        
         
+        print('\nComputing Reports.')
+        worker.message.emit('Computing Reports')
         
-        for df in [df_04,df_04_nw,df_04_rp]:
-    
-            df['mtr08'] = (df['REPORTED DATE'] - df['Bring Forward Date']).dt.days
-            df['mtr09'] = (rpt_date - df['REPORTED DATE']).dt.days
-    
-        metrics= ['mtr08','mtr09']
-        df_04_mtr_nw = self.calculate_metrics(df_04_nw , 'DISTRICT OFFICE', metrics )  
-        df_04_mtr_rp = self.calculate_metrics(df_04_rp , 'DISTRICT OFFICE', metrics ) 
+        # one stage per report: the reports run concurrently
+        stages = {spec['id']: '...report {}'.format(spec['id'][3:]) for spec in REPORTS}
+        for text in stages.values():
+            worker.stage_started.emit(text)
         
-        return df_04,df_04_nw,df_04_rp,df_04_mtr_nw,df_04_mtr_rp
-    
-    
-    def create_rpt_05 (self, rpt_date,df_tnt,df_ats):
-        """ Creates Report 05- Files Awaiting Offer"""
-        df_ats = df_ats.loc[df_ats['Authorization Status'].isin(['Active','Closed'])]
+        def report_done (rpt_id, seconds):
+            print ('{} ({:.1f} s)'.format(stages[rpt_id], seconds))
+            worker.stage_finished.emit(stages[rpt_id], seconds)
         
-        df_05= df_tnt.loc[(df_tnt['ADJUDICATED DATE'].notnull()) &
-                         (df_tnt['OFFERED DATE'].isnull()) &
-                         (df_tnt['TASK DESCRIPTION'].isin(['NEW APPLICATION', 'REPLACEMENT APPLICATION'])) &            
-                         (df_tnt['STATUS'] == 'ACCEPTED') &
-                         (df_tnt['ADJUDICATED DATE'] <= rpt_date)]
-    
-        df_05.sort_values(by='RECEIVED DATE', ascending=False,inplace=True)
-        df_ats.sort_values(by='Received Date', ascending=False,inplace=True)
+        engine = ReportEngine (rpt_date,df_tnt,df_ats)
+        rpts = engine.run (on_done=report_done)
         
-        df_ats['Join Start Date'] = df_ats['Accepted Date'] - pd.DateOffset(months=6)
-        df_ats['Join End Date'] = df_ats['Accepted Date'] + pd.DateOffset(months=6)
+        dfs,dfs_nw,dfs_rp,df_mtrs_nw,df_mtrs_rp = [list(x) for x in zip(*rpts)]
         
-        df_05['count'] = df_05.groupby('FILE NUMBER').cumcount()
-        df_ats['count'] = df_ats.groupby('File Number').cumcount()
         
-        df_05 = pd.merge(df_05, df_ats, how='left',
-                         left_on=['FILE NUMBER','count'],
-                         right_on=['File Number','count'])
+        with worker.stage('Formatting Reports'):
+            df_rpts = self.set_rpt_colums (dfs)
+            df_rpts_nw = self.set_rpt_colums (dfs_nw)
+            df_rpts_rp = self.set_rpt_colums (dfs_rp)
         
-        for index, row in df_05.iterrows():
-            if not (row['CREATED DATE'] >= row['Join Start Date'] and row['CREATED DATE'] <= row['Join End Date']): 
-                for col in df_ats.columns:
-                    df_05.at[index, col] = None
         
-        df_05.sort_values(by=['ADJUDICATED DATE'], ascending=False, inplace=True)
-        df_05.reset_index(drop = True, inplace = True)
+        with worker.stage('Calculating Summary Stats'):
+            df_sum_rpt_nw,rpt_ids = self.create_summary_rpt (df_rpts_nw)
+            df_sum_rpt_rp,rpt_ids = self.create_summary_rpt (df_rpts_rp)
+            
+            df_sum_mtr_nw= self.create_summary_mtr(df_mtrs_nw)
+            df_sum_mtr_rp= self.create_summary_mtr(df_mtrs_rp)
         
-        df_05['Total On Hold Time'].fillna(0, inplace=True)
-    
-        #Calulcate metrics
-        df_05_nw= df_05.loc[df_05['TASK DESCRIPTION']=='NEW APPLICATION']
-        df_05_rp= df_05.loc[df_05['TASK DESCRIPTION']=='REPLACEMENT APPLICATION']  
         
-    
-        for df in [df_05,df_05_nw,df_05_rp]:
-            df['mtr10'] = (df['ADJUDICATED DATE'] - df['REPORTED DATE']).dt.days
-            df['mtr11'] = (rpt_date - df['ADJUDICATED DATE']).dt.days
-    
-        metrics= ['mtr10','mtr11']
-        df_05_mtr_nw = self.calculate_metrics(df_05_nw , 'DISTRICT OFFICE', metrics )  
-        df_05_mtr_rp = self.calculate_metrics(df_05_rp , 'DISTRICT OFFICE', metrics )  
+        wks= r'\\spatialfiles.bcgov\Work\lwbc\visr\Workarea\moez_labiadh\FILE_TRACKING'
+        with worker.stage('Creating Analysis tables'):
+            tmplt_anlz = os.path.join(wks,'00_TEMPLATE/anz_template.xlsx')
+            df_anz_tim_nw, df_anz_off_nw= self.analysis_tables (tmplt_anlz,df_sum_rpt_nw,df_sum_mtr_nw)
+            df_anz_tim_rp, df_anz_off_rp= self.analysis_tables (tmplt_anlz,df_sum_rpt_rp,df_sum_mtr_rp)
+                
+            template = os.path.join(wks,'00_TEMPLATE/rpt_template.xlsx')
+            
+            df_sum_all_nw= self.create_summary_all(template,df_sum_rpt_nw,df_sum_mtr_nw)
+            df_sum_all_rp= self.create_summary_all(template,df_sum_rpt_rp,df_sum_mtr_rp)
+            
+            # set the first 3 rows of the replacement summary to N/A.
+            rows_range = slice(0, 3)
+            cols_range = slice(4, 26)
+            df_sum_all_rp.iloc[rows_range, cols_range] = 'n/a'
         
-        return df_05,df_05_nw,df_05_rp,df_05_mtr_nw,df_05_mtr_rp
-    
-    
-    def create_rpt_06 (self, rpt_date,df_tnt,df_ats):
-        """ Creates Report 06- Files awaiting Offer Acceptance"""
-        df_ats = df_ats.loc[df_ats['Authorization Status'].isin(['Active','Closed'])]
-        df_06= df_tnt.loc[(df_tnt['OFFERED DATE'].notnull()) &
-                          (df_tnt['OFFER ACCEPTED DATE'].isnull())&
-                          (df_tnt['TASK DESCRIPTION'].isin(['NEW APPLICATION', 'REPLACEMENT APPLICATION'])) &                      
-                          (df_tnt['STATUS'] == 'OFFERED') &
-                          (df_tnt['OFFERED DATE'] <= rpt_date)]
+        print('\nCreating an Output folder')
+        out_folder = os.path.join(wks, rpt_month_str)
         
-        df_06.sort_values(by='RECEIVED DATE', ascending=False,inplace=True)
-        df_ats.sort_values(by='Received Date', ascending=False,inplace=True)
+        if not os.path.exists(out_folder):
+            os.makedirs(out_folder)
         
-        df_ats['Join Start Date'] = df_ats['Accepted Date'] - pd.DateOffset(months=6)
-        df_ats['Join End Date'] = df_ats['Accepted Date'] + pd.DateOffset(months=6)
         
-        df_06['count'] = df_06.groupby('FILE NUMBER').cumcount()
-        df_ats['count'] = df_ats.groupby('File Number').cumcount()
+        outfile_main_rpt = rpt_month_str + '_landFiles_tracker'
+        figname_nw= rpt_month_str+'_chart_processingTimes_new'
+        figname_rp= rpt_month_str+'_chart_processingTimes_rep'
         
-        df_06 = pd.merge(df_06, df_ats, how='left',
-                         left_on=['FILE NUMBER','count'],
-                         right_on=['File Number','count'])
+        title_tag_nw= 'New Files'
+        title_tag_rp= 'Replacement Files'
         
-        for index, row in df_06.iterrows():
-            if not (row['CREATED DATE'] >= row['Join Start Date'] and row['CREATED DATE'] <= row['Join End Date']): 
-                for col in df_ats.columns:
-                    df_06.at[index, col] = None
+        if CHART_BACKEND == 'image':
+            with worker.stage('Computing Charts'):
+                self.compute_chart (df_anz_tim_nw, title_tag_nw, out_folder, figname_nw)
+                self.compute_chart (df_anz_tim_rp, title_tag_rp, out_folder, figname_rp)
+                self.renderer.render ()
         
-        df_06.sort_values(by=['OFFERED DATE'], ascending=False, inplace=True)
-        df_06.reset_index(drop = True, inplace = True)
         
-        df_06['Total On Hold Time'].fillna(0, inplace=True)
-    
-        #Calulcate metrics
-        df_06_nw= df_06.loc[df_06['TASK DESCRIPTION']=='NEW APPLICATION']
-        df_06_rp= df_06.loc[df_06['TASK DESCRIPTION']=='REPLACEMENT APPLICATION']  
-    
-        for df in [df_06,df_06_nw,df_06_rp]:
-            df['mtr12'] = (df['OFFERED DATE'] - df['ADJUDICATED DATE']).dt.days
-            df['mtr13'] = (rpt_date - df['OFFERED DATE']).dt.days
+        with worker.stage('Exporting the Main Report'):
+            composer = WorkbookComposer (os.path.join(out_folder, outfile_main_rpt + '.xlsx'))
+            
+            readme_xlsx= os.path.join(wks,'00_TEMPLATE/readme_template.xlsx')
+            composer.add_readme (read_template (readme_xlsx, parse_readme))
+            
+            df_list = [df_sum_all_nw,df_sum_all_rp] + df_rpts 
+            sheet_list = ['Summary - NEW Applics','Summary - REP Applics'] + rpt_ids
+            composer.add_sheets (df_list, sheet_list)
+            
+            composer.add_analysis_tables ('Summary - NEW Applics', df_anz_tim_nw, df_anz_off_nw,
+                                          ['Table3000','Table3001'])
+            composer.add_analysis_tables ('Summary - REP Applics', df_anz_tim_rp, df_anz_off_rp,
+                                          ['Table3002','Table3003'])
+            
+            if CHART_BACKEND == 'image':
+                composer.add_chart_image ('Summary - NEW Applics', os.path.join(out_folder, figname_nw + '.png'))
+                composer.add_chart_image ('Summary - REP Applics', os.path.join(out_folder, figname_rp + '.png'))
+            else:
+                composer.add_chart ('Summary - NEW Applics', get_chart_title (df_anz_tim_nw, title_tag_nw))
+                composer.add_chart ('Summary - REP Applics', get_chart_title (df_anz_tim_rp, title_tag_rp))
+            
+            composer.save ()
         
-        metrics= ['mtr12','mtr13']
-        df_06_mtr_nw = self.calculate_metrics(df_06_nw , 'DISTRICT OFFICE', metrics )  
-        df_06_mtr_rp = self.calculate_metrics(df_06_rp , 'DISTRICT OFFICE', metrics )  
         
-        return df_06,df_06_nw,df_06_rp,df_06_mtr_nw,df_06_mtr_rp
+        with worker.stage('Exporting the Hitlists Report'):
+            dfs_htlst= self.create_hitlists (df_rpts)
+            
+            dfs_htlst_lbls= ['hitlist_' + spec['id'] for spec in REPORTS]
+            
+            outfile_hit = rpt_month_str + '_landFiles_tracker_hitlists'
+            self.create_report (dfs_htlst, dfs_htlst_lbls, out_folder, outfile_hit)            
     
     
-    def create_rpt_07 (self, rpt_date,df_tnt,df_ats):
-        """ Creates Report 07- Files with Offer Accepted"""
-        df_ats = df_ats.loc[df_ats['Authorization Status'].isin(['Active','Closed'])]
-        df_07= df_tnt.loc[(df_tnt['OFFER ACCEPTED DATE'].notnull()) &
-                         (df_tnt['TASK DESCRIPTION'].isin(['NEW APPLICATION', 'REPLACEMENT APPLICATION'])) &                      
-                          (df_tnt['STATUS'] == 'OFFER ACCEPTED') &
-                          (df_tnt['OFFER ACCEPTED DATE'] <= rpt_date)]
-        
-        df_ats['Join Start Date'] = df_ats['Accepted Date'] - pd.DateOffset(months=6)
-        df_ats['Join End Date'] = df_ats['Accepted Date'] + pd.DateOffset(months=6)
+    def warn_empty_file(self):
+        """Warns that an input file is empty (shown by the GUI thread)"""
+        self.worker.warning.emit('Empty File', 'The selected Excel file is empty.')
+    
+    
+
+    def import_titan (self):
+        """Reads the Titan work ledger report into a df"""
+        # Get the selected file paths
+        file_path_tnt = self.file_paths['tnt']
         
-        df_07['count'] = df_07.groupby('FILE NUMBER').cumcount()
-        df_ats['count'] = df_ats.groupby('File Number').cumcount()
+         # Read the Excel file as pandas DataFrame
+        if file_path_tnt.endswith('.xlsx'):
+            df = pd.read_excel(file_path_tnt,'TITAN_RPT009',
+                           converters={'FILE NUMBER':str})
+        elif file_path_tnt.endswith('.xls'):
+            df = pd.read_excel(file_path_tnt,'TITAN_RPT009',
+                           converters={'FILE NUMBER':str}, engine='xlrd')
+        else:
+            df = None
         
-        df_07 = pd.merge(df_07, df_ats, how='left',
-                         left_on=['FILE NUMBER','count'],
-                         right_on=['File Number','count'])
+        # Display a message box if any of the DataFrames is empty
+        if df is not None and df.empty:
+            self.warn_empty_file()
+              
+        tasks = ['NEW APPLICATION','REPLACEMENT APPLICATION','AMENDMENT','ASSIGNMENT']
+        df = df.loc[df['TASK DESCRIPTION'].isin(tasks)]
         
-        for index, row in df_07.iterrows():
-            if not (row['CREATED DATE'] >= row['Join Start Date'] and row['CREATED DATE'] <= row['Join End Date']): 
-                for col in df_ats.columns:
-                    df_07.at[index, col] = None
+        df.rename(columns={'COMMENTS': 'TANTALIS COMMENTS'}, inplace=True)
+     
+        del_col = ['ORG. UNIT','MANAGING AGENCY','BCGS','LEGAL DESCRIPTION',
+                  'FDISTRICT','ADDRESS LINE 1','ADDRESS LINE 2','ADDRESS LINE 3',
+                  'CITY','PROVINCE','POSTAL CODE','COUNTRY','STATE','ZIP CODE']
         
-        df_07.sort_values(by=['OFFER ACCEPTED DATE'], ascending=False, inplace=True)
-        df_07.reset_index(drop = True, inplace = True)
+        for col in df:
+            if 'DATE' in col:
+                df[col] =  pd.to_datetime(df[col],
+                                       infer_datetime_format=True,
+                                       errors = 'coerce').dt.date
+            elif 'Unnamed' in col:
+                df.drop(col, axis=1, inplace=True)
+            
+            elif col in del_col:
+                df.drop(col, axis=1, inplace=True)
+                
+            else:
+                pass
+                
+        df.loc[df['PURPOSE'] == 'AQUACULTURE', 'DISTRICT OFFICE'] = 'AQUACULTURE'
+        df.loc[df['DISTRICT OFFICE'] == 'COURTENAY', 'DISTRICT OFFICE'] = 'AQUACULTURE'
+        df['DISTRICT OFFICE'] = df['DISTRICT OFFICE'].fillna(value='NANAIMO')
         
-        df_07['Total On Hold Time'].fillna(0, inplace=True)
+        return df
     
-        #Calulcate metrics
-        df_07_nw= df_07.loc[df_07['TASK DESCRIPTION']=='NEW APPLICATION']
-        df_07_rp= df_07.loc[df_07['TASK DESCRIPTION']=='REPLACEMENT APPLICATION']  
+    
+    def import_ats_bf (self):
+        """Reads the ATS Bring Forward report into a df"""
+        warnings.filterwarnings("ignore", category=pd.errors.ParserWarning)
+        
+        # Get the selected file paths
+        file_path_ats_f = self.file_paths['ats_f']
         
-        for df in [df_07,df_07_nw,df_07_rp]:
-            df['mtr14'] = (df['OFFER ACCEPTED DATE'] - df['OFFERED DATE']).dt.days
-            df['mtr15'] = (rpt_date - df['OFFER ACCEPTED DATE']).dt.days
+        df = pd.read_csv(file_path_ats_f, delimiter="\t",encoding='cp1252',error_bad_lines=False)
+
+        # Display a message box if any of the DataFrames is empty
+        if df is not None and df.empty:
+            self.warn_empty_file()
+            
+        cols_onh = ['Project Number','Authorization Assigned To', 
+                    'Bring Forward Date']
         
-        metrics= ['mtr14','mtr15']
-        df_07_mtr_nw = self.calculate_metrics(df_07_nw , 'DISTRICT OFFICE', metrics )  
-        df_07_mtr_rp = self.calculate_metrics(df_07_rp , 'DISTRICT OFFICE', metrics )  
+        df = df[cols_onh]
+        df.dropna(subset=['Project Number'],inplace=True)
         
-        return df_07,df_07_nw,df_07_rp,df_07_mtr_nw,df_07_mtr_rp
-    
+        return df    
     
-    def create_rpt_08 (self, rpt_date,df_tnt,df_ats):
-        """ Creates Report 08- Files Completed"""
-        df_ats = df_ats.loc[df_ats['Authorization Status'].isin(['Active','Closed'])]
-        
-        first_day_of_month = rpt_date.replace(day=1)
+
+    def import_ats_oh (self):
+        """Reads the ATS Auth. On Hold report into a df"""
+        # Get the selected file paths
+        file_path_ats_h = self.file_paths['ats_h']
         
-        df_08= df_tnt.loc[(df_tnt['COMPLETED DATE'].notnull()) &
-                          (df_tnt['COMPLETED DATE'] >= first_day_of_month) &
-                          (df_tnt['TASK DESCRIPTION'].isin(['NEW APPLICATION', 'REPLACEMENT APPLICATION'])) &
-                          (df_tnt['STATUS'] == 'DISPOSITION IN GOOD STANDING') &
-                          (df_tnt['COMPLETED DATE'] <= rpt_date)]
+        df = pd.read_html(file_path_ats_h)[5]
         
-        df_ats['Join Start Date'] = df_ats['Accepted Date'] - pd.DateOffset(months=6)
-        df_ats['Join End Date'] = df_ats['Accepted Date'] + pd.DateOffset(months=6)
+        # Display a message box if any of the DataFrames is empty
+        if df is not None and df.empty:
+            self.warn_empty_file()
+            
+        df.columns = df.iloc[1]
+        df.drop([0, 1],inplace=True)
         
-        df_08['count'] = df_08.groupby('FILE NUMBER').cumcount()
-        df_ats['count'] = df_ats.groupby('File Number').cumcount()
+        df['On Hold End Date']=''
+        cols_onh = ['Project Number','On Hold Start Date', 
+                    'On Hold End Date','Reason For Hold']
         
-        df_08 = pd.merge(df_08, df_ats, how='left',
-                         left_on=['FILE NUMBER','count'],
-                         right_on=['File Number','count'])
+        df = df[cols_onh]
         
-        for index, row in df_08.iterrows():
-            if not (row['CREATED DATE'] >= row['Join Start Date'] and row['CREATED DATE'] <= row['Join End Date']): 
-                for col in df_ats.columns:
-                    df_08.at[index, col] = None
+        return df    
+    
+
+    def import_ats_pt (self,df_bfw,df_onh):
+        """Reads the ATS Processing Time report into a df"""
         
-        df_08.sort_values(by=['COMPLETED DATE'], ascending=False, inplace=True)
-        df_08.reset_index(drop = True, inplace = True)
+        # Get the selected file paths
+        file_path_ats = self.file_paths['ats']
         
-        df_08['Total On Hold Time'].fillna(0, inplace=True)
-    
-        #Calulcate metrics
-        df_08_nw= df_08.loc[df_08['TASK DESCRIPTION']=='NEW APPLICATION']
-        df_08_rp= df_08.loc[df_08['TASK DESCRIPTION']=='REPLACEMENT APPLICATION'] 
+        # Read the Excel file as pandas DataFrame
+        df = pd.read_csv(file_path_ats, delimiter = "\t",encoding='cp1252',error_bad_lines=False)
         
-    
-        for df in [df_08,df_08_nw,df_08_rp]:
-            df['mtr16'] = (df['COMPLETED DATE'] - df['ADJUDICATED DATE']).dt.days
-            df['mtr17'] = (df['COMPLETED DATE'] - df['RECEIVED DATE']).dt.days
-    
-        metrics= ['mtr16','mtr17']
-        df_08_mtr_nw = self.calculate_metrics(df_08_nw , 'DISTRICT OFFICE', metrics ) 
-        df_08_mtr_rp = self.calculate_metrics(df_08_rp , 'DISTRICT OFFICE', metrics )  
-    
+        # Display a message box if any of the DataFrames is empty
+        if df is not None and df.empty:
+            self.warn_empty_file()
         
-        return df_08,df_08_nw,df_08_rp,df_08_mtr_nw,df_08_mtr_rp
-    
-    
-    def create_rpt_09 (self, rpt_date,df_tnt,df_ats):
-        """ Creates Report 09 - Files On Hold"""
-        df_ats = df_ats.loc[(df_ats['Authorization Status']== 'On Hold') &
-                            (df_ats['Accepted Date'].notnull()) &
-                            (df_ats['On Hold Start Date'] <= rpt_date)]
+        df.rename(columns={'Comments': 'ATS Comments'}, inplace=True)
         
-        hold_l = df_ats['File Number'].to_list()
+        df.loc[(df['Accepted Date'].isnull()) & 
+           (df['Rejected Date'].isnull()) & 
+           (df['Submission Review Complete Date'].notnull()),
+           'Accepted Date'] = df['Submission Review Complete Date']
         
-        df_09= df_tnt.loc[(df_tnt['STATUS'] == 'ACCEPTED') & 
-                          (df_tnt['FILE NUMBER'].isin(hold_l))]
-    
-        df_09['tempo_join_date']= df_09['CREATED DATE'].astype('datetime64[Y]')
-        df_ats['tempo_join_date']= df_ats['Accepted Date'].astype('datetime64[Y]')
+        df['Decision-making Office Name'].fillna(df['Intake Office Name'], inplace=True)
+        df.loc[df['Authorization Type'].str.contains('Aquaculture'), 
+               'Decision-making Office Name'] = 'Aquaculture'
         
-        df_09 = pd.merge(df_09, df_ats, how='left',
-                         left_on=['FILE NUMBER'],
-                         right_on=['File Number'])
+        df['Decision-making Office Name'] = df['Decision-making Office Name'].str.upper()
         
-        df_09.sort_values(by=['CREATED DATE'], ascending=False, inplace=True)
-        df_09.reset_index(drop = True, inplace = True)
+        for index,row in df.iterrows():
+            z_nbr = 7 - len(str(row['File Number']))
+            df.loc[index, 'File Number'] = z_nbr * '0' + str(row['File Number'])
+         
+        # fill na Onhold time with 0
+        df['Total On Hold Time'].fillna(0, inplace=True)
         
-        df_09['Total On Hold Time'].fillna(0, inplace=True)
-    
-        #Calulcate metrics
-        rpt_date = pd.to_datetime(rpt_date)
-    
-        df_09['On Hold Start Date'] = pd.to_datetime(df_09['On Hold Start Date']
-                                                     .fillna(pd.NaT), errors='coerce')
     
-        df_09['On Hold End Date'] = pd.to_datetime(df_09['On Hold End Date']
-                                                     .fillna(pd.NaT), errors='coerce') 
-    
-        df_09_nw= df_09.loc[df_09['TASK DESCRIPTION']=='NEW APPLICATION']
-        df_09_rp= df_09.loc[df_09['TASK DESCRIPTION']=='REPLACEMENT APPLICATION'] 
+        #add on-hold cols
+        df['Project Number'] = df['Project Number'].astype(str)
+        df = pd.merge(df, df_onh, how='left', on='Project Number')
         
-        for df in [df_09,df_09_nw,df_09_rp]:
-            df['mtr18'] = (rpt_date - df['On Hold Start Date']).dt.days
-    
+        #add bring-forward cols
+        df = pd.merge(df, df_bfw, how='left', on='Project Number')
         
-        metrics= ['mtr18']
-        df_09_mtr_nw = self.calculate_metrics(df_09_nw , 'DISTRICT OFFICE', metrics )  
-        df_09_mtr_rp = self.calculate_metrics(df_09_rp , 'DISTRICT OFFICE', metrics ) 
+        for col in df:
+            if 'Date' in col:
+                df[col] =  pd.to_datetime(df[col],
+                                   infer_datetime_format=True,
+                                   errors = 'coerce').dt.date
+            elif 'Unnamed' in col:
+                df.drop(col, axis=1, inplace=True)
         
-        return df_09,df_09_nw,df_09_rp,df_09_mtr_nw,df_09_mtr_rp
+        else:
+            pass
+                
+    
+        return df
     
     
     def set_rpt_colums (self, dfs):
@@ -1353,8 +1359,7 @@ class LandsTracker(QWidget):
     
     def create_summary_rpt (self, df_rpts):
         """Creates a summary  -Nbr of Files"""
-        rpt_ids = ['rpt01','rpt02','rpt03','rpt03-1','rpt04',
-                   'rpt05','rpt06','rpt07','rpt08','rpt09']
+        rpt_ids = [spec['id'] for spec in REPORTS]
         
         df_grs = []
         for df in df_rpts:
@@ -1395,7 +1400,7 @@ class LandsTracker(QWidget):
     
     def create_summary_all(self, template,df_sum_rpt,df_sum_mtr):
         """Create a Summary of Nbr files and days"""
-        df_tmp = pd.read_excel(template)
+        df_tmp = read_template (template, pd.read_excel)
         
         df_sum_all = pd.merge(df_tmp,df_sum_rpt,
                               how='left',
@@ -1418,7 +1423,7 @@ class LandsTracker(QWidget):
 
     def analysis_tables (self, tmplt_anlz,df_sum_rpt,df_sum_mtr):
         """Create Analysis tables"""
-        df_tmp= pd.read_excel(tmplt_anlz)
+        df_tmp= read_template (tmplt_anlz, pd.read_excel).copy()
     
         df_anz_tim= pd.merge(df_tmp,df_sum_mtr[['METRIC ID','WC avg','WC med']],
                              how= 'left', on='METRIC ID')
@@ -1476,60 +1481,11 @@ class LandsTracker(QWidget):
         return df_anz_tim,df_anz_off
 
 
-    def add_analysis_tables (self, df_anz_tim, df_anz_off, nw_rp, out_folder, filename):
-        """Adds the Executive Summaries to the Main report"""
-        out_file = os.path.join(out_folder, f"{filename}.xlsx")
-        
-    
-        workbook = load_workbook(out_file)
-        
-        writer = pd.ExcelWriter(out_file, engine='openpyxl')
-        writer.book = workbook
-        
-        if nw_rp == 'NEW':
-            sheet_index = 0
-            tab_tim_nme= 'Table3000'
-            tab_off_nme= 'Table3001'
-        else:
-            sheet_index = 1
-            tab_tim_nme= 'Table3002'
-            tab_off_nme= 'Table3003'
-            
-        sheet_name = workbook.sheetnames[sheet_index]
-    
-        start_row = 21
-        df_anz_tim.to_excel(writer, sheet_name=sheet_name, 
-                            startrow=start_row,
-                            startcol=1,
-                            index=False)
-    
-        df_anz_off.to_excel(writer, sheet_name=sheet_name, 
-                            startrow=start_row + len(df_anz_tim) + 3, 
-                            startcol=1,
-                            index=False)
-        
-        
-        worksheet = workbook[sheet_name]
-        
-       
-        tab_tim = Table(displayName= tab_tim_nme, ref="B22:G31")
-        tab_off = Table(displayName= tab_off_nme, ref="B34:H44")
-    
-        style = TableStyleInfo(name="TableStyleMedium9", showFirstColumn=True,
-                              showLastColumn=False, showRowStripes=True, showColumnStripes=True)
-        
-        tab_tim.tableStyleInfo = style
-        tab_off.tableStyleInfo = style
-    
-        worksheet.add_table(tab_tim)
-        worksheet.add_table(tab_off)
-       
-    
-        writer.save()
-    
-
     def compute_chart (self, df, title_tag, out_folder, figname):
-        """Computes a barplot of number of # of files and processing times """
+        """Computes a barplot of number of # of files and processing times.
+           The chart is rendered to PNG by the next renderer batch"""
+        import plotly.express as px
+        import plotly.graph_objects as go
     
         fig = px.bar(df, x='Stage', y='# Files at Stage',template='plotly')
         fig.update_traces(texttemplate='<b>%{y}</b>', textposition='auto')
@@ -1542,11 +1498,7 @@ class LandsTracker(QWidget):
                                  marker=dict(symbol='circle', color='orange', size=12), yaxis='y2'))
         
     
-        exld= ['Files in Consultation (with LO)','Files On Hold']
-        df_sum= df.loc[~df['Stage'].isin(exld)]
-        nbr_files= int(df_sum['# Files at Stage'].sum())
-        title= """WCR Lands Applications Workflow Status - {} <br>[{} Total Files in Process, excl On Hold]
-               """.format(title_tag, nbr_files)
+        title= '<br>'.join(get_chart_title (df, title_tag))
         
         fig.update_layout(
             title=title,
@@ -1556,51 +1508,16 @@ class LandsTracker(QWidget):
             legend=dict(orientation='h', yanchor='top', y=1.06, xanchor='center', x=0.87)
         )
         
-        out_chart= os.path.join('{}'.format(out_folder), figname+'.png')
-        fig.write_image(out_chart, width=1200, height=800, scale=2)
-    
-    
-    
-    def add_charts(self, nw_rp, out_folder, filename, figname):
-        """ "Adds the charts to the Main report """
-        
-        out_file = os.path.join(out_folder, f"{filename}.xlsx")
-        workbook = load_workbook(out_file)
-        
-        if nw_rp == 'NEW':
-            sheet_index = 0
-        else:
-            sheet_index = 1
-    
-        sheet_name = workbook.sheetnames[sheet_index]
-        worksheet = workbook[sheet_name]
-        
-        image_path = os.path.join(out_folder, f"{figname}.png")
-    
-        pil_image = PILImage.open(image_path)
+        if self.renderer is None:
+            self.renderer = ChartRenderer ()
         
-        width_cm = 27
-        height_cm = 17
-        
-        dpi = 96 
-        width_px = int(width_cm * dpi / 2.54)
-        height_px = int(height_cm * dpi / 2.54)
-        
-        resized_image = pil_image.resize((width_px, height_px))
-        
-        resized_image.save(image_path, "PNG")
-        img = Image(image_path)
+        out_chart= os.path.join('{}'.format(out_folder), figname+'.png')
+        self.renderer.add(fig, out_chart)
     
-        cell = "J22"
-        
-        worksheet.add_image(img, cell)
-        
-        workbook.save(out_file)
     
     
     def create_hitlists (self, df_rpts):
-        mtr_lst= ['mtr01','mtr03','mtr07','mtr05','mtr09',
-                  'mtr11','mtr13','mtr15','mtr17','mtr18']
+        mtr_lst= [spec['hitlist'] for spec in REPORTS]
         
         dfs_htlst = []
         
@@ -1615,64 +1532,10 @@ class LandsTracker(QWidget):
     def create_report (self, df_list, sheet_list,out_folder,filename):
         """ Exports dataframes to multi-tab excel spreasheet"""
         out_file= os.path.join('{}'.format(out_folder), filename+'.xlsx')
-        writer = pd.ExcelWriter(out_file,engine='xlsxwriter')
-    
-        for dataframe, sheet in zip(df_list, sheet_list):
-            dataframe = dataframe.reset_index(drop=True)
-            dataframe.index = dataframe.index + 1
-    
-            dataframe.to_excel(writer, sheet_name=sheet, index=False, startrow=0 , startcol=0)
-    
-            worksheet = writer.sheets[sheet]
-            #workbook = writer.book
-            
-            if sheet in ['Summary - NEW Applics','Summary - REP Applics']:
-                worksheet.set_column(0, 0, 11)
-                worksheet.set_column(1, 1, 27)
-                worksheet.set_column(2, 2, 11)
-                worksheet.set_column(3, 3, 37)
-                worksheet.set_column(4, dataframe.shape[1], 10)
-            
-            else:
-                worksheet.set_column(0, dataframe.shape[1], 20)
-    
-            col_names = [{'header': col_name} for col_name in dataframe.columns[:]]
-    
-            worksheet.add_table(0, 0, dataframe.shape[0], dataframe.shape[1]-1, 
-                                {'columns': col_names})
-    
-        writer.save()
-        writer.close()     
-
-
-
-    def add_readme_page(self, readme_xlsx, out_folder, filename):
-        source_workbook = openpyxl.load_workbook(readme_xlsx)
-        source_sheet = source_workbook['README']
-        
-        rpt_xlsx = os.path.join('{}'.format(out_folder), filename+'.xlsx')
-        target_workbook = openpyxl.load_workbook(rpt_xlsx)
-        
-        target_sheet = target_workbook.create_sheet(title=source_sheet.title, index=0)
-        
-        for row in source_sheet.iter_rows():
-            for cell in row:
-                target_cell = target_sheet.cell(row=cell.row, column=cell.col_idx, value=cell.value)
-                if cell.has_style:
-                    target_cell.font = cell.font.copy()
-                    target_cell.border = cell.border.copy()
-                    target_cell.fill = cell.fill.copy()
-                    target_cell.number_format = cell.number_format
-                    target_cell.protection = cell.protection.copy()
-                    target_cell.alignment = cell.alignment.copy()
-    
-        for i, col in enumerate(source_sheet.columns):
-            source_width = source_sheet.column_dimensions[col[0].column_letter].width
-            target_sheet.column_dimensions[get_column_letter(i+1)].width = source_width
-        
-        target_workbook.active = 0
         
-        target_workbook.save(rpt_xlsx)
+        composer = WorkbookComposer (out_file)
+        composer.add_sheets (df_list, sheet_list)
+        composer.save ()
     
     
     
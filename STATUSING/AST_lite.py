@@ -5,6 +5,10 @@ Purpose:     This script checks for overlaps between an AOI and datasets
              
 Notes        The script supports AOIs in TANTALIS Crown Tenure spatial view 
              and User defined AOIs (shp, featureclass).
+             
+             In batch mode, a list of TANTALIS parcel IDs or a multi-feature 
+             AOI file is statused in one run: each dataset is queried once 
+             for all the AOIs and a spreadsheet and maps are generated per AOI.
                
              The script generates a spreadhseet of conflicts and 
              Interactive HTML maps showing the AOI and ovelappng features
@@ -17,6 +21,11 @@ Arguments:   - Output location (workspace)
                     - File number
                     - Disposition ID
                     - Parcel ID
+                    - Batch mode: list of Parcel IDs OR 
+                                  multi-feature AOI file and its ID column
+             - Number of concurrent BCGW sessions (workers)
+             - --resume: resume a failed run from its checkpoint 
+               (completed datasets are not re-run)
                 
 Author:      Moez Labiadh
 Created:     2023-01-12
@@ -28,21 +37,36 @@ import warnings
 warnings.simplefilter(action='ignore')
 
 import os
-import re
 import timeit
-import cx_Oracle
+import argparse
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
-import folium
 import geopandas as gpd
 from shapely import wkt, wkb
+from shapely.geometry.base import BaseGeometry
+from bcgw_metadata_cache import MetadataCache
+from proximity_engine import classify_proximity
+from local_dataset_cache import LocalDatasetCache, get_source_signature
+from overlay_result_cache import OverlayResultCache, get_aoi_hash
+from run_checkpoint import RunCheckpoint
+from overlay_store import OverlayStore, OverlayResults, read_overlay, DEFAULT_BUDGET_MB
+from arrow_query_reader import read_query_arrow, table_to_pandas
+from statusing_rules import load_rules, rules_to_df, get_rules_hash, split_invalid_rules
+from def_query_compiler import compile_def_query
+from proximity_sql import get_band_case
+# cx_Oracle, the map renderer (folium) and the report writer (xlsxwriter)
+# are imported by the stages using them
 #from datetime import datetime
 
 
 
 def connect_to_DB (username,password,hostname):
     """ Returns a connection and cursor to Oracle database"""
+    import cx_Oracle
     try:
         connection = cx_Oracle.connect(username, password, hostname, encoding="UTF-8")
+        connection.outputtypehandler = output_type_handler
         cursor = connection.cursor()
         print  ("....Successffuly connected to the database")
     except:
@@ -52,12 +76,37 @@ def connect_to_DB (username,password,hostname):
 
 
 
+def output_type_handler (cursor, name, default_type, size, precision, scale):
+    """Fetches CLOBs/BLOBs (WKT/WKB geometries) as str/bytes with the rows,
+       instead of LOB locators that need one round-trip each"""
+    import cx_Oracle
+    if default_type == cx_Oracle.DB_TYPE_CLOB:
+        return cursor.var(cx_Oracle.DB_TYPE_LONG, arraysize=cursor.arraysize)
+    if default_type == cx_Oracle.DB_TYPE_BLOB:
+        return cursor.var(cx_Oracle.DB_TYPE_LONG_RAW, arraysize=cursor.arraysize)
+
+
+
+def create_session_pool (username,password,hostname,workers):
+    """ Returns a pool of Oracle sessions shared by the overlay workers"""
+    import cx_Oracle
+    try:
+        pool = cx_Oracle.SessionPool(user=username, password=password, dsn=hostname,
+                                     min=1, max=workers, increment=1, threaded=True,
+                                     getmode=cx_Oracle.SPOOL_ATTRVAL_WAIT,
+                                     encoding="UTF-8")
+        print  ("....Successffuly created a pool of {} sessions".format(workers))
+    except:
+        raise Exception('....Connection failed! Please check your login parameters')
+
+    return pool
+
+
+
 def read_query(connection,cursor,query,bvars):
-    "Returns a df containing SQL Query results"
-    cursor.execute(query, bvars)
-    names = [x[0] for x in cursor.description]
-    rows = cursor.fetchall()
-    df = pd.DataFrame(rows, columns=names)
+    "Returns a df containing SQL Query results. Rows are fetched in Arrow batches"
+    table = read_query_arrow(cursor, query, bvars, batch_size=5000)
+    df = table_to_pandas(table)
     
     return df    
   
@@ -84,19 +133,33 @@ def esri_to_gdf (aoi):
 
 
 def df_2_gdf (df, crs):
-    """ Return a geopandas gdf based on a df with Geometry column"""
-    df['SHAPE'] = df['SHAPE'].astype(str)
-    df['geometry'] = gpd.GeoSeries.from_wkt(df['SHAPE'])
-    gdf = gpd.GeoDataFrame(df, geometry='geometry')
-    #df['geometry'] = df['SHAPE'].apply(wkt.loads)
-    #gdf = gpd.GeoDataFrame(df, geometry = df['geometry'])
-    gdf.crs = "EPSG:" + str(crs)
-    del df['SHAPE']
+    """ Return a geopandas gdf based on a df with Geometry column. 
+        The SHAPE column can hold WKB (bytes), WKT (str) or shapely geometries"""
+    shapes = df['SHAPE']
+    first = shapes.dropna().iloc[0] if shapes.notna().any() else None
+    crs = "EPSG:" + str(crs)
+    
+    if isinstance(first, (bytes, bytearray)):
+        geoms = gpd.GeoSeries.from_wkb(shapes, index=df.index, crs=crs)
+    elif isinstance(first, BaseGeometry):
+        geoms = gpd.GeoSeries(shapes, index=df.index, crs=crs)
+    else:
+        geoms = gpd.GeoSeries.from_wkt(shapes.astype(str), index=df.index, crs=crs)
+    
+    gdf = gpd.GeoDataFrame(df.drop(columns='SHAPE'), geometry=geoms)
     
     return gdf
 
 
 
+def get_search_bbox (gdf_aoi, radius):
+    """Returns the BC Albers bbox of the AOI, expanded by the buffer distance"""
+    xmin,ymin,xmax,ymax = gdf_aoi.to_crs(3005)['geometry'].total_bounds
+    
+    return (xmin-radius, ymin-radius, xmax+radius, ymax+radius)
+
+
+
 def multipart_to_singlepart(gdf):
     """Converts a multipart gdf to singlepart gdf """
     gdf['dissolvefield'] = 1
@@ -126,108 +189,88 @@ def get_wkb_srid (gdf):
 
 
 
+def prepare_batch_aois (gdf, id_col):
+    """Returns a gdf with one (singlepart) feature per AOI ID"""
+    gdf = gdf.rename(columns={id_col: 'AOI_ID'})
+    gdf['AOI_ID'] = gdf['AOI_ID'].astype(str)
+    gdf = gdf.dissolve(by='AOI_ID').reset_index()
+    gdf = gdf[['AOI_ID','geometry']]
+    
+    return gdf
+
+
+
+def get_batch_wkb_srid (gdf):
+    """Returns the AOI IDs, WKB objects and SRID of a batch AOI gdf"""
+    srid = gdf.crs.to_epsg()
+    
+    aoi_ids = gdf['AOI_ID'].tolist()
+    wkb_aois = []
+    for geom in gdf['geometry']:
+        # if geometry has Z values, flatten geometry
+        wkb_aois.append(wkb.dumps(geom, output_dimension=2))
+    
+    return aoi_ids, wkb_aois, srid
+
+
+
 def read_input_spreadsheets (wksp_xls,region):
-    """Returns input spreadhseets"""
+    """Returns the rules of the input spreadhseets (compiled and cached)"""
     common_xls = os.path.join(wksp_xls, 'one_status_common_datasets.xlsx')
     region_xls = os.path.join(wksp_xls, 'one_status_{}_specific.xlsx'.format(region.lower()))
     
-    df_stat_c = pd.read_excel(common_xls)
-    df_stat_r = pd.read_excel(region_xls)
+    rules = load_rules ([common_xls, region_xls])
     
-    df_stat = pd.concat([df_stat_c, df_stat_r])
-    df_stat.dropna(how='all', inplace=True)
-    
-    df_stat = df_stat.reset_index(drop=True)
-    
-    return df_stat
+    return rules
     
     
 
-def get_table_cols (item_index,df_stat):
-    """Returns table and field names from the AST datasets spreadsheet"""
-    #df_stat = df_stat.loc[df_stat['Featureclass_Name(valid characters only)'] == item]
-    df_stat_item = df_stat.loc[[item_index]]
-    df_stat_item.fillna(value='nan',inplace=True)
-
-    table = df_stat_item['Datasource'].iloc[0].strip()
+def get_table_cols (rule):
+    """Returns table and field names from the AST datasets spreadsheet rule"""
+    table = rule.table
+    fields = list(rule.fields)
     
-    fields = []
-    fields.append(str(df_stat_item['Fields_to_Summarize'].iloc[0].strip()))
-
-    for f in range (2,7):
-        for i in df_stat_item['Fields_to_Summarize' + str(f)].tolist():
-            if i != 'nan':
-                fields.append(str(i.strip()))
-
-    col_lbl = df_stat_item['map_label_field'].iloc[0].strip()
-    
-    if col_lbl != 'nan' and col_lbl not in fields:
-        fields.append(col_lbl)
+    col_lbl = rule.label or 'nan'
     
-    if table.startswith('WHSE') or table.startswith('REG'):       
+    if rule.is_bcgw:       
+        # empty column names in the COMMON AST input spreadsheet
+        if len(fields) == 0:
+            fields = ['OBJECTID']
         cols = ','.join('b.' + x for x in fields)
-
-        # TEMPORARY FIX:  for empty column names in the COMMON AST input spreadsheet
-        if cols == 'b.nan':
-            cols = 'b.OBJECTID'
     else:
         cols = fields
-        # TEMPORARY FIX:  for empty column names in the REGION AST input spreadsheet
-        if cols[0] == 'nan':
-            cols = []
     
     return table, cols, col_lbl
 
           
 
-def get_def_query (item_index,df_stat):
-    """Returns an ORacle SQL formatted def query (if any) from the AST datasets spreadsheet"""
-    #df_stat = df_stat.loc[df_stat['Featureclass_Name(valid characters only)'] == item]
-    df_stat_item = df_stat.loc[[item_index]]
-    df_stat_item.fillna(value='nan',inplace=True)
-
-    def_query = df_stat_item['Definition_Query'].iloc[0].strip()
-
-    def_query = def_query.strip()
+def get_def_query (rule):
+    """Returns an ORacle SQL formatted def query (if any) from the AST datasets spreadsheet rule
+       and its bind variables. Literals of the def query are passed as binds
+       (def queries the compiler does not support are passed as is)"""
+    compiled = compile_def_query (rule.def_query, fallback=True)
     
-    if def_query == 'nan':
+    if compiled.sql == '':
         def_query = " "
-        
     else:
-       def_query = def_query.replace('"', '')
-       def_query = re.sub(r'(\bAND\b)', r'\1 b.', def_query)
-       def_query = re.sub(r'(\bOR\b)', r'\1 b.', def_query)
-       
-       if def_query[0] == "(":
-           def_query = def_query.replace ("(", "(b.") 
-           def_query = "(" + def_query + ")"
-       else:
-           def_query = "b." + def_query
-    
-       def_query = 'AND (' + def_query + ')'
-    
+        def_query = 'AND ' + compiled.sql
     
-    return def_query
+    return def_query, dict(compiled.binds)
 
 
 
-def get_radius (item_index, df_stat):
-    """Returns the buffer distance (if any) from the AST common datasets spreadsheet"""
-    #df_stat = df_stat.loc[df_stat['Featureclass_Name(valid characters only)'] == item]
-    df_stat_item = df_stat.loc[[item_index]]
-    df_stat_item.fillna(value=0,inplace=True)
-    df_stat_item['Buffer_Distance'] = df_stat_item['Buffer_Distance'].astype(int)
-    radius = df_stat_item['Buffer_Distance'].iloc[0]
+def get_radius (rule):
+    """Returns the buffer distance (if any) from the AST datasets spreadsheet rule"""
     
-    return radius
-
+    return rule.radius
 
 
+    
 def load_queries ():
     sql = {}
 
     sql ['aoi'] = """
-                    SELECT SDO_UTIL.TO_WKTGEOMETRY(a.SHAPE) SHAPE
+                    SELECT SDO_UTIL.TO_WKBGEOMETRY(a.SHAPE) SHAPE
                     
                     FROM  WHSE_TANTALIS.TA_CROWN_TENURES_SVW a
                     
@@ -235,208 +278,466 @@ def load_queries ():
                         AND a.DISPOSITION_TRANSACTION_SID = :disp_id
                         AND a.INTRID_SID = :parcel_id
                   """
-                        
-    sql ['geomCol'] = """
-                    SELECT column_name GEOM_NAME
-                    
-                    FROM  ALL_SDO_GEOM_METADATA
+    
+    sql ['aoi_batch'] = """
+                    SELECT TO_CHAR(a.INTRID_SID) AOI_ID,
+                           SDO_UTIL.TO_WKBGEOMETRY(a.SHAPE) SHAPE
                     
-                    WHERE owner = :owner
-                        AND table_name = :tab_name
-                        
-          
-                    """    
+                    FROM  WHSE_TANTALIS.TA_CROWN_TENURES_SVW a
                     
-    sql ['srid'] = """
-                    SELECT s.{geom_col}.sdo_srid SP_REF
-                    FROM {tab} s
-                    WHERE rownum = 1
-                   """
+                    WHERE a.INTRID_SID IN ({parcel_binds})
+                  """
                            
+    # distances are computed once in the inline view (p), then labelled 
+    # with the distance bands CASE expression (band_case)
     sql ['overlay'] = """
-                    SELECT {cols},
-                    
-                           CASE WHEN SDO_GEOM.SDO_DISTANCE(b.{geom_col}, a.SHAPE, 0.5) = 0 
-                            THEN 'INTERSECT' 
-                             ELSE 'Within ' || TO_CHAR({radius}) || ' m'
-                              END AS RESULT,
-                              
-                           SDO_UTIL.TO_WKTGEOMETRY(b.{geom_col}) SHAPE
+                    SELECT p.*, {band_case} AS RESULT
                     
-                    FROM WHSE_TANTALIS.TA_CROWN_TENURES_SVW a, {tab} b
-                    
-                    WHERE a.CROWN_LANDS_FILE = :file_nbr
-                        AND a.DISPOSITION_TRANSACTION_SID = :disp_id
-                        AND a.INTRID_SID = :parcel_id
+                    FROM (
+                        SELECT {cols},
+                               SDO_GEOM.SDO_DISTANCE(b.{geom_col}, a.SHAPE, 0.5) PROXIMITY_METERS,
+                               SDO_UTIL.TO_WKBGEOMETRY(b.{geom_col}) SHAPE
                         
-                        AND SDO_WITHIN_DISTANCE (b.{geom_col}, a.SHAPE,'distance = {radius}') = 'TRUE'
+                        FROM WHSE_TANTALIS.TA_CROWN_TENURES_SVW a, {tab} b
                         
-                        {def_query}  
+                        WHERE a.CROWN_LANDS_FILE = :file_nbr
+                            AND a.DISPOSITION_TRANSACTION_SID = :disp_id
+                            AND a.INTRID_SID = :parcel_id
+                            
+                            AND SDO_WITHIN_DISTANCE (b.{geom_col}, a.SHAPE,'distance = {radius}') = 'TRUE'
+                            
+                            {def_query}  
+                         ) p
                     """ 
                                        
     sql ['overlay_wkb'] = """
-                    SELECT {cols},
+                    SELECT p.*, {band_case} AS RESULT
                     
-                           CASE WHEN SDO_GEOM.SDO_DISTANCE(b.{geom_col}, SDO_GEOMETRY(:wkb_aoi, :srid_t), 0.5) = 0 
-                            THEN 'INTERSECT' 
-                             ELSE 'Within ' || TO_CHAR({radius}) || ' m'
-                              END AS RESULT,
-                              
-                           SDO_UTIL.TO_WKTGEOMETRY(b.{geom_col}) SHAPE
+                    FROM (
+                        SELECT {cols},
+                               SDO_GEOM.SDO_DISTANCE(b.{geom_col}, SDO_GEOMETRY(:wkb_aoi, :srid_t), 0.5) PROXIMITY_METERS,
+                               SDO_UTIL.TO_WKBGEOMETRY(b.{geom_col}) SHAPE
+                        
+                        FROM {tab} b
+                        
+                        WHERE SDO_WITHIN_DISTANCE (b.{geom_col}, 
+                                                   SDO_GEOMETRY(:wkb_aoi, :srid),'distance = {radius}') = 'TRUE'
+                            {def_query}   
+                         ) p
+                    """ 
+    
+    # one row per AOI is generated by build_aoi_union() and added to the WITH clause
+    sql ['aoi_union_row'] = """SELECT :aoi_id{i} AOI_ID, 
+                                      SDO_GEOMETRY(:wkb_aoi{i}, :srid) SHAPE,
+                                      SDO_GEOMETRY(:wkb_aoi{i}, :srid_t) SHAPE_T
+                               FROM DUAL"""
+    
+    sql ['overlay_wkb_batch'] = """
+                    WITH aoi AS ({aoi_union})
                     
-                    FROM {tab} b
+                    SELECT p.*, {band_case} AS RESULT
                     
-                    WHERE SDO_WITHIN_DISTANCE (b.{geom_col}, 
-                                               SDO_GEOMETRY(:wkb_aoi, :srid),'distance = {radius}') = 'TRUE'
-                        {def_query}   
+                    FROM (
+                        SELECT a.AOI_ID, {cols},
+                               SDO_GEOM.SDO_DISTANCE(b.{geom_col}, a.SHAPE_T, 0.5) PROXIMITY_METERS,
+                               SDO_UTIL.TO_WKBGEOMETRY(b.{geom_col}) SHAPE
+                        
+                        FROM aoi a, {tab} b
+                        
+                        WHERE SDO_WITHIN_DISTANCE (b.{geom_col}, a.SHAPE,'distance = {radius}') = 'TRUE'
+                            {def_query}   
+                         ) p
                     """ 
     return sql
 
 
 
-def get_geom_colname (connection,cursor,table,geomQuery):
-    """ Returns the geometry column of BCGW table name: can be either SHAPE or GEOMETRY"""
-    el_list = table.split('.')
-
-    bvars_geom = {'owner':el_list[0].strip(),
-                  'tab_name':el_list[1].strip()}
-    df_g = read_query(connection,cursor,geomQuery, bvars_geom)
+def build_aoi_union (sql,aoi_count):
+    """Returns the UNION ALL of AOI rows used in the batch overlay query"""
+    rows = [sql ['aoi_union_row'].format(i=i) for i in range(aoi_count)]
+    aoi_union = ' UNION ALL '.join(rows)
     
-    geom_col = df_g['GEOM_NAME'].iloc[0]
+    return aoi_union
 
-    return geom_col
 
 
+def get_geom_colname (cursor,table,md_cache):
+    """ Returns the geometry column of BCGW table name: can be either SHAPE or GEOMETRY"""
+    geom_col = md_cache.get_geom_colname(cursor,table)
+
+    return geom_col
+
 
-def get_geom_srid (connection,cursor,table,geom_col,sridQuery):
-    """ Returns the SRID of the BCGW table"""
 
-    sridQuery = sridQuery.format(tab=table,geom_col=geom_col)
-    df_s = read_query(connection,cursor,sridQuery,{})
+def get_geom_srid (cursor,table,md_cache):
+    """ Returns the SRID of the BCGW table. Defaults to 3005 if unknown"""
+    srid_t = md_cache.get_geom_srid(cursor,table)
     
-    srid_t = df_s['SP_REF'].iloc[0]
+    if srid_t is None:
+        srid_t = 3005
 
     return srid_t
 
 
 
-def make_status_map (gdf_aoi, gdf_intr, col_lbl, item, workspace):
-    """ Generates HTML Interactive maps of AOI and intersection geodataframes"""
+def run_overlay (connection,cursor,sql,md_cache,ds_cache,rs_cache,rule,input_src,aoi_vars,gdf_aoi):
+    """Runs the overlay analysis of one AST dataset. Returns the overlay results,
+       the result columns and the map label column"""
+    import cx_Oracle
+    print ('.....getting table and column names')
+    table, cols, col_lbl = get_table_cols (rule)
     
-    m = folium.Map(tiles='openstreetmap')
-    xmin,ymin,xmax,ymax = gdf_aoi.to_crs(4326)['geometry'].total_bounds
-    m.fit_bounds([[ymin, xmin], [ymax, xmax]])
-
-    gdf_aoi.explore(
-         m=m,
-         tooltip= False,
-         style_kwds=dict(fill= False, color="red", weight=3),
-         name="AOI")
+    print ('.....getting definition query (if any)')
+    def_query, def_binds = get_def_query (rule)
 
-    gdf_intr.explore(
-         m=m,
-         column= col_lbl, 
-         tooltip= col_lbl, 
-         popup=True, 
-         cmap="Dark2",  
-         style_kwds=dict(color="gray"),
-         name=item)
-	
-    folium.TileLayer('stamenterrain', control=True).add_to(m)
-    folium.LayerControl().add_to(m)
+    print ('.....getting buffer distance (if any)')
+    radius = get_radius (rule)
     
-    maps_dir = os.path.join(workspace,'maps')
-    if not os.path.exists(maps_dir):
-        os.makedirs(maps_dir)
+    if rule.is_bcgw:
+        version = ''
+    else:
+        try:
+            version = get_source_signature (table)
+        except:
+            version = ''
+    
+    cache_key = rs_cache.make_key (aoi_vars['aoi_hash'],table,def_query + repr(sorted(def_binds.items())),
+                                   radius,cols,version)
+    overlay = rs_cache.get (cache_key)
+    
+    if overlay is not None:
+        print ('.....using cached overlay results.')
+        return overlay
+     
+    print ('.....running Overlay Analysis.')
+    
+    if rule.is_bcgw: 
+        geom_col = get_geom_colname (cursor,table,md_cache)
+        srid_t = get_geom_srid (cursor,table,md_cache)
+        
+        # one index scan at the buffer distance, hits labelled by distance band
+        band_case = get_band_case ([0, radius], band_label='Within {} m')
         
-    out_html = os.path.join(maps_dir, item +'.html')
-    m.save(out_html)
- 
+        if input_src == 'TANTALIS':
+            query= sql ['overlay'].format (cols=cols,tab=table,radius=radius,band_case=band_case,
+                                             geom_col=geom_col,def_query=def_query)
+            bvars_intr = {'file_nbr':aoi_vars['file_nbr'],
+                          'disp_id':aoi_vars['disp_id'],'parcel_id': aoi_vars['parcel_id']}
+        
+        elif input_src == 'BATCH':
+            aoi_union = build_aoi_union (sql,len(aoi_vars['aoi_ids']))
+            query= sql ['overlay_wkb_batch'].format (aoi_union=aoi_union,cols=cols,tab=table,
+                                                       radius=radius,band_case=band_case,geom_col=geom_col,
+                                                       def_query=def_query)
+            bvars_intr = {'srid':aoi_vars['srid'],'srid_t':str(srid_t)}
+            blob_sizes = {}
+            for i, (aoi_id, wkb_aoi) in enumerate(zip(aoi_vars['aoi_ids'],aoi_vars['wkb_aois'])):
+                bvars_intr['aoi_id{}'.format(i)] = aoi_id
+                bvars_intr['wkb_aoi{}'.format(i)] = wkb_aoi
+                blob_sizes['wkb_aoi{}'.format(i)] = cx_Oracle.BLOB
+            cursor.setinputsizes(**blob_sizes) # set the WKBs as oracle BLOBs
+            
+        else:
+            query= sql ['overlay_wkb'].format (cols=cols,tab=table,radius=radius,band_case=band_case,
+                                                 geom_col=geom_col,def_query=def_query)
+            cursor.setinputsizes(wkb_aoi=cx_Oracle.BLOB) # set the WKB as oracle BLOB
+            bvars_intr = {'wkb_aoi':aoi_vars['wkb_aoi'],'srid':aoi_vars['srid'],
+                          'srid_t':str(srid_t)}
+            
+        bvars_intr.update(def_binds)
+        df_all= read_query(connection,cursor,query,bvars_intr) 
+        
+            
+    else:
+        try:
+            bbox = get_search_bbox (gdf_aoi, radius)
+            gdf_trg = ds_cache.read (table, esri_to_gdf, bbox=bbox)
+            
+            if not gdf_trg.crs.to_epsg() == 3005:
+                gdf_trg = gdf_trg.to_crs({'init': 'epsg:3005'})
+                
+            if input_src == 'BATCH':
+                aoi_id_col = 'AOI_ID'
+            else:
+                aoi_id_col = None
+            
+            gdf_intr = classify_proximity (gdf_aoi, gdf_trg, [0, radius], aoi_id_col=aoi_id_col)
+            
+            
+            # TEMPORARY FIX:  for Empty/Wrong column names in the REGION AST input spreadsheet
+            gdf_cols = [col for col in gdf_trg.columns]  
+            diffs = list(set(cols).difference(gdf_cols))
+            for diff in diffs:
+                cols.remove(diff)
+            if len(cols) ==0:
+                cols.append(gdf_trg.columns[0])
+             
+            df_all = pd.DataFrame(gdf_intr)
+            
+            df_all.rename(columns={'geometry':'SHAPE'},inplace=True)
+            
+        except:
+            print ('.......ERROR: the Source Dataset does NOT exist!')
+            df_all = pd.DataFrame([])
+    
+    
+    if isinstance(cols, str) == True:
+        l = cols.split(",")
+        cols = [x[2:] for x in l]
+
+    cols.append('RESULT')
+    
+    if input_src == 'BATCH':
+        cols.insert(0,'AOI_ID')
+    
+    overlay = (df_all, cols, col_lbl)
+    
+    # failed reads of local datasets are not cached
+    if df_all.shape[1] > 0:
+        rs_cache.put (cache_key, overlay)
+    
+    return overlay
+
 
 
-def write_xlsx (results,df_stat,workspace):
-    """Writes results to a spreadsheet"""
-    df_res= df_stat[['Category', 'Featureclass_Name(valid characters only)']]   
-    df_res.rename(columns={'Featureclass_Name(valid characters only)': 'item'}, inplace=True)
-    df_res['List of conflicts'] = ""
-    df_res['Map'] = ""
+def load_checkpoint (checkpoint,store,rules):
+    """Adds the overlay results completed in a previous run to the store 
+       (left on disk). Returns the rules of the remaining datasets"""
+    remaining = []
+    for rule in rules:
+        if checkpoint.is_done(rule.index):
+            store.add_checkpointed(rule.index)
+        else:
+            remaining.append(rule)
     
-    for index, row in df_res.iterrows():
-        for k, v in  results.items():
-            if row['item'] == k and v.shape[0]>0:
-                v = v.drop('RESULT', axis=1)
-                v['Result'] = v[v.columns].apply(lambda row: ','.join(row.values.astype(str)), axis=1)
-                res_all = " ; ".join (str(x) for x in v['Result'].to_list()) 
-                df_res.loc[index, 'List of conflicts'] = res_all
-                df_res.loc[index, 'Map'] = '=HYPERLINK("{}", "View Map")'.format(os.path.join(workspace,'maps',k+'.html'))
+    return remaining
+
 
-    filename = os.path.join(workspace, 'AST_lite_TAB3.xlsx')
-    sheetname = 'Conflicts & Constraints'
-    writer = pd.ExcelWriter(filename, engine='xlsxwriter')        
-    df_res.to_excel(writer, sheet_name=sheetname, index=False, startrow=0 , startcol=0)
+
+def save_checkpoint (checkpoint,index,item,overlay):
+    """Checkpoints the overlay results of a dataset"""
+    df_all = overlay[0]
     
-    workbook=writer.book
-    worksheet = writer.sheets[sheetname]
+    # failed reads of local datasets are re-run on resume
+    if df_all.shape[1] > 0:
+        checkpoint.save(index,item,overlay)
+
+
+
+def run_overlays_serial (connection,cursor,sql,md_cache,ds_cache,rs_cache,checkpoint,store,rules,input_src,aoi_vars,gdf_aoi):
+    """Runs the overlay analysis of all AST datasets, one after another, 
+       on a single database session. Results are added to the store"""
+    remaining = load_checkpoint (checkpoint,store,rules)
     
-    txt_format = workbook.add_format({'text_wrap': True})
-    lnk_format = workbook.add_format({'underline': True, 'font_color': 'blue'})
-    worksheet.set_column(0, 0, 30)
-    worksheet.set_column(1, 1, 60)
-    worksheet.set_column(2, 2, 80, txt_format)
-    worksheet.set_column(3, 3, 20)
+    item_count = len(rules)
+    counter = len(store) + 1
+    for rule in remaining:
+        print ('\n****working on item {} of {}: {}***'.format(counter,item_count,rule.item))
+        
+        overlay = run_overlay (connection,cursor,sql,md_cache,ds_cache,rs_cache,rule,
+                               input_src,aoi_vars,gdf_aoi)
+        save_checkpoint (checkpoint,rule.index,rule.item,overlay)
+        store.add(rule.index,overlay)
+        counter += 1
+        
+    return store
+
+
+
+def overlay_worker (pool,sql,md_cache,ds_cache,rs_cache,rule,input_src,aoi_vars,gdf_aoi):
+    """Runs the overlay analysis of one AST dataset on a session 
+       acquired from the pool"""
+    connection = pool.acquire()
+    connection.outputtypehandler = output_type_handler
+    try:
+        cursor = connection.cursor()
+        overlay = run_overlay (connection,cursor,sql,md_cache,ds_cache,rs_cache,rule,
+                               input_src,aoi_vars,gdf_aoi)
+        cursor.close()
+    finally:
+        pool.release(connection)
+        
+    return overlay
+
+
+
+def run_overlays_concurrent (pool,sql,md_cache,ds_cache,rs_cache,checkpoint,store,rules,input_src,aoi_vars,gdf_aoi,workers):
+    """Runs the overlay analysis of all AST datasets concurrently. Each worker
+       thread uses its own session from the pool. Results are added to the store"""
+    remaining = load_checkpoint (checkpoint,store,rules)
+    errors = []
     
-    worksheet.conditional_format('D2:D{}'.format (df_res.shape[0]+1), 
-                                 {'type': 'cell',
-                                  'criteria' : 'equal to', 
-                                  'value' : '"View Map"',
-                                  'format' : lnk_format})
+    item_count = len(rules)
+    counter = len(store) + 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(overlay_worker, pool, sql, md_cache, ds_cache, rs_cache, rule,
+                                   input_src, aoi_vars, gdf_aoi): rule 
+                   for rule in remaining}
+        
+        for future in as_completed(futures):
+            rule = futures[future]
+            index, item = rule.index, rule.item
+            
+            # keep checkpointing the other datasets if one fails
+            try:
+                overlay = future.result()
+            except Exception as e:
+                print ('\n****ERROR on item {}: {}***'.format(item,e))
+                errors.append(e)
+                continue
+            
+            save_checkpoint (checkpoint,index,item,overlay)
+            store.add(index,overlay)
+            print ('\n****completed item {} of {}: {}***'.format(counter,item_count,item))
+            counter += 1
     
-    col_names = [{'header': col_name} for col_name in df_res.columns]
-    worksheet.add_table(0, 0, df_res.shape[0]+1, df_res.shape[1]-1,{'columns': col_names})
+    if len(errors) > 0:
+        raise errors[0]
     
-    writer.save()
-    writer.close()
+    return store
 
 
+
+def prepare_map_layer (df_all,col_lbl):
+    """Returns the overlay results of a dataset as a gdf ready for mapping"""
+    gdf_intr = df_2_gdf (df_all, 3005)
     
-def execute_status ():
-    """Executes the AST light process """
-    start_t = timeit.default_timer() #start time
+    # datetime columns are causing errors when plotting in Folium. Converting them to str
+    for col in gdf_intr.columns:
+        if gdf_intr[col].dtype == 'datetime64[ns]':
+            gdf_intr[col] = gdf_intr[col].astype(str)
     
-    #user inputs
-    workspace = r"\\spatialfiles.bcgov\Work\lwbc\visr\Workarea\moez_labiadh\TOOLS\SCRIPTS\STATUSING\results_demo"
-    aoi = r'\\spatialfiles.bcgov\Work\lwbc\visr\Workarea\moez_labiadh\TOOLS\SCRIPTS\STATUSING\test_data\aoi_test.shp'
-    input_src = 'AOI' # Possible values are "TANTALIS" and AOI
+    gdf_intr[col_lbl] = gdf_intr[col_lbl].astype(str) 
     
+    return gdf_intr
+
+
+
+def load_map_layer (path,col_lbl,aoi_id=None):
+    """Returns the spilled overlay results of a dataset as a gdf ready for mapping"""
+    return prepare_map_layer (read_overlay (path,aoi_id),col_lbl)
+
+
+
+def make_outputs (store,df_stat,gdf_aoi,workspace,map_mode='maps',map_workers=None,aoi_id=None,invalid=None):
+    """Generates the maps and spreadsheet of the overlay results in the store
+       (of one AOI of a batch run if aoi_id is provided). 
+       map_mode: 'maps': one HTML map per dataset
+                 'index': one index map, datasets are loaded when toggled on
+                 'none': spreadsheet only
+       invalid: issues of the rules that were not run (index: issues), 
+                listed in the spreadsheet
+       Returns the results mapping (item: results), read from the store on access"""
+    from status_report_writer import INDEX_MAP, get_chunked_conflicts, write_conflicts_xlsx
     
-    print ('Connecting to BCGW.')
-    hostname = 'bcgw.bcgov/idwprod1.bcgov'
-    bcgw_user = os.getenv('bcgw_user')
-    #bcgw_user = 'XXXX'
-    bcgw_pwd = os.getenv('bcgw_pwd')
-    #bcgw_pwd = 'XXXX'
-    connection, cursor = connect_to_DB (bcgw_user,bcgw_pwd,hostname)
+    if not os.path.exists(workspace):
+        os.makedirs(workspace)
     
-    print ('\nLoading SQL queries')
-    sql = load_queries ()
+    items = {} # AST dataset of each item
+    conflicts = {} # list of conflicts of the datasets with results
+    not_run = {} # reason of the datasets that were not run
+    layers = [] # map layers, rendered once all the results are collected
+    invalid = invalid or {}
     
+    # results are added in the order of the AST datasets spreadsheet
+    for index, row in df_stat.iterrows():
+        item = row['Featureclass_Name(valid characters only)']
+        if index in invalid:
+            not_run[item] = 'invalid rule: ' + ' ; '.join(invalid[index])
+            continue
+        items[item] = index
+        cols, col_lbl = store.get_cols (index,aoi_id)
+        
+        ov_nbr = store.count (index,aoi_id)
+        print ('\n{}: number of overlaps: {}'.format(item,ov_nbr))
+        
+        # spilled results are read back in chunks
+        if ov_nbr > 0:
+            conflicts[item] = get_chunked_conflicts (store.iter_chunks (index,aoi_id))
+        
+        if ov_nbr > 0 and map_mode != 'none':
+            print ('.....preparing a map.')
+            # FIX FOR MISSING LABEL COLUMN NAME
+            if col_lbl == 'nan': 
+                col_lbl = cols[0]
+            
+            if store.is_spilled (index):
+                layers.append((item, partial(load_map_layer, store.get_path(index), col_lbl, aoi_id), col_lbl))
+            else:
+                df_all = store.get (index,aoi_id)[0]
+                layers.append((item, prepare_map_layer (df_all,col_lbl), col_lbl))
+    
+    if map_mode == 'index':
+        from status_map_renderer import render_index_map
+        print ('\nGenerating the index map')
+        render_index_map (gdf_aoi, layers, os.path.join(workspace,'maps'), filename=INDEX_MAP)
+    elif map_mode == 'maps':
+        from status_map_renderer import render_status_maps
+        print ('\nGenerating {} maps'.format(len(layers)))
+        render_status_maps (gdf_aoi, layers, os.path.join(workspace,'maps'), workers=map_workers)
     
-    print ('\nReading User inputs: AOI.')
+    print ('\nWriting Results to spreadsheet')
+    write_conflicts_xlsx (conflicts,df_stat,workspace,map_mode,not_run)
+    
+    return OverlayResults (store,items,aoi_id)
+
+
+
+def read_aoi (connection,cursor,sql,job):
+    """Returns the AOI gdf, the AOI variables (binds and hash) and the 
+       input source of a statusing job"""
+    input_src = job['input_src']
+    
+    if job.get('batch_mode', False):
+        if input_src == 'AOI':
+            print('....Reading the AOI file (batch mode)')
+            gdf_aoi = esri_to_gdf (job['aoi'])
+            gdf_aoi = prepare_batch_aois (gdf_aoi, job['aoi_id_col'])
+            
+        elif input_src == 'TANTALIS':
+            in_prclIDs = job['parcel_ids']
+            print ('....input Parcel IDs: {}'.format(in_prclIDs))
+            parcel_binds = ','.join(':p{}'.format(i) for i in range(len(in_prclIDs)))
+            bvars_aoi = {'p{}'.format(i): prcl for i, prcl in enumerate(in_prclIDs)}
+            
+            df_aoi= read_query(connection,cursor,sql ['aoi_batch'].format(parcel_binds=parcel_binds),
+                               bvars_aoi)
+            
+            missing = set(str(x) for x in in_prclIDs).difference(df_aoi['AOI_ID'])
+            if len(missing) > 0:
+                raise Exception('Parcels not in TANTALIS: {}. Please check inputs!'.format(sorted(missing)))
+            
+            # a parcel can be shared by several dispositions
+            gdf_aoi = df_2_gdf (df_aoi, 3005)
+            gdf_aoi = prepare_batch_aois (gdf_aoi, 'AOI_ID')
+            
+        else:
+            raise Exception('Possible input sources are TANTALIS and AOI!')
+        
+        print ('....{} AOIs to status'.format(gdf_aoi.shape[0]))
+        aoi_ids, wkb_aois, srid = get_batch_wkb_srid (gdf_aoi)
+        aoi_vars = {'aoi_ids': aoi_ids, 'wkb_aois': wkb_aois, 'srid': srid,
+                    'aoi_hash': get_aoi_hash (gdf_aoi, 'AOI_ID')}
+        input_src = 'BATCH'
+        
     
-    if input_src == 'AOI':
+    elif input_src == 'AOI':
         print('....Reading the AOI file')
-        gdf_aoi = esri_to_gdf (aoi)
+        gdf_aoi = esri_to_gdf (job['aoi'])
     
         if gdf_aoi.shape[0] > 1:
             gdf_aoi =  multipart_to_singlepart(gdf_aoi)
         
         wkb_aoi, srid = get_wkb_srid (gdf_aoi)
         
+        aoi_vars = {'wkb_aoi': wkb_aoi, 'srid': srid, 
+                    'aoi_hash': get_aoi_hash (gdf_aoi)}
+        
         
     elif input_src == 'TANTALIS':
-        in_fileNbr = '1413583'
-        in_dispID = 892661
-        in_prclID = 911845
+        in_fileNbr = job['file_nbr']
+        in_dispID = job['disp_id']
+        in_prclID = job['parcel_id']
         print ('....input File Number: {}'.format(in_fileNbr))
         print ('....input Disposition ID: {}'.format(in_dispID))
         print ('....input Parcel ID: {}'.format(in_prclID))
@@ -451,147 +752,148 @@ def execute_status ():
             
         else:
             gdf_aoi = df_2_gdf (df_aoi, 3005)
+        
+        aoi_vars = dict(bvars_aoi, aoi_hash=get_aoi_hash (gdf_aoi))
     
                 
     else:
         raise Exception('Possible input sources are TANTALIS and AOI!')
     
-    print ('\nReading the AST datasets spreadsheet.')
-    wksp_xls = r'\\GISWHSE.ENV.GOV.BC.CA\whse_np\corp\script_whse\python\Utility_Misc\Ready\statusing_tools_arcpro\statusing_input_spreadsheets'
-    region = 'west_coast' #**************USER INPUT: REGION*************
-    print ('....Region is {}'.format (region))
-    df_stat = read_input_spreadsheets (wksp_xls,region)
+    return gdf_aoi, aoi_vars, input_src
+
+
+
+def run_status (sql,md_cache,ds_cache,rs_cache,rules,job,pool=None,connection=None,cursor=None,workers=1):
+    """Runs the overlays and generates the outputs of a statusing job, on an open
+       connection (workers=1) or on a session pool (workers > 1). 
+       Returns the results dictionnary"""
+    workspace = job['workspace']
     
+    print ('\nReading User inputs: AOI.')
+    if pool is not None:
+        connection = pool.acquire()
+        connection.outputtypehandler = output_type_handler
+        cursor = connection.cursor()
+        try:
+            gdf_aoi, aoi_vars, input_src = read_aoi (connection,cursor,sql,job)
+        finally:
+            cursor.close()
+            pool.release(connection)
+    else:
+        gdf_aoi, aoi_vars, input_src = read_aoi (connection,cursor,sql,job)
     
+    df_stat = rules_to_df (rules)
     
-    print ('\nRunning the analysis.')
-    results = {} # this dictionnary will hold the overlay results
+    # invalid rules are not run: they are listed in the spreadsheet
+    rules, invalid = split_invalid_rules (rules)
+    for index, issues in invalid.items():
+        for issue in issues:
+            print ('....WARNING: dataset not run: {}'.format(issue))
     
-    item_count = df_stat.shape[0]
-    counter = 1
-    for index, row in df_stat.iterrows():
-        item = row['Featureclass_Name(valid characters only)']
-        item_index = index
-        
-        print ('\n****working on item {} of {}: {}***'.format(counter,item_count,item))
-        
-        print ('.....getting table and column names')
-        table, cols, col_lbl = get_table_cols (item_index,df_stat)
-        
-        print ('.....getting definition query (if any)')
-        def_query = get_def_query (item_index,df_stat)
+    print ('\nPreparing the run checkpoint')
+    run_dir = os.path.join(workspace, 'run_checkpoint')
+    run_key = '|'.join([aoi_vars['aoi_hash'], job['region'], input_src, get_rules_hash (rules)])
+    checkpoint = RunCheckpoint (run_dir, run_key, resume=job.get('resume', False))
     
-        print ('.....getting buffer distance (if any)')
-        radius = get_radius (item_index, df_stat)  
-         
-        print ('.....running Overlay Analysis.')
-        
-        if table.startswith('WHSE') or table.startswith('REG'): 
-            geomQuery = sql ['geomCol']
-            sridQuery = sql ['srid']
-            geom_col = get_geom_colname (connection,cursor,table,geomQuery)
-            
-            try:
-                srid_t = get_geom_srid (connection,cursor,table,geom_col,sridQuery) 
-            except:
-                srid_t = 3005
-            
-            if input_src == 'TANTALIS':
-                query= sql ['overlay'].format (cols=cols,tab=table,radius=radius,
-                                                 geom_col=geom_col,def_query=def_query)
-                bvars_intr = {'file_nbr':in_fileNbr,
-                              'disp_id':in_dispID,'parcel_id': in_prclID}
-            else:
-                query= sql ['overlay_wkb'].format (cols=cols,tab=table,radius=radius,
-                                                     geom_col=geom_col,def_query=def_query)
-                cursor.setinputsizes(wkb_aoi=cx_Oracle.BLOB) # set the WKB as oracle BLOB
-                bvars_intr = {'wkb_aoi':wkb_aoi,'srid':srid,'srid_t':str(srid_t)}
-                
-            df_all= read_query(connection,cursor,query,bvars_intr) 
-            
-                
-        else:
-            try:
-                gdf_trg = esri_to_gdf (table)
-                
-                if not gdf_trg.crs.to_epsg() == 3005:
-                    gdf_trg = gdf_trg.to_crs({'init': 'epsg:3005'})
-                    
-                gdf_intr = gpd.overlay(gdf_aoi, gdf_trg, how='intersection')
-                
-                
-                # TEMPORARY FIX:  for Empty/Wrong column names in the REGION AST input spreadsheet
-                gdf_cols = [col for col in gdf_trg.columns]  
-                diffs = list(set(cols).difference(gdf_cols))
-                for diff in diffs:
-                    cols.remove(diff)
-                if len(cols) ==0:
-                    cols.append(gdf_trg.columns[0])
-                 
-                df_intr = pd.DataFrame(gdf_intr)
-                df_intr ['RESULT'] = 'INTERSECT'
-                
-                if radius > 0:
-                    aoi_buf = gdf_aoi.buffer(radius)
-                    gdf_aoi_buf = gpd.GeoDataFrame(gpd.GeoSeries(aoi_buf))
-                    gdf_aoi_buf = gdf_aoi_buf.rename(columns={0:'geometry'}).set_geometry('geometry')
-                    gdf_aoi_buf_ext = gpd.overlay(gdf_aoi, gdf_aoi_buf, how='symmetric_difference')  
-                    gdf_buf= gpd.overlay(gdf_aoi_buf_ext, gdf_trg, how='intersection')
-                    
-                    df_buf = pd.DataFrame(gdf_buf)
-                    df_buf ['RESULT'] = 'WITHIN {} m'.format(str(radius))   
-                    
-                    df_all =  pd.concat([df_intr, df_buf])
-                    
-                else:
-                    df_all = df_intr
-                
-                df_all.rename(columns={'geometry':'SHAPE'},inplace=True)
-                
-            except:
-                print ('.......ERROR: the Source Dataset does NOT exist!')
-                df_all = pd.DataFrame([])
-        
-        
-        if isinstance(cols, str) == True:
-            l = cols.split(",")
-            cols = [x[2:] for x in l]
     
-        cols.append('RESULT')
-        
-        df_all_res = df_all[cols]  
-        
-        
-        ov_nbr = df_all_res.shape[0]
-        print ('.....number of overlaps: {}'.format(ov_nbr))
-        
-        # add the dataframe to the resuls dictionnary
-        results[item] =  df_all_res
+    # results over the memory budget are left in the checkpoint files
+    store = OverlayStore (checkpoint, budget_mb=job.get('memory_budget_mb', DEFAULT_BUDGET_MB))
     
+    # cached BCGW results can be up to 7 days old: refresh or bypass them if needed
+    rs_cache = rs_cache.with_mode (job.get('result_cache', 'use'))
     
-        if ov_nbr > 0:
-            print ('.....generating a map.')
-            gdf_intr = df_2_gdf (df_all, 3005)
-            
-            # FIX FOR MISSING LABEL COLUMN NAME
-            if col_lbl == 'nan': 
-                col_lbl = cols[0]
-                gdf_intr [col_lbl] = gdf_intr [col_lbl].astype(str)
-            
-            # datetime columns are causing errors when plotting in Folium. Converting them to str
-            for col in gdf_intr.columns:
-                if gdf_intr[col].dtype == 'datetime64[ns]':
-                    gdf_intr[col] = gdf_intr[col].astype(str)
-            
-            gdf_intr[col_lbl] = gdf_intr[col_lbl].astype(str) 
+    print ('\nRunning the analysis.')
+    if pool is not None:
+        print ('....running {} datasets on {} concurrent sessions'.format(len(rules),workers))
+        run_overlays_concurrent (pool,sql,md_cache,ds_cache,rs_cache,checkpoint,store,rules,input_src,aoi_vars,gdf_aoi,workers)
+    else:
+        run_overlays_serial (connection,cursor,sql,md_cache,ds_cache,rs_cache,checkpoint,store,rules,input_src,aoi_vars,gdf_aoi)
+    
+    md_cache.save()
+    rs_cache.save()
+    print ('\n....metadata cache hits: {}, misses: {}'.format(md_cache.hits,md_cache.misses))
+    print ('....overlay results cache hits: {}, misses: {}'.format(rs_cache.hits,rs_cache.misses))
+    print ('....results in memory: {} MB, spilled to disk: {} datasets'.format(round(store.memory_size/1024**2),store.spilled))
+    
+    map_mode = job.get('map_mode', 'maps')
+    if input_src == 'BATCH':
+        # one spreadsheet and set of maps per AOI, from the single result set
+        results = {}
+        for aoi_id in aoi_vars['aoi_ids']:
+            print ('\nGenerating outputs for AOI {}'.format(aoi_id))
+            gdf_aoi_id = gdf_aoi.loc[gdf_aoi['AOI_ID'] == aoi_id, ['geometry']]
+            wksp_aoi = os.path.join(workspace, 'AOI_{}'.format(aoi_id))
             
-            make_status_map (gdf_aoi, gdf_intr, col_lbl, item, workspace)
+            results[aoi_id] = make_outputs (store,df_stat,gdf_aoi_id,wksp_aoi,map_mode,
+                                            aoi_id=aoi_id,invalid=invalid)
     
-        
-        counter += 1
+    else:
+        results = make_outputs (store,df_stat,gdf_aoi,workspace,map_mode,invalid=invalid)
     
-    print ('\nWriting Results to spreadsheet')
-    write_xlsx (results,df_stat,workspace)
+    return results
+
+
+    
+def execute_status (resume=False,result_cache='use'):
+    """Executes the AST light process """
+    start_t = timeit.default_timer() #start time
+    
+    #user inputs
+    job = {
+        'workspace': r"\\spatialfiles.bcgov\Work\lwbc\visr\Workarea\moez_labiadh\TOOLS\SCRIPTS\STATUSING\results_demo",
+        'input_src': 'AOI', # Possible values are "TANTALIS" and AOI
+        'aoi': r'\\spatialfiles.bcgov\Work\lwbc\visr\Workarea\moez_labiadh\TOOLS\SCRIPTS\STATUSING\test_data\aoi_test.shp',
+        'file_nbr': '1413583', # TANTALIS input: File Number, Disposition ID and Parcel ID
+        'disp_id': 892661,
+        'parcel_id': 911845,
+        'batch_mode': False, # Set to True to status several AOIs in one run
+        'aoi_id_col': 'AOI_ID', # Batch mode with AOI input: column holding the AOI IDs
+        'parcel_ids': [911845, 911846], # Batch mode with TANTALIS input: list of Parcel IDs
+        'region': 'west_coast', #**************USER INPUT: REGION*************
+        'map_mode': 'maps', # 'maps': one HTML map per dataset. 'index': one map, datasets loaded when toggled on. 'none': spreadsheet only
+        'memory_budget_mb': 1024, # Overlay results over this size are read back from disk by the outputs
+        'result_cache': result_cache, # 'use': reuse results cached in the last 7 days. 'refresh': re-query all datasets. 'off': no cache
+        'resume': resume
+        }
+    workers = 8 # Number of concurrent BCGW sessions. Set to 1 to run the datasets one after another
+    refresh_metadata = False # Set to True to refresh the cached BCGW geometry columns and SRIDs
+    
+    
+    print ('Connecting to BCGW.')
+    hostname = 'bcgw.bcgov/idwprod1.bcgov'
+    bcgw_user = os.getenv('bcgw_user')
+    #bcgw_user = 'XXXX'
+    bcgw_pwd = os.getenv('bcgw_pwd')
+    #bcgw_pwd = 'XXXX'
+    pool, connection, cursor = None, None, None
+    if workers > 1:
+        pool = create_session_pool (bcgw_user,bcgw_pwd,hostname,workers)
+    else:
+        connection, cursor = connect_to_DB (bcgw_user,bcgw_pwd,hostname)
+    
+    print ('\nLoading SQL queries')
+    sql = load_queries ()
+    
+    print ('\nLoading the BCGW metadata cache')
+    md_cache = MetadataCache (ttl_days=30, force_refresh=refresh_metadata)
+    
+    print ('\nLoading the local datasets cache')
+    ds_cache = LocalDatasetCache ()
+    
+    print ('\nLoading the overlay results cache')
+    rs_cache = OverlayResultCache (max_size_mb=2048, max_age_days=7)
+    
+    print ('\nReading the AST datasets spreadsheet.')
+    wksp_xls = r'\\GISWHSE.ENV.GOV.BC.CA\whse_np\corp\script_whse\python\Utility_Misc\Ready\statusing_tools_arcpro\statusing_input_spreadsheets'
+    print ('....Region is {}'.format (job['region']))
+    rules = read_input_spreadsheets (wksp_xls,job['region'])
+    
+    try:
+        results = run_status (sql,md_cache,ds_cache,rs_cache,rules,job,
+                              pool=pool,connection=connection,cursor=cursor,workers=workers)
+    finally:
+        if pool is not None:
+            pool.close()
     
     finish_t = timeit.default_timer() #finish time
     t_sec = round(finish_t-start_t)
@@ -602,4 +904,13 @@ def execute_status ():
     return results
               
 
-results = execute_status()
+# maps are rendered in worker processes, which re-import this script
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Automatic Status Tool - LITE version')
+    parser.add_argument('--resume', action='store_true',
+                        help='resume the last run from its checkpoint')
+    parser.add_argument('--result-cache', default='use', choices=['use', 'refresh', 'off'],
+                        help="cached overlay results (up to 7 days old): 'use', 'refresh' or 'off'")
+    args, _ = parser.parse_known_args()
+
+    results = execute_status(resume=args.resume, result_cache=args.result_cache)
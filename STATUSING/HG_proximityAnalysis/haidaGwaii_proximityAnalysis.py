@@ -2,11 +2,18 @@ import warnings
 warnings.simplefilter(action='ignore')
 
 import os
+import sys
 import cx_Oracle
 import pandas as pd
 import geopandas as gpd
 #from shapely import wkb
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bcgw_metadata_cache import MetadataCache
+from proximity_engine import classify_proximity
+from proximity_sql import get_bands, get_band_case
+from local_dataset_cache import LocalDatasetCache
+
 
 def connect_to_DB (username,password,hostname):
     """ Returns a connection and cursor to Oracle database"""
@@ -73,43 +80,31 @@ def load_queries ():
                     WHERE a.CROWN_LANDS_FILE = {file_nbr}
                         AND a.DISPOSITION_TRANSACTION_SID = {disp_id}
                   """
-                  
-    sql ['geomCol'] = """
-                SELECT column_name GEOM_NAME
-                    
-                FROM  ALL_SDO_GEOM_METADATA
-                    
-                WHERE owner = :owner
-                 AND table_name = :tab_name
-                        
-                    """                   
                                          
     sql ['proximity'] = """
+              SELECT p.*, {band_case} AS RESULT
+              
+              FROM (
                 SELECT {cols}, 
-                    ROUND(SDO_GEOM.SDO_DISTANCE(SDO_CS.TRANSFORM(b.{geom_col}, 1000003005, 3005), a.SHAPE, 0.05),2) PROXIMITY_METERS
+                    SDO_GEOM.SDO_DISTANCE(SDO_CS.TRANSFORM(b.{geom_col}, 1000003005, 3005), a.SHAPE, 0.05) PROXIMITY_METERS
     
                 FROM
                   WHSE_TANTALIS.TA_CROWN_TENURES_SVW a
                   INNER JOIN {table} b
-                    ON SDO_WITHIN_DISTANCE (b.{geom_col}, a.SHAPE, 'distance=500 unit=m') = 'TRUE'
+                    ON SDO_WITHIN_DISTANCE (b.{geom_col}, a.SHAPE, 'distance={radius} unit=m') = 'TRUE'
                      
                 WHERE a.CROWN_LANDS_FILE= '{file_nbr}'
                   AND a.DISPOSITION_TRANSACTION_SID = {disp_id}
                       {def_query}  
+                   ) p
                         """
 
     return sql
 
 
-def get_geom_colname (connection,cursor,table,geomQuery):
+def get_geom_colname (cursor,table,md_cache):
     """ Returns the geometry column of BCGW table name: can be either SHAPE or GEOMETRY"""
-    el_list = table.split('.')
-
-    bvars_geom = {'owner':el_list[0].strip(),
-                  'tab_name':el_list[1].strip()}
-    df_g = read_query(connection,cursor,geomQuery, bvars_geom)
-    
-    geom_col = df_g['GEOM_NAME'].iloc[0]
+    geom_col = md_cache.get_geom_colname(cursor,table)
 
     return geom_col
 
@@ -159,12 +154,18 @@ def run_analysis ():
     df_stat.fillna(value='nan',inplace=True)
     
     sql = load_queries ()
+    md_cache = MetadataCache ()
+    ds_cache = LocalDatasetCache ()
     
     print ('Running Analysis.')
     
     file_nbr= '1414560'
     disp_id= 945503
     
+    bands = get_bands ([0,50,500])
+    band_case = get_band_case (bands, intersect_label='OVERLAP')
+    
+    gdf_aoi = None # AOI is read once, on the first local dataset
     
     df_dict = {} 
     counter = 1
@@ -181,69 +182,52 @@ def run_analysis ():
             def_query = ' '
         
         if table.startswith('WHSE'):
-            geomQuery = sql ['geomCol']
-            geom_col= get_geom_colname (connection,cursor,table,geomQuery)
+            geom_col= get_geom_colname (cursor,table,md_cache)
             
             query = sql ['proximity'].format(file_nbr= file_nbr, 
                                              disp_id= disp_id,
                                              cols=cols,
                                              table=table,
                                              def_query=def_query, 
-                                             geom_col=geom_col)
+                                             geom_col=geom_col,
+                                             radius=bands[-1],
+                                             band_case=band_case)
     
+            # bands are computed on the exact distance, only the reported distance is rounded
             df = pd.read_sql(query, connection)
+            df['PROXIMITY_METERS']= df['PROXIMITY_METERS'].round(2)
            
         else:
-            gdf_trg = esri_to_gdf (table)
-           
-            query_aoi= sql['aoi']  .format(file_nbr= file_nbr, disp_id= disp_id)      
-            df_aoi= pd.read_sql(query_aoi, connection)
-            gdf_aoi= df_2_gdf (df_aoi, 3005)    
-            
-            gdf_intr = gpd.overlay(gdf_aoi, gdf_trg, how='intersection')
-            df_intr = pd.DataFrame(gdf_intr)
-            df_intr['PROXIMITY_METERS']= 0
+            if gdf_aoi is None:
+                query_aoi= sql['aoi']  .format(file_nbr= file_nbr, disp_id= disp_id)      
+                df_aoi= pd.read_sql(query_aoi, connection)
+                gdf_aoi= df_2_gdf (df_aoi, 3005)    
             
-            buf_dfs= []
-            for radius in [50,500]:
-                aoi_buf = gdf_aoi.buffer(radius)
-                gdf_aoi_buf = gpd.GeoDataFrame(gpd.GeoSeries(aoi_buf))
-                gdf_aoi_buf = gdf_aoi_buf.rename(columns={0:'geometry'}).set_geometry('geometry')
-                gdf_aoi_buf_ext = gpd.overlay(gdf_aoi, gdf_aoi_buf, how='symmetric_difference')  
-                gdf_buf= gpd.overlay(gdf_aoi_buf_ext, gdf_trg, how='intersection')
-                    
-                df_buf = pd.DataFrame(gdf_buf)
-                df_buf ['PROXIMITY_METERS'] = radius
-                
-                buf_dfs.append(df_buf)
+            xmin,ymin,xmax,ymax = gdf_aoi.total_bounds
+            bbox = (xmin-bands[-1], ymin-bands[-1], xmax+bands[-1], ymax+bands[-1])
+            gdf_trg = ds_cache.read (table, esri_to_gdf, bbox=bbox)
             
-            df =  pd.concat([df_intr]+buf_dfs).reset_index()
+            gdf_prox = classify_proximity (gdf_aoi, gdf_trg, bands, intersect_label='OVERLAP')
             
-            df.drop_duplicates(subset= ['BlockID','PROXIMITY_METERS'], inplace=True)
+            df = pd.DataFrame(gdf_prox)
+            df['PROXIMITY_METERS']= df['PROXIMITY_METERS'].round(2)
             
             cols_d= []
             cols_lst= cols.split(",")
             for col in cols_lst:
                 cols_d.append(col)
             cols_d.append('PROXIMITY_METERS')   
+            cols_d.append('RESULT')
             df= df[cols_d]
     
         if df.shape [0] < 1:
             df = df.append({df.columns[0] : 'NO OVERLAPS FOUND!'}, ignore_index=True)
-        
-        df ['RESULT'] = None    
-        for i, row in df.iterrows():
-            d = row['PROXIMITY_METERS']
-            if d == 0:
-                df.at[i,'RESULT'] = 'OVERLAP'       
-            elif 0 < d <= 50:
-                df.at[i,'RESULT'] = 'WITHIN 50 m'            
-            elif 50 < d <= 500:
-                df.at[i,'RESULT'] = 'WITHIN 500 m'    
             
         df_dict[name] = df
         
         counter += 1
+    
+    md_cache.save()
         
     print ('Exporting the report')    
     out_path= os.path.join(workspace,'outputs')
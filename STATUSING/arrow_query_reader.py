@@ -0,0 +1,276 @@
+"""
+Name:        Arrow query reader
+Purpose:     Reads Oracle query results in batches into Arrow record batches,
+             instead of fetching all rows into a list of tuples.
+
+Notes        The cursor arraysize and prefetchrows are set to the batch size,
+             so each batch is one round-trip. The Arrow schema is derived
+             from the cursor description, so all batches share the same types.
+
+             Results can be:
+               - returned as a DataFrame: read_query()
+               - returned as an Arrow table: read_query_arrow()
+               - streamed batch by batch to a sink: iter_query_batches(),
+                 write_query_parquet()
+
+             Integer NUMBER columns (scale 0, e.g NUMBER(38)) and unconstrained
+             NUMBER columns holding only integers (e.g OBJECTID) are read as
+             int64. Integers out of the int64 range are read as decimal128,
+             other unconstrained NUMBER values as float64. When the batches
+             of a query get different types, they are cast to the widest one
+             (batches streamed to Parquet use fixed types, see get_stream_schema).
+
+             Dates are read as Arrow timestamps. Date columns with values out
+             of the pandas datetime64[ns] range (e.g 9999-12-31 sentinel dates)
+             are returned as datetime objects, as pd.read_sql does.
+
+             Works with cx_Oracle and oracledb cursors. Requires pyarrow.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+from datetime import datetime
+from decimal import Decimal
+
+import pyarrow as pa
+
+
+DEFAULT_BATCH_SIZE = 10000
+
+# range of the pandas datetime64[ns] type
+PD_TIMESTAMP_MIN = datetime(1677, 9, 22)
+PD_TIMESTAMP_MAX = datetime(2262, 4, 11)
+
+INT64_MIN = -2**63
+INT64_MAX = 2**63 - 1
+
+# NUMBER columns typed from their values: 'int' (scale 0), 'any' (unconstrained)
+NUMBER_KIND = b'number_kind'
+
+
+
+def get_number_kind (precision, scale):
+    """Returns how a NUMBER column is typed: 'int' for integer columns (scale 0),
+       'any' for unconstrained columns (typed from their values), or None
+       for decimal columns"""
+    if scale == 0:
+        return 'int'
+    if not precision and scale in (None, -127):
+        return 'any'
+
+    return None
+
+
+
+def get_arrow_type (db_type, precision, scale):
+    """Returns the Arrow type of an Oracle column type.
+       Unknown types are read as strings"""
+    name = getattr(db_type, 'name', str(db_type)).upper()
+
+    if 'NUMBER' in name:
+        if get_number_kind (precision, scale) is not None:
+            return pa.int64()
+        return pa.float64()
+    if 'BINARY_DOUBLE' in name or 'BINARY_FLOAT' in name:
+        return pa.float64()
+    if 'DATE' in name or 'TIMESTAMP' in name:
+        return pa.timestamp('us')
+    if 'BLOB' in name or 'RAW' in name:
+        return pa.binary()
+
+    return pa.string()
+
+
+
+def get_arrow_schema (cursor):
+    """Returns the Arrow schema of the cursor results"""
+    fields = []
+    for name, db_type, display_size, internal_size, precision, scale, null_ok in cursor.description:
+        metadata = None
+        if 'NUMBER' in getattr(db_type, 'name', str(db_type)).upper():
+            kind = get_number_kind (precision, scale)
+            if kind is not None:
+                metadata = {NUMBER_KIND: kind.encode('utf-8')}
+        fields.append(pa.field(name, get_arrow_type (db_type, precision, scale), metadata=metadata))
+
+    return pa.schema(fields)
+
+
+
+def get_number_array (values, kind):
+    """Returns the Arrow array of the values of a NUMBER column: int64 if the
+       values are integers in the int64 range, decimal128 for larger integers,
+       float64 otherwise"""
+    numbers = [v for v in values if v is not None]
+
+    is_int = all(isinstance(v, int) or (isinstance(v, (float, Decimal)) and v == int(v))
+                 for v in numbers)
+    if kind == 'any' and not all(isinstance(v, (int, Decimal)) for v in numbers):
+        is_int = False
+
+    if not is_int:
+        return pa.array([None if v is None else float(v) for v in values], type=pa.float64())
+
+    ints = [None if v is None else int(v) for v in values]
+    if all(INT64_MIN <= v <= INT64_MAX for v in ints if v is not None):
+        return pa.array(ints, type=pa.int64())
+
+    return pa.array([None if v is None else Decimal(v) for v in ints], type=pa.decimal128(38, 0))
+
+
+
+def get_common_type (types):
+    """Returns the type the batches of a column are cast to: the widest of
+       int64, decimal128 and float64"""
+    types = list(types)
+    if any(pa.types.is_floating(t) for t in types):
+        return pa.float64()
+    if any(pa.types.is_decimal(t) for t in types):
+        return pa.decimal128(38, 0)
+
+    return types[0]
+
+
+
+def unify_batches (batches):
+    """Returns the batches cast to a common schema"""
+    schema = pa.schema([field.with_type(get_common_type (b.schema.field(i).type for b in batches))
+                        for i, field in enumerate(batches[0].schema)])
+
+    return [b if b.schema.equals(schema) else pa.Table.from_batches([b]).cast(schema).to_batches()[0]
+            for b in batches]
+
+
+
+def get_stream_schema (cursor):
+    """Returns the Arrow schema of results streamed batch by batch, where the
+       types can not depend on the values: integer NUMBER columns over 18
+       digits are decimal128, unconstrained NUMBER columns are float64"""
+    fields = []
+    for field, desc in zip(get_arrow_schema (cursor), cursor.description):
+        kind = field.metadata.get(NUMBER_KIND) if field.metadata else None
+        if kind == b'int' and not 0 < (desc[4] or 0) <= 18:
+            field = field.with_type(pa.decimal128(38, 0))
+        elif kind == b'any':
+            field = field.with_type(pa.float64())
+        fields.append(field.remove_metadata())
+
+    return pa.schema(fields)
+
+
+
+def rows_to_batch (rows, schema):
+    """Returns an Arrow record batch from a list of row tuples"""
+    arrays = []
+    for i, field in enumerate(schema):
+        values = [row[i] for row in rows]
+
+        if field.metadata and NUMBER_KIND in field.metadata:
+            arrays.append(get_number_array (values, field.metadata[NUMBER_KIND].decode('utf-8')))
+            continue
+
+        if pa.types.is_string(field.type) or pa.types.is_binary(field.type):
+            # LOB locators are read, other objects are converted to str
+            values = [v.read() if hasattr(v, 'read') else v for v in values]
+            if pa.types.is_string(field.type):
+                values = [v if v is None or isinstance(v, str) else str(v) for v in values]
+
+        arrays.append(pa.array(values, type=field.type))
+
+    return pa.RecordBatch.from_arrays(arrays, names=schema.names)
+
+
+
+def iter_query_batches (cursor, query, bvars=None, batch_size=DEFAULT_BATCH_SIZE, prefetch_rows=None):
+    """Executes a query and yields its results as Arrow record batches"""
+    cursor.arraysize = batch_size
+    cursor.prefetchrows = prefetch_rows if prefetch_rows is not None else batch_size + 1
+
+    cursor.execute(query, bvars or {})
+    schema = get_arrow_schema (cursor)
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows_to_batch (rows, schema)
+
+
+
+def read_query_arrow (cursor, query, bvars=None, batch_size=DEFAULT_BATCH_SIZE, prefetch_rows=None):
+    """Returns an Arrow table containing SQL Query results"""
+    batches = list(iter_query_batches (cursor, query, bvars, batch_size, prefetch_rows))
+
+    if len(batches) == 0:
+        return get_arrow_schema (cursor).empty_table()
+
+    return pa.Table.from_batches(unify_batches (batches))
+
+
+
+def get_out_of_range_dates (table):
+    """Returns the timestamp columns of a table with values out of the
+       pandas datetime64[ns] range"""
+    import pyarrow.compute as pc
+
+    cols = []
+    for field, column in zip(table.schema, table.columns):
+        if not pa.types.is_timestamp(field.type) or column.null_count == len(column):
+            continue
+        min_max = pc.min_max(column)
+        if min_max['min'].as_py() < PD_TIMESTAMP_MIN or min_max['max'].as_py() > PD_TIMESTAMP_MAX:
+            cols.append(field.name)
+
+    return cols
+
+
+
+def table_to_pandas (table):
+    """Returns a df from an Arrow table. Date columns out of the pandas
+       datetime64[ns] range are kept as datetime objects"""
+    obj_cols = get_out_of_range_dates (table)
+    if len(obj_cols) == 0:
+        return table.to_pandas()
+
+    df = table.select([name for name in table.column_names if name not in obj_cols]).to_pandas()
+    df_obj = table.select(obj_cols).to_pandas(timestamp_as_object=True)
+    for col in obj_cols:
+        df[col] = df_obj[col]
+
+    return df[table.column_names]
+
+
+
+def read_query (cursor, query, bvars=None, batch_size=DEFAULT_BATCH_SIZE, prefetch_rows=None):
+    """Returns a df containing SQL Query results"""
+    table = read_query_arrow (cursor, query, bvars, batch_size, prefetch_rows)
+
+    return table_to_pandas (table)
+
+
+
+def write_query_parquet (cursor, query, out_file, bvars=None, batch_size=DEFAULT_BATCH_SIZE, prefetch_rows=None):
+    """Streams SQL Query results to a Parquet file, one batch at a time.
+       Returns the number of rows written"""
+    import pyarrow.parquet as pq
+
+    writer = None
+    nrows = 0
+    try:
+        for batch in iter_query_batches (cursor, query, bvars, batch_size, prefetch_rows):
+            if writer is None:
+                schema = get_stream_schema (cursor)
+                writer = pq.ParquetWriter(out_file, schema)
+            if not batch.schema.equals(schema):
+                batch = pa.Table.from_batches([batch]).cast(schema).to_batches()[0]
+            writer.write_batch(batch)
+            nrows += batch.num_rows
+
+        if writer is None:
+            pq.write_table(get_stream_schema (cursor).empty_table(), out_file)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return nrows
@@ -0,0 +1,397 @@
+"""
+Name:        AST_lite service
+Purpose:     Long-lived statusing service: keeps a warm BCGW session pool, the
+             compiled AST rules, the SQL queries and the local caches in memory,
+             and runs the statusing jobs submitted by clients one after another.
+
+Notes        Jobs are submitted on a local socket (localhost only, authenticated
+             with a shared key). A job is a dictionnary with the same keys as
+             the AST_lite user inputs:
+               - workspace: output folder of the job (required)
+               - input_src: 'AOI' or 'TANTALIS' (required)
+               - aoi: AOI file (AOI input)
+               - file_nbr, disp_id, parcel_id: TANTALIS input
+               - batch_mode, aoi_id_col, parcel_ids: batch mode
+               - region: AST region (default west_coast)
+               - map_mode: 'maps', 'index' or 'none' (default maps)
+               - memory_budget_mb: memory budget of the overlay results
+               - result_cache: cached overlay results: 'use' (up to 7 days
+                 old), 'refresh' or 'off' (default use)
+               - resume: resume the job from its checkpoint
+
+             Outputs are written to the job workspace as each job completes,
+             with a job_status.json file recording the state of the job
+             (queued, running, done or failed).
+
+             Rules are loaded once per region, and reloaded on request
+             (e.g after the AST spreadsheets are updated).
+
+Arguments:   serve  [--port] [--workers] [--refresh-metadata]
+             submit --workspace --aoi | --file-nbr --disp-id --parcel-id
+                    | --batch --aoi [--aoi-id-col] | --batch --parcel-ids
+                    [--region] [--map-mode] [--memory-budget-mb]
+                    [--result-cache] [--resume] [--wait]
+             status --job-id
+             reload
+             shutdown
+
+             The socket key is read from the ast_service_key environment
+             variable.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+import traceback
+from datetime import datetime
+from multiprocessing.connection import Listener, Client
+
+# AST_lite and the caches are only imported by the service process, so that
+# client commands (submit, status...) start without geopandas and cx_Oracle
+
+
+DEFAULT_PORT = 6010
+HOSTNAME = 'bcgw.bcgov/idwprod1.bcgov'
+WKSP_XLS = r'\\GISWHSE.ENV.GOV.BC.CA\whse_np\corp\script_whse\python\Utility_Misc\Ready\statusing_tools_arcpro\statusing_input_spreadsheets'
+
+JOB_DEFAULTS = {'region': 'west_coast',
+                'map_mode': 'maps',
+                'batch_mode': False,
+                'aoi_id_col': 'AOI_ID',
+                'result_cache': 'use',
+                'resume': False}
+
+
+
+def get_authkey ():
+    """Returns the key of the service socket"""
+    key = os.getenv('ast_service_key')
+    if not key:
+        raise Exception('Set the ast_service_key environment variable!')
+
+    return key.encode('utf-8')
+
+
+
+def validate_job (job):
+    """Returns the job with its default values. Raises an error if inputs are missing"""
+    job = dict(JOB_DEFAULTS, **job)
+
+    if not job.get('workspace'):
+        raise ValueError('The job workspace is missing')
+
+    if job.get('input_src') == 'AOI':
+        if not job.get('aoi'):
+            raise ValueError('AOI input: the AOI file is missing')
+
+    elif job.get('input_src') == 'TANTALIS':
+        if job['batch_mode']:
+            required = ['parcel_ids']
+        else:
+            required = ['file_nbr', 'disp_id', 'parcel_id']
+        missing = [k for k in required if job.get(k) in (None, '', [])]
+        if len(missing) > 0:
+            raise ValueError('TANTALIS input: {} missing'.format(', '.join(missing)))
+
+    else:
+        raise ValueError('Possible input sources are TANTALIS and AOI!')
+
+    if job['result_cache'] not in ('use', 'refresh', 'off'):
+        raise ValueError('Possible result_cache values are use, refresh and off')
+
+    return job
+
+
+
+class StatusService:
+    """ Warm statusing resources and the job queue"""
+
+    def __init__(self, bcgw_user, bcgw_pwd, hostname=HOSTNAME, workers=8,
+                 wksp_xls=WKSP_XLS, refresh_metadata=False):
+        import AST_lite
+        from bcgw_metadata_cache import MetadataCache
+        from local_dataset_cache import LocalDatasetCache
+        from overlay_result_cache import OverlayResultCache
+
+        self.wksp_xls = wksp_xls
+        self.workers = workers
+
+        print ('Connecting to BCGW.')
+        self.pool = AST_lite.create_session_pool (bcgw_user,bcgw_pwd,hostname,workers)
+
+        print ('\nLoading SQL queries')
+        self.sql = AST_lite.load_queries ()
+
+        print ('\nLoading the caches')
+        self.md_cache = MetadataCache (ttl_days=30, force_refresh=refresh_metadata)
+        self.ds_cache = LocalDatasetCache (memory=True)
+        self.rs_cache = OverlayResultCache (max_size_mb=2048, max_age_days=7)
+
+        self._rules = {}
+        self._rules_lock = threading.Lock()
+
+        self._jobs = {}
+        self._jobs_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._next_id = 1
+
+        self._runner = threading.Thread(target=self._run_jobs, name='ast_jobs', daemon=True)
+        self._runner.start()
+
+
+    def get_rules(self, region):
+        """Returns the compiled rules of a region (loaded on first use)"""
+        import AST_lite
+
+        with self._rules_lock:
+            if region not in self._rules:
+                print ('\nReading the AST datasets spreadsheet: {}'.format(region))
+                self._rules[region] = AST_lite.read_input_spreadsheets (self.wksp_xls,region)
+
+            return self._rules[region]
+
+
+    def reload(self):
+        """Drops the rules and the in-memory datasets, so that they are
+           reloaded by the next jobs"""
+        with self._rules_lock:
+            self._rules = {}
+        self.ds_cache.clear_memory()
+
+
+    def _set_state(self, job_id, state, **kwargs):
+        """Updates the state of a job and writes it to the job workspace"""
+        with self._jobs_lock:
+            info = self._jobs[job_id]
+            info.update(kwargs, state=state, updated=datetime.now().isoformat(timespec='seconds'))
+            info = dict(info)
+
+        workspace = info['job']['workspace']
+        try:
+            if not os.path.exists(workspace):
+                os.makedirs(workspace)
+            with open(os.path.join(workspace, 'job_status.json'), 'w') as f:
+                json.dump(info, f, indent=2, default=str)
+        except OSError:
+            print ('....cannot write the status of job {}'.format(job_id))
+
+
+    def submit(self, job):
+        """Validates and queues a job. Returns the job ID"""
+        job = validate_job (job)
+
+        with self._jobs_lock:
+            job_id = self._next_id
+            self._next_id += 1
+            self._jobs[job_id] = {'job_id': job_id, 'job': job}
+
+        self._set_state(job_id, 'queued')
+        self._queue.put(job_id)
+
+        return job_id
+
+
+    def status(self, job_id):
+        """Returns the state of a job"""
+        with self._jobs_lock:
+            info = self._jobs.get(job_id)
+
+            return dict(info) if info else None
+
+
+    def _run_jobs(self):
+        """Runs the queued jobs one after another"""
+        import AST_lite
+
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                break
+
+            job = self._jobs[job_id]['job']
+            self._set_state(job_id, 'running')
+            print ('\nRunning job {}: {}'.format(job_id, job['workspace']))
+
+            start_t = time.perf_counter()
+            try:
+                rules = self.get_rules(job['region'])
+                AST_lite.run_status (self.sql,self.md_cache,self.ds_cache,self.rs_cache,rules,job,
+                                     pool=self.pool,workers=self.workers)
+
+            except Exception as e:
+                traceback.print_exc()
+                self._set_state(job_id, 'failed', error=str(e),
+                                seconds=round(time.perf_counter() - start_t, 1))
+
+            else:
+                self._set_state(job_id, 'done', seconds=round(time.perf_counter() - start_t, 1))
+                print ('\nJob {} completed in {} seconds'.format(job_id, self._jobs[job_id]['seconds']))
+
+            finally:
+                self._queue.task_done()
+
+
+    def close(self):
+        """Waits for the queued jobs, then closes the session pool"""
+        self._queue.put(None)
+        self._runner.join()
+        self.pool.close()
+
+
+
+def serve (port=DEFAULT_PORT, workers=8, refresh_metadata=False):
+    """Starts the service and handles the client requests until shutdown"""
+    service = StatusService (os.getenv('bcgw_user'), os.getenv('bcgw_pwd'),
+                             workers=workers, refresh_metadata=refresh_metadata)
+
+    listener = Listener(('localhost', port), authkey=get_authkey())
+    print ('\nAST_lite service listening on port {}'.format(port))
+
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                print ('....connection refused: {}'.format(e))
+                continue
+
+            with conn:
+                # a client can disconnect before sending its request
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError) as e:
+                    print ('....client disconnected: {}'.format(e))
+                    continue
+                except Exception as e:
+                    print ('....unreadable request: {}'.format(e))
+                    continue
+
+                try:
+                    if not isinstance(request, dict):
+                        raise ValueError('A request is a dictionnary with an action')
+                    action = request.get('action')
+
+                    if action == 'submit':
+                        reply = {'job_id': service.submit(request['job'])}
+                    elif action == 'status':
+                        reply = {'status': service.status(request['job_id'])}
+                    elif action == 'reload':
+                        service.reload()
+                        reply = {'reloaded': True}
+                    elif action == 'shutdown':
+                        reply = {'shutdown': True}
+                    else:
+                        reply = {'error': 'Unknown action: {}'.format(action)}
+                except Exception as e:
+                    reply = {'error': str(e)}
+
+                # or before receiving the reply
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError) as e:
+                    print ('....client disconnected before the reply: {}'.format(e))
+
+                if reply.get('shutdown'):
+                    break
+
+    finally:
+        listener.close()
+        print ('\nShutting down: waiting for the queued jobs')
+        service.close()
+
+
+
+def send_request (request, port=DEFAULT_PORT):
+    """Sends a request to the service. Returns the reply"""
+    with Client(('localhost', port), authkey=get_authkey()) as conn:
+        conn.send(request)
+        reply = conn.recv()
+
+    if 'error' in reply:
+        raise Exception(reply['error'])
+
+    return reply
+
+
+
+def submit_job (job, port=DEFAULT_PORT, wait=False, poll=5):
+    """Submits a job to the service. Returns the job ID, or the final
+       status of the job if wait is True"""
+    job_id = send_request ({'action': 'submit', 'job': job}, port)['job_id']
+    if not wait:
+        return job_id
+
+    while True:
+        status = send_request ({'action': 'status', 'job_id': job_id}, port)['status']
+        if status['state'] in ('done', 'failed'):
+            return status
+        time.sleep(poll)
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='AST_lite statusing service')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p_serve = subparsers.add_parser('serve', help='start the service')
+    p_serve.add_argument('--workers', type=int, default=8)
+    p_serve.add_argument('--refresh-metadata', action='store_true')
+
+    p_submit = subparsers.add_parser('submit', help='submit a statusing job')
+    p_submit.add_argument('--workspace', required=True)
+    p_submit.add_argument('--aoi')
+    p_submit.add_argument('--file-nbr')
+    p_submit.add_argument('--disp-id', type=int)
+    p_submit.add_argument('--parcel-id', type=int)
+    p_submit.add_argument('--batch', action='store_true', help='batch mode: several AOIs in one job')
+    p_submit.add_argument('--parcel-ids', type=int, nargs='+', help='batch mode, TANTALIS input')
+    p_submit.add_argument('--aoi-id-col', default='AOI_ID', help='batch mode, AOI input')
+    p_submit.add_argument('--region', default='west_coast')
+    p_submit.add_argument('--map-mode', default='maps', choices=['maps', 'index', 'none'])
+    p_submit.add_argument('--memory-budget-mb', type=int)
+    p_submit.add_argument('--result-cache', default='use', choices=['use', 'refresh', 'off'])
+    p_submit.add_argument('--resume', action='store_true', help='resume the job from its checkpoint')
+    p_submit.add_argument('--wait', action='store_true')
+
+    p_status = subparsers.add_parser('status', help='state of a job')
+    p_status.add_argument('--job-id', type=int, required=True)
+
+    subparsers.add_parser('reload', help='reload the rules and local datasets')
+    subparsers.add_parser('shutdown', help='stop the service once the queued jobs are done')
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve (args.port, args.workers, args.refresh_metadata)
+
+    elif args.command == 'submit':
+        job = {'workspace': args.workspace,
+               'region': args.region,
+               'map_mode': args.map_mode,
+               'result_cache': args.result_cache,
+               'batch_mode': args.batch,
+               'resume': args.resume}
+        if args.memory_budget_mb is not None:
+            job['memory_budget_mb'] = args.memory_budget_mb
+        if args.aoi:
+            job.update(input_src='AOI', aoi=args.aoi, aoi_id_col=args.aoi_id_col)
+        elif args.batch:
+            job.update(input_src='TANTALIS', parcel_ids=args.parcel_ids)
+        else:
+            job.update(input_src='TANTALIS', file_nbr=args.file_nbr,
+                       disp_id=args.disp_id, parcel_id=args.parcel_id)
+
+        print (submit_job (job, args.port, wait=args.wait))
+
+    elif args.command == 'status':
+        print (send_request ({'action': 'status', 'job_id': args.job_id}, args.port)['status'])
+
+    else:
+        print (send_request ({'action': args.command}, args.port))
@@ -0,0 +1,162 @@
+"""
+Name:        BCGW table metadata cache
+Purpose:     Persists the geometry column name and SRID of BCGW tables
+             to a local json file, so that statusing tools do not query
+             ALL_SDO_GEOM_METADATA and the table SRID on every run.
+
+Notes        Entries are keyed by OWNER.TABLE and store the geometry column,
+             the SRID and the time of the last refresh. Entries older than
+             the TTL are refreshed from the database on the next lookup.
+             Set force_refresh=True to ignore the cached values.
+
+             Lookups where the SRID could not be read (e.g a lost connection)
+             are only kept for failed_ttl_hours (1 hour by default), so they
+             are retried on the next runs.
+
+             Used by AST_lite, tbx_lightStatusing, haidaGwaii_proximityAnalysis
+             and aquaPlant_statusing_sql.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.ast_cache', 'bcgw_metadata.json')
+
+SQL_GEOM_COL = """
+                SELECT column_name GEOM_NAME
+
+                FROM  ALL_SDO_GEOM_METADATA
+
+                WHERE owner = :owner
+                    AND table_name = :tab_name
+               """
+
+SQL_SRID = """
+            SELECT s.{geom_col}.sdo_srid SP_REF
+            FROM {tab} s
+            WHERE rownum = 1
+           """
+
+
+
+class MetadataCache:
+    """ Local cache of BCGW geometry column names and SRIDs"""
+
+    def __init__(self, cache_file=DEFAULT_CACHE_FILE, ttl_days=30, force_refresh=False, failed_ttl_hours=1):
+        self.cache_file = cache_file
+        self.ttl = timedelta(days=ttl_days)
+        self.failed_ttl = timedelta(hours=failed_ttl_hours)
+        self.force_refresh = force_refresh
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+
+    def _load(self):
+        """Returns the cached entries stored on disk (if any)"""
+        if not os.path.isfile(self.cache_file):
+            return {}
+
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            print ('....WARNING: metadata cache is unreadable and will be rebuilt')
+            return {}
+
+
+    def save(self):
+        """Writes the cached entries to disk"""
+        cache_dir = os.path.dirname(self.cache_file)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        with self._lock:
+            tmp_file = self.cache_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump(self._entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_file, self.cache_file)
+
+
+    def _is_fresh(self, entry):
+        """Returns True if a cached entry can be used without a refresh"""
+        if self.force_refresh:
+            return False
+
+        refreshed = datetime.fromisoformat(entry['refreshed'])
+        ttl = self.failed_ttl if entry.get('failed') else self.ttl
+
+        return datetime.now() - refreshed < ttl
+
+
+    def _fetch(self, cursor, table):
+        """Queries the geometry column and SRID of a table from the database"""
+        owner, tab_name = [x.strip() for x in table.split('.')]
+
+        cursor.execute(SQL_GEOM_COL, {'owner': owner, 'tab_name': tab_name})
+        row = cursor.fetchone()
+        if row is None:
+            raise Exception('No spatial metadata found for {}'.format(table))
+        geom_col = row[0]
+
+        failed = False
+        try:
+            cursor.execute(SQL_SRID.format(tab=table, geom_col=geom_col))
+            row = cursor.fetchone()
+            srid = int(row[0]) if row and row[0] is not None else None
+        except Exception as e:
+            print ('....WARNING: could not read the SRID of {}: {}'.format(table, e))
+            srid = None
+            failed = True
+
+        return {'geom_col': geom_col,
+                'srid': srid,
+                'failed': failed,
+                'refreshed': datetime.now().isoformat(timespec='seconds')}
+
+
+    def get(self, cursor, table):
+        """Returns the geometry column and SRID of a BCGW table.
+           The SRID is None if it could not be read from the table"""
+        key = table.strip().upper()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            fresh = entry is not None and self._is_fresh(entry)
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if not fresh:
+            entry = self._fetch(cursor, key)
+            with self._lock:
+                self._entries[key] = entry
+
+        return entry['geom_col'], entry['srid']
+
+
+    def get_geom_colname(self, cursor, table):
+        """Returns the geometry column of a BCGW table: can be either SHAPE or GEOMETRY"""
+        return self.get(cursor, table)[0]
+
+
+    def get_geom_srid(self, cursor, table):
+        """Returns the SRID of a BCGW table"""
+        return self.get(cursor, table)[1]
+
+
+    def invalidate(self, table=None):
+        """Removes one table (or all tables) from the cache"""
+        with self._lock:
+            if table is None:
+                self._entries = {}
+            else:
+                self._entries.pop(table.strip().upper(), None)
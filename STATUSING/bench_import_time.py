@@ -0,0 +1,157 @@
+"""
+Name:        Benchmark - import time
+Purpose:     Measures the startup (import) time of the statusing and reporting
+             entry points with python -X importtime, and fails when an entry
+             point exceeds its recorded budget or loads a heavy dependency
+             that should only be imported by the stage using it.
+
+Notes        Each entry point is imported (not run: scripts are guarded by
+             __name__ == '__main__') in a fresh interpreter, from its own folder.
+             The import time is the best of --repeat runs.
+
+             Budgets are recorded per machine with --update, to
+             import_time_budget.json next to this script. A run fails when an
+             entry point is slower than its budget plus --tolerance, or has no
+             recorded budget (record one with --update first).
+
+Arguments:   --repeat: number of runs per entry point (default 3)
+             --tolerance: allowed regression, in % of the budget (default 20)
+             --update: record the measured times as the new budgets
+             --only: entry points to measure (default all)
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'import_time_budget.json')
+
+# entry point: folder, module, dependencies that must not be loaded at import
+ENTRY_POINTS = {
+    'AST_lite': ('STATUSING', 'AST_lite',
+                 ['cx_Oracle', 'folium', 'xlsxwriter']),
+    'ast_service': ('STATUSING', 'ast_service',
+                    ['cx_Oracle', 'geopandas', 'folium']),
+    'files_tracker_tool': (os.path.join('REPORTING MGMT', 'File Tracker'), 'files_tracker_tool',
+                           ['cx_Oracle', 'openpyxl', 'plotly', 'PIL']),
+    'fc_to_html_v2': (os.path.join('STATUSING', 'generate html maps'), 'fc_to_html_v2',
+                      ['folium', 'branca']),
+    'kfn_waterPilot_reporting_v2': (os.path.join('WATER', 'komoks_waterPilot_proj'), 'kfn_waterPilot_reporting_v2',
+                                    ['cx_Oracle', 'folium', 'openpyxl']),
+    }
+
+
+
+def parse_importtime (stderr):
+    """Returns the total import time (ms) and the set of imported top level
+       packages from the -X importtime output"""
+    total_us = 0
+    packages = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|', 2)
+        total_us += int(self_us)
+        packages.add(name.strip().split('.')[0])
+
+    return total_us / 1000, packages
+
+
+
+def measure_import (folder, module, repeat=3):
+    """Returns the best import time (ms) of a module, and the packages it imports"""
+    cwd = os.path.join(ROOT, folder)
+    code = 'import sys; sys.path.insert(0, "."); import {}'.format(module)
+
+    best_ms, packages = None, set()
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                              cwd=cwd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise Exception('Importing {} failed:\n{}'.format(
+                module, proc.stderr.strip().splitlines()[-1]))
+
+        total_ms, packages = parse_importtime (proc.stderr)
+        if best_ms is None or total_ms < best_ms:
+            best_ms = total_ms
+
+    return best_ms, packages
+
+
+
+def load_budgets ():
+    """Returns the recorded import budgets (ms) per entry point"""
+    if not os.path.isfile(BUDGET_FILE):
+        return {}
+    with open(BUDGET_FILE, 'r') as f:
+        return json.load(f)
+
+
+
+def run_benchmark (names, repeat, tolerance, update):
+    """Measures the entry points. Returns the list of failures"""
+    budgets = load_budgets ()
+    failures = []
+
+    print ('{:<30} {:>12} {:>12}  {}'.format('entry point', 'import (ms)', 'budget (ms)', 'status'))
+    for name in names:
+        folder, module, forbidden = ENTRY_POINTS[name]
+        try:
+            import_ms, packages = measure_import (folder, module, repeat)
+        except Exception as e:
+            failures.append('{}: {}'.format(name, e))
+            print ('{:<30} {:>12} {:>12}  FAILED'.format(name, '-', '-'))
+            continue
+
+        status = []
+        budget = budgets.get(name)
+        if not update:
+            if budget is None:
+                status.append('no budget recorded (run with --update)')
+            elif import_ms > budget * (1 + tolerance / 100):
+                status.append('over budget')
+
+        loaded = sorted(set(forbidden).intersection(packages))
+        if len(loaded) > 0:
+            status.append('loads {}'.format(', '.join(loaded)))
+
+        if len(status) > 0:
+            failures.append('{}: {}'.format(name, '; '.join(status)))
+
+        if update:
+            budgets[name] = round(import_ms, 1)
+
+        print ('{:<30} {:>12.1f} {:>12}  {}'.format(name, import_ms, budget if budget is not None else '-',
+                                                  '; '.join(status) or 'ok'))
+
+    if update:
+        with open(BUDGET_FILE, 'w') as f:
+            json.dump(budgets, f, indent=2, sort_keys=True)
+        print ('\nBudgets recorded to {}'.format(BUDGET_FILE))
+
+    return failures
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import time of the statusing and reporting entry points')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=20)
+    parser.add_argument('--update', action='store_true')
+    parser.add_argument('--only', nargs='+', choices=sorted(ENTRY_POINTS), default=sorted(ENTRY_POINTS))
+    args = parser.parse_args()
+
+    failures = run_benchmark (args.only, args.repeat, args.tolerance, args.update)
+
+    if len(failures) > 0:
+        print ('\nImport time regressions:')
+        for failure in failures:
+            print ('....{}'.format(failure))
+        sys.exit(1)
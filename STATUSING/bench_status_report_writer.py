@@ -0,0 +1,109 @@
+"""
+Name:        Benchmark - status report writer
+Purpose:     Times the AST_lite TAB3 spreadsheet writer against the previous
+             nested loop implementation, on synthetic results of increasing
+             number of hits.
+
+Notes        The time per hit of the columnar writer should stay flat as the
+             number of hits grows (linear scaling). The previous implementation
+             is only run up to --max-legacy hits.
+
+Arguments:   --datasets: number of AST datasets (default 300)
+             --hits: numbers of hits to test (default 1000 10000 100000)
+             --max-legacy: max number of hits for the previous implementation
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import os
+import timeit
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from status_report_writer import ITEM_COL, build_report, write_report
+
+
+
+def make_results (n_datasets, n_hits, seed=0):
+    """Returns synthetic AST datasets and overlay results"""
+    rng = np.random.default_rng(seed)
+
+    items = ['dataset_{}'.format(i) for i in range(n_datasets)]
+    df_stat = pd.DataFrame({'Category': rng.choice(['Land', 'Water', 'Wildlife'], n_datasets),
+                            ITEM_COL: items})
+
+    # hits are spread over half of the datasets
+    item_idx = rng.integers(0, max(n_datasets // 2, 1), n_hits)
+    df_hits = pd.DataFrame({'item': np.array(items)[item_idx],
+                            'TENURE_ID': rng.integers(1, 10**6, n_hits),
+                            'NAME': ['name_{}'.format(i) for i in rng.integers(0, 1000, n_hits)],
+                            'RESULT': rng.choice(['INTERSECT', 'Within 500 m'], n_hits)})
+
+    results = {item: df.drop(columns='item') for item, df in df_hits.groupby('item')}
+    for item in items:
+        results.setdefault(item, pd.DataFrame(columns=['TENURE_ID', 'NAME', 'RESULT']))
+
+    return df_stat, results
+
+
+
+def legacy_build_report (results, df_stat, workspace):
+    """The previous write_xlsx implementation (nested loops, row by row apply)"""
+    df_res = df_stat[['Category', ITEM_COL]]
+    df_res = df_res.rename(columns={ITEM_COL: 'item'})
+    df_res['List of conflicts'] = ""
+    df_res['Map'] = ""
+
+    for index, row in df_res.iterrows():
+        for k, v in results.items():
+            if row['item'] == k and v.shape[0] > 0:
+                v = v.drop('RESULT', axis=1)
+                v['Result'] = v[v.columns].apply(lambda row: ','.join(row.values.astype(str)), axis=1)
+                res_all = " ; ".join(str(x) for x in v['Result'].to_list())
+                df_res.loc[index, 'List of conflicts'] = res_all
+                df_res.loc[index, 'Map'] = '=HYPERLINK("{}", "View Map")'.format(os.path.join(workspace, 'maps', k + '.html'))
+
+    return df_res
+
+
+
+def run_benchmark (n_datasets, hits_list, max_legacy):
+    """Prints the build and write times for each number of hits"""
+    workspace = tempfile.mkdtemp()
+    filename = os.path.join(workspace, 'AST_lite_TAB3.xlsx')
+
+    print ('{:>10} {:>12} {:>12} {:>14} {:>12}'.format('hits', 'build (s)', 'write (s)', 'us per hit', 'legacy (s)'))
+    for n_hits in hits_list:
+        df_stat, results = make_results (n_datasets, n_hits)
+
+        start_t = timeit.default_timer()
+        df_res = build_report (results, df_stat, workspace)
+        build_t = timeit.default_timer() - start_t
+
+        start_t = timeit.default_timer()
+        write_report (df_res, filename)
+        write_t = timeit.default_timer() - start_t
+
+        legacy_t = ''
+        if n_hits <= max_legacy:
+            start_t = timeit.default_timer()
+            legacy_build_report (results, df_stat, workspace)
+            legacy_t = round(timeit.default_timer() - start_t, 3)
+
+        us_hit = (build_t + write_t) / n_hits * 10**6
+        print ('{:>10} {:>12.3f} {:>12.3f} {:>14.2f} {:>12}'.format(n_hits, build_t, write_t, us_hit, legacy_t))
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the AST_lite TAB3 spreadsheet writer')
+    parser.add_argument('--datasets', type=int, default=300)
+    parser.add_argument('--hits', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--max-legacy', type=int, default=10000)
+    args = parser.parse_args()
+
+    run_benchmark (args.datasets, args.hits, args.max_legacy)
@@ -0,0 +1,401 @@
+"""
+Name:        Definition query compiler
+Purpose:     Compiles the definition queries of the AST datasets spreadsheets
+             (ArcGIS style where clauses) to Oracle SQL with named bind
+             variables.
+
+Notes        The definition query is parsed into a syntax tree, then emitted
+             as SQL where literals are replaced by binds (:dq0, :dq1...).
+             The SQL text of a dataset is the same on every run, so Oracle
+             can reuse its cursors instead of hard parsing each query.
+
+             Supported grammar:
+               - predicates joined with AND, OR, NOT and parentheses
+               - expr =, <>, !=, <, <=, >, >= expr
+               - expr [NOT] IN (expr, expr...)
+               - expr [NOT] LIKE expr
+               - expr [NOT] BETWEEN expr AND expr
+               - expr IS [NOT] NULL
+               - expressions: columns, values, SYSDATE, SYSTIMESTAMP,
+                 CURRENT_DATE, CURRENT_TIMESTAMP, arithmetic (+ - * /),
+                 concatenation (||), parentheses, the functions of FUNCTIONS
+                 (e.g UPPER, SUBSTR, TO_DATE, NVL) and EXTRACT(YEAR FROM expr)
+               - values: 'strings', numbers (12, -1.5, .5, 1e3), DATE
+                         'YYYY-MM-DD', TIMESTAMP 'YYYY-MM-DD HH:MM:SS'.
+                         Both date literals accept an optional time part
+                         (ArcGIS writes DATE 'YYYY-MM-DD HH:MM:SS')
+
+             Anything else is rejected with a DefQueryError. With
+             fallback=True, definition queries the compiler does not support
+             are passed to Oracle unbound, as before the compiler (columns
+             prefixed with the table alias).
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+from collections import namedtuple
+
+
+# raw: True if the definition query was passed through unbound (not compiled)
+CompiledQuery = namedtuple('CompiledQuery', ['sql', 'binds', 'raw'], defaults=[False])
+
+KEYWORDS = {'AND', 'OR', 'NOT', 'IN', 'IS', 'NULL', 'LIKE', 'BETWEEN', 'DATE', 'TIMESTAMP', 'FROM'}
+CONSTANTS = {'SYSDATE', 'SYSTIMESTAMP', 'CURRENT_DATE', 'CURRENT_TIMESTAMP'}
+FUNCTIONS = {'UPPER', 'LOWER', 'TRIM', 'LTRIM', 'RTRIM', 'SUBSTR', 'INSTR', 'LENGTH',
+             'TO_DATE', 'TO_TIMESTAMP', 'TO_CHAR', 'TO_NUMBER', 'NVL', 'COALESCE',
+             'ROUND', 'TRUNC', 'ABS', 'MOD', 'ADD_MONTHS', 'MONTHS_BETWEEN', 'EXTRACT'}
+EXTRACT_FIELDS = {'YEAR', 'MONTH', 'DAY', 'HOUR', 'MINUTE', 'SECOND'}
+COMPARISONS = {'=', '<>', '!=', '<', '<=', '>', '>='}
+DATE_FORMATS = ['%Y-%m-%d', '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f']
+
+TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<qident>"[^"]+")
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_#$]*)
+  | (?P<op><>|!=|<=|>=|=|<|>|\|\||[-+*/])
+  | (?P<punct>[(),])
+""", re.VERBOSE)
+
+
+
+class DefQueryError(ValueError):
+    """ Raised when a definition query can not be compiled"""
+
+
+
+def tokenize (text):
+    """Returns the list of (kind, value) tokens of a definition query"""
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        m = TOKEN_RE.match(text, pos)
+        if m is None:
+            raise DefQueryError('Unexpected character at position {}: {}'.format(pos, text[pos:pos + 20]))
+        pos = m.end()
+
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == 'ws':
+            continue
+        if kind == 'string':
+            value = value[1:-1].replace("''", "'")
+        elif kind == 'number':
+            value = float(value) if re.search(r'[.eE]', value) else int(value)
+        elif kind == 'qident':
+            kind, value = 'ident', value[1:-1].strip()
+        if kind == 'ident' and value.upper() in KEYWORDS | CONSTANTS | FUNCTIONS:
+            kind, value = 'kw', value.upper()
+
+        tokens.append((kind, value))
+
+    return tokens
+
+
+
+class Parser:
+    """ Recursive descent parser of definition queries. Returns a syntax tree
+        of tuples: ('or', [..]), ('and', [..]), ('not', node), ('cmp', expr, op, expr),
+        ('in', expr, negated, [exprs]), ('like', expr, negated, expr),
+        ('between', expr, negated, low, high), ('null', expr, negated).
+        Expressions: ('col', name), ('lit', value), ('const', name),
+        ('func', name, [exprs]), ('extract', field, expr), ('op', op, left, right),
+        ('neg', expr), ('paren', expr)"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+
+    def peek(self, offset=0):
+        if self.pos + offset < len(self.tokens):
+            return self.tokens[self.pos + offset]
+        return (None, None)
+
+
+    def next(self):
+        token = self.peek()
+        if token[0] is None:
+            raise DefQueryError('Unexpected end of definition query')
+        self.pos += 1
+        return token
+
+
+    def accept(self, kind, value=None):
+        """Consumes the next token if it matches. Returns True if consumed"""
+        k, v = self.peek()
+        if k == kind and (value is None or v == value):
+            self.pos += 1
+            return True
+        return False
+
+
+    def expect(self, kind, value=None):
+        k, v = self.next()
+        if k != kind or (value is not None and v != value):
+            raise DefQueryError('Expected {} but found {}'.format(value or kind, v))
+        return v
+
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek()[0] is not None:
+            raise DefQueryError('Unexpected token: {}'.format(self.peek()[1]))
+        return node
+
+
+    def parse_or(self):
+        nodes = [self.parse_and()]
+        while self.accept('kw', 'OR'):
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else ('or', nodes)
+
+
+    def parse_and(self):
+        nodes = [self.parse_not()]
+        while self.accept('kw', 'AND'):
+            nodes.append(self.parse_not())
+        return nodes[0] if len(nodes) == 1 else ('and', nodes)
+
+
+    def parse_not(self):
+        if self.accept('kw', 'NOT'):
+            return ('not', self.parse_not())
+
+        # a parenthesis opens either a group of predicates, or an expression
+        # e.g (AREA_HA * 10000) > 5: try the group first
+        if self.peek() == ('punct', '('):
+            start = self.pos
+            self.pos += 1
+            try:
+                node = self.parse_or()
+                self.expect('punct', ')')
+                return node
+            except DefQueryError:
+                self.pos = start
+
+        return self.parse_predicate()
+
+
+    def parse_expr(self):
+        node = self.parse_term()
+        while self.peek()[0] == 'op' and self.peek()[1] in ('+', '-', '||'):
+            op = self.next()[1]
+            node = ('op', op, node, self.parse_term())
+        return node
+
+
+    def parse_term(self):
+        node = self.parse_factor()
+        while self.peek()[0] == 'op' and self.peek()[1] in ('*', '/'):
+            op = self.next()[1]
+            node = ('op', op, node, self.parse_factor())
+        return node
+
+
+    def parse_factor(self):
+        kind, value = self.next()
+
+        if kind == 'op' and value in ('-', '+'):
+            node = self.parse_factor()
+            if value == '+':
+                return node
+            if node[0] == 'lit' and isinstance(node[1], (int, float)):
+                return ('lit', -node[1])
+            return ('neg', node)
+
+        if kind in ('string', 'number'):
+            return ('lit', value)
+
+        if kind == 'punct' and value == '(':
+            node = self.parse_expr()
+            self.expect('punct', ')')
+            return ('paren', node)
+
+        if kind == 'kw' and value in ('DATE', 'TIMESTAMP'):
+            return ('lit', self.parse_date(value))
+
+        if kind == 'kw' and value in CONSTANTS:
+            return ('const', value)
+
+        if kind == 'kw' and value == 'EXTRACT':
+            self.expect('punct', '(')
+            field = str(self.expect('ident')).upper()
+            if field not in EXTRACT_FIELDS:
+                raise DefQueryError('Unsupported EXTRACT field: {}'.format(field))
+            self.expect('kw', 'FROM')
+            node = self.parse_expr()
+            self.expect('punct', ')')
+            return ('extract', field, node)
+
+        if kind == 'kw' and value in FUNCTIONS:
+            self.expect('punct', '(')
+            args = [self.parse_expr()]
+            while self.accept('punct', ','):
+                args.append(self.parse_expr())
+            self.expect('punct', ')')
+            return ('func', value, args)
+
+        if kind == 'ident':
+            if self.peek() == ('punct', '('):
+                raise DefQueryError('Unsupported function: {}'.format(value))
+            return ('col', value)
+
+        raise DefQueryError('Expected a column or value but found {}'.format(value))
+
+
+    def parse_date(self, value):
+        text = self.expect('string')
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(text.strip(), fmt)
+            except ValueError:
+                continue
+        raise DefQueryError('Invalid {} literal: {}'.format(value, text))
+
+
+    def parse_predicate(self):
+        expr = self.parse_expr()
+
+        if self.accept('kw', 'IS'):
+            negated = self.accept('kw', 'NOT')
+            self.expect('kw', 'NULL')
+            return ('null', expr, negated)
+
+        negated = self.accept('kw', 'NOT')
+
+        if self.accept('kw', 'IN'):
+            self.expect('punct', '(')
+            values = [self.parse_expr()]
+            while self.accept('punct', ','):
+                values.append(self.parse_expr())
+            self.expect('punct', ')')
+            return ('in', expr, negated, values)
+
+        if self.accept('kw', 'LIKE'):
+            return ('like', expr, negated, self.parse_expr())
+
+        if self.accept('kw', 'BETWEEN'):
+            low = self.parse_expr()
+            self.expect('kw', 'AND')
+            return ('between', expr, negated, low, self.parse_expr())
+
+        if negated:
+            raise DefQueryError('Expected IN, LIKE or BETWEEN after NOT')
+
+        kind, op = self.next()
+        if kind != 'op' or op not in COMPARISONS:
+            raise DefQueryError('Expected a comparison operator but found {}'.format(op))
+        return ('cmp', expr, op, self.parse_expr())
+
+
+
+class Emitter:
+    """ Emits Oracle SQL with named binds from a definition query syntax tree"""
+
+    def __init__(self, alias, prefix):
+        self.alias = alias
+        self.prefix = prefix
+        self.binds = []
+
+
+    def bind(self, value):
+        name = '{}{}'.format(self.prefix, len(self.binds))
+        self.binds.append((name, value))
+        return ':' + name
+
+
+    def expr(self, node):
+        kind = node[0]
+        if kind == 'col':
+            if self.alias:
+                return '{}.{}'.format(self.alias, node[1])
+            return node[1]
+        if kind == 'lit':
+            return self.bind(node[1])
+        if kind == 'const':
+            return node[1]
+        if kind == 'func':
+            return '{}({})'.format(node[1], ', '.join(self.expr(n) for n in node[2]))
+        if kind == 'extract':
+            return 'EXTRACT({} FROM {})'.format(node[1], self.expr(node[2]))
+        if kind == 'op':
+            return '{} {} {}'.format(self.expr(node[2]), node[1], self.expr(node[3]))
+        if kind == 'neg':
+            return '-' + self.expr(node[1])
+        if kind == 'paren':
+            return '(' + self.expr(node[1]) + ')'
+
+        raise DefQueryError('Unknown expression: {}'.format(kind))
+
+
+    def emit(self, node):
+        kind = node[0]
+        if kind in ('or', 'and'):
+            return '(' + ' {} '.format(kind.upper()).join(self.emit(n) for n in node[1]) + ')'
+        if kind == 'not':
+            return 'NOT ' + self.emit(node[1])
+
+        expr = self.expr(node[1])
+        if kind == 'cmp':
+            op = '<>' if node[2] == '!=' else node[2]
+            return '{} {} {}'.format(expr, op, self.expr(node[3]))
+        if kind == 'null':
+            return '{} IS {}NULL'.format(expr, 'NOT ' if node[2] else '')
+
+        neg = 'NOT ' if node[2] else ''
+        if kind == 'in':
+            return '{} {}IN ({})'.format(expr, neg, ', '.join(self.expr(v) for v in node[3]))
+        if kind == 'like':
+            return '{} {}LIKE {}'.format(expr, neg, self.expr(node[3]))
+        if kind == 'between':
+            return '{} {}BETWEEN {} AND {}'.format(expr, neg, self.expr(node[3]), self.expr(node[4]))
+
+        raise DefQueryError('Unknown node: {}'.format(kind))
+
+
+
+def get_raw_def_query (text, alias='b'):
+    """Returns a definition query as SQL without binds, the way it was passed
+       to Oracle before the compiler: double quotes removed and the table
+       alias added to the first column and after each AND/OR"""
+    sql = text.strip().replace('"', '')
+
+    if alias:
+        prefix = alias + '.'
+        sql = re.sub(r'(\bAND\b)', r'\1 ' + prefix, sql)
+        sql = re.sub(r'(\bOR\b)', r'\1 ' + prefix, sql)
+
+        if sql[0] == '(':
+            sql = sql.replace('(', '(' + prefix)
+        else:
+            sql = prefix + sql
+
+    return '(' + sql + ')'
+
+
+
+@lru_cache(maxsize=1024)
+def compile_def_query (text, alias='b', prefix='dq', fallback=False):
+    """Returns the compiled SQL and binds ((name, value) pairs) of a definition query.
+       With fallback=True, a definition query the compiler does not support is
+       returned unbound (raw=True) instead of raising a DefQueryError.
+       Compiled queries are cached per definition query text"""
+    if text is None or text.strip() == '':
+        return CompiledQuery('', ())
+
+    try:
+        node = Parser(tokenize(text)).parse()
+        emitter = Emitter(alias, prefix)
+        sql = emitter.emit(node)
+    except DefQueryError:
+        if not fallback:
+            raise
+        return CompiledQuery(get_raw_def_query (text, alias), (), True)
+
+    return CompiledQuery(sql, tuple(emitter.binds))
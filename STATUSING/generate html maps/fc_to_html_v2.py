@@ -7,26 +7,35 @@ import warnings
 warnings.simplefilter(action='ignore')
 
 import os
+import sys
 import timeit
 import base64
 import numpy as np
 import pandas as pd
 import geopandas as gpd
-import fiona
 import shapely.wkt as wkt
-import folium
-from folium.plugins import MeasureControl, MousePosition,FloatImage, MiniMap, Search, GroupedLayerControl
-from branca.element import Template, MacroElement
 
-import mapstyle
+# folium, fiona and the map styles are imported by the methods using them,
+# so that the module can be imported (e.g to read the input xlsxs) without them.
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from web_map_optimizer import optimize_for_web
 
 
 class HTMLGenerator:
-    def __init__(self, common_xls, region_xls, status_gdb, out_location):
+    def __init__(self, common_xls, region_xls, status_gdb, out_location, lazy_layers=False,
+                 precision=6, zoom=17):
         self.status_gdb = status_gdb
         self.out_loc = out_location
         self.common_xls = common_xls
         self.region_xls = region_xls
+        # if True, only the all-layers map is generated. Layers are written to 
+        # sidecar files and loaded when toggled on in the layer control
+        self.lazy_layers = lazy_layers
+        # number of decimals of the map coordinates, and largest zoom level 
+        # the geometries are simplified for (None to disable)
+        self.precision = precision
+        self.zoom = zoom
 
 
     def get_input_xlsx(self):
@@ -46,6 +55,11 @@ class HTMLGenerator:
 
     def create_map_template(self, title='Placeholder for title',Xcenter=0,Ycenter=0):
         """Returns an empty folium map object"""
+        import folium
+        from folium.plugins import MeasureControl, MousePosition, FloatImage, MiniMap
+        from branca.element import Template, MacroElement
+        import mapstyle
+        
         # Create a map object
         map_obj = folium.Map()
         
@@ -118,8 +132,132 @@ class HTMLGenerator:
         return map_obj
 
 
+    def save_individual_map(self, gdf_fc, gdf_aoi, bf_gdfs, map_title, label_col,
+                            tooltip_cols, popup_cols, fc, Xcenter, Ycenter):
+        """Creates and saves the HTML map of one feature class"""
+        import folium
+        from folium.plugins import GroupedLayerControl
+        
+        # Create an individual map
+        map_one = self.create_map_template(title=map_title,
+                                    Xcenter=Xcenter,Ycenter=Ycenter)
+        
+        # Add the AOI layer to individual maps
+        grp_aoi_o= folium.FeatureGroup(name= 'AOI')  
+        lyr_aoi_o= folium.GeoJson(data=gdf_aoi, name='AOI',
+                    style_function=lambda x:{'color': 'red', 
+                                                'fillColor': 'none',
+                                                'weight': 3})
+        lyr_aoi_o.add_to(grp_aoi_o)
+        grp_aoi_o.add_to(map_one)
+
+        aoi_grps_o= [grp_aoi_o]
+
+        # Add buffered areas to ndividual maps
+        for k,v in bf_gdfs.items():
+            grp_aoi_b_o= folium.FeatureGroup(name= k.upper()+' m')  
+            lyr_aoi_b_o= folium.GeoJson(data=v, name=k, show=True,
+                            style_function=lambda x:{'color': 'orange',
+                                                    'fillColor': 'none',
+                                                    'weight': 3})
+            lyr_aoi_b_o.add_to(grp_aoi_b_o)
+            grp_aoi_b_o.add_to(map_one)
+
+            aoi_grps_o.append(grp_aoi_b_o)
+
+        # Zoom the map to the layer extent
+        xmin, ymin, xmax, ymax = gdf_fc['geometry'].total_bounds
+        map_one.fit_bounds([[ymin, xmin], [ymax, xmax]])
+
+        # Add the layer to the individual map
+        grp_fc_o= folium.FeatureGroup(name= map_title, show= True)  
+        lyr_fc_o= folium.GeoJson(data=gdf_fc, name=map_title,
+                    marker=folium.Circle(radius=5),
+                    style_function= lambda x: {'fillColor': x['properties']['color'],
+                                                'color': x['properties']['color'],
+                                                'weight': 2},
+                    tooltip=folium.features.GeoJsonTooltip(fields=tooltip_cols,
+                                                            aliases=['LAYER', label_col],
+                                                            labels=True),
+                    popup=folium.features.GeoJsonPopup(fields=popup_cols, 
+                                                        sticky=False,
+                                                        max_width=380))
+        lyr_fc_o.add_to(grp_fc_o)
+        grp_fc_o.add_to(map_one)
+
+
+        # Create a Legend for individual maps
+        #legend colors and names
+        legend_labels = zip(gdf_fc['color'], gdf_fc[label_col])
+        
+        #start the div tag and set the legend size and position
+        legend_html = '''
+                    <div id="legend" style="position: fixed; 
+                    bottom: 200px; right: 30px; z-index: 1000; 
+                    background-color: #fff; padding: 10px; 
+                    border-radius: 5px; border: 1px solid grey;">
+                    '''
+                    
+        #add the AOI item to the legend
+        legend_html += '''
+                    <div style="display: inline-block; 
+                    margin-right: 10px;
+                    background-color: transparent;
+                    border: 2px solid red;
+                    width: 15px; height: 15px;"></div>AOI<br>
+                    '''
+                    
+        #add the AOI buffer item to the legend
+        legend_html += '''
+                    <div style="display: inline-block; 
+                    margin-right: 10px;background-color: transparent; 
+                    border: 2px solid orange;
+                    width: 15px; height: 15px;"></div>AOI buffers<br>
+                    '''            
+        
+        #add a header to the legend            
+        legend_html += '''
+                    <div style="font-weight: bold; 
+                    margin-bottom: 5px;">{}</div>
+                    '''.format(label_col)
+    
+        #add items to the legend
+        for color, name in legend_labels:
+            legend_html += '''
+                            <div style="display: inline-block; 
+                            margin-right: 10px;background-color: {0}; 
+                            width: 15px; height: 15px;"></div>{1}<br>
+                            '''.format(color, name)
+        #close the div tag
+        legend_html += '</div>'
+
+        #add the legend to the individual maps
+        map_one.get_root().html.add_child(folium.Element(legend_html))
+
+        # Add layer controls to the individual map
+        lyr_cont_one = folium.LayerControl()
+        lyr_cont_one.add_to(map_one)
+
+        #Add goups to the layer controls of the individual maps
+        GroupedLayerControl(
+        groups={
+        "AREA OF INTEREST": aoi_grps_o,
+        "LAYER": [grp_fc_o]
+            },
+        exclusive_groups=False,
+        collapsed=True
+            ).add_to(map_one)
+    
+        # Save the indivdiual map to html file
+        map_one.save(os.path.join(self.out_loc, fc+'.html'))
+
+
     def generate_html_maps(self):
         """Creates a HTML map for each feature class in gdb"""
+        import fiona
+        import folium
+        from folium.plugins import GroupedLayerControl
+        from lazy_geojson import add_lazy_layer
 
         print('\nReading input xlsxs')
         df_st= self.get_input_xlsx()
@@ -134,6 +272,10 @@ class HTMLGenerator:
                   'aoi_5000': gpd.GeoDataFrame(geometry= gdf_aoi.buffer(5000), crs= gdf_aoi.crs) 
                   }
         
+        # Simplify and round the AOI coordinates for the web
+        gdf_aoi = optimize_for_web(gdf_aoi, self.precision, self.zoom)
+        bf_gdfs = {k: optimize_for_web(v, self.precision, self.zoom) for k, v in bf_gdfs.items()}
+        
         print ('\nCreating a map template')
         # Create an all-layers map
         centroids = gdf_aoi.to_crs(4326).centroid
@@ -178,6 +320,7 @@ class HTMLGenerator:
         ctg_list.insert(0, 'Area of Interest')
         
         ctg_grps=[aoi_grps]
+        sidecars_size = 0
 
         fc_list= fiona.listlayers(self.status_gdb)
         
@@ -249,140 +392,45 @@ class HTMLGenerator:
                         
                         gdf_fc['color2']=color
                             
-                        # Create an individual map
-                        map_one = self.create_map_template(title=map_title,
-                                                    Xcenter=Xcenter,Ycenter=Ycenter)
-                        
-                        # Add the AOI layer to individual maps
-                        grp_aoi_o= folium.FeatureGroup(name= 'AOI')  
-                        lyr_aoi_o= folium.GeoJson(data=gdf_aoi, name='AOI',
-                                    style_function=lambda x:{'color': 'red', 
-                                                                'fillColor': 'none',
-                                                                'weight': 3})
-                        lyr_aoi_o.add_to(grp_aoi_o)
-                        grp_aoi_o.add_to(map_one)
-            
-                        aoi_grps_o= [grp_aoi_o]
-            
-                        # Add buffered areas to ndividual maps
-                        for k,v in bf_gdfs.items():
-                            grp_aoi_b_o= folium.FeatureGroup(name= k.upper()+' m')  
-                            lyr_aoi_b_o= folium.GeoJson(data=v, name=k, show=True,
-                                            style_function=lambda x:{'color': 'orange',
-                                                                    'fillColor': 'none',
-                                                                    'weight': 3})
-                            lyr_aoi_b_o.add_to(grp_aoi_b_o)
-                            grp_aoi_b_o.add_to(map_one)
-            
-                            aoi_grps_o.append(grp_aoi_b_o)
-            
-                        # Zoom the map to the layer extent
-                        gdf_fc = gdf_fc.to_crs(4326)
-                        xmin, ymin, xmax, ymax = gdf_fc['geometry'].total_bounds
-                        map_one.fit_bounds([[ymin, xmin], [ymax, xmax]])
+                        # Reproject, simplify and round the layer coordinates for the web
+                        gdf_fc = optimize_for_web(gdf_fc, self.precision, self.zoom,
+                                                  report=True, name=fc)
                         
                         # Create a list of columns for the tooltip
                         gdf_fc['map_title'] = map_title
                         tooltip_cols = ['map_title',label_col]
             
-                        # Add the layer to the individual map
-                        grp_fc_o= folium.FeatureGroup(name= map_title, show= True)  
-                        lyr_fc_o= folium.GeoJson(data=gdf_fc, name=map_title,
-                                    marker=folium.Circle(radius=5),
-                                    style_function= lambda x: {'fillColor': x['properties']['color'],
-                                                                'color': x['properties']['color'],
-                                                                'weight': 2},
-                                    tooltip=folium.features.GeoJsonTooltip(fields=tooltip_cols,
-                                                                            aliases=['LAYER', label_col],
-                                                                            labels=True),
-                                    popup=folium.features.GeoJsonPopup(fields=popup_cols, 
-                                                                        sticky=False,
-                                                                        max_width=380))
-                        lyr_fc_o.add_to(grp_fc_o)
-                        grp_fc_o.add_to(map_one)
-            
                         # Add the layer to the all-Layers map
-                        grp_fc_a= folium.FeatureGroup(name= map_title, show= False)  
-                        lyr_fc_a= folium.GeoJson(data=gdf_fc, name=map_title,
-                                    marker=folium.Circle(radius=5),
-                                    style_function= lambda x: {'fillColor': x['properties']['color2'],
-                                                                'color': x['properties']['color2'],
-                                                                'weight': 2},
-                                    tooltip=folium.features.GeoJsonTooltip(fields=tooltip_cols,
-                                                                            aliases=['LAYER', label_col],
-                                                                            labels=True),
-                                    popup=folium.features.GeoJsonPopup(fields=popup_cols, 
-                                                                        sticky=False,
-                                                                        max_width=380))
-                        lyr_fc_a.add_to(grp_fc_a)
-                        grp_fc_a.add_to(map_all)
+                        if self.lazy_layers:
+                            grp_fc_a, size = add_lazy_layer(map_all, gdf_fc, self.out_loc, map_title, counter,
+                                        style={'weight': 2, 'fillOpacity': 0.2},
+                                        color_field='color2',
+                                        tooltip_fields=tooltip_cols,
+                                        tooltip_aliases=['LAYER', label_col],
+                                        popup_fields=popup_cols)
+                            sidecars_size += size
+                        else:
+                            grp_fc_a= folium.FeatureGroup(name= map_title, show= False)  
+                            lyr_fc_a= folium.GeoJson(data=gdf_fc, name=map_title,
+                                        marker=folium.Circle(radius=5),
+                                        style_function= lambda x: {'fillColor': x['properties']['color2'],
+                                                                    'color': x['properties']['color2'],
+                                                                    'weight': 2},
+                                        tooltip=folium.features.GeoJsonTooltip(fields=tooltip_cols,
+                                                                                aliases=['LAYER', label_col],
+                                                                                labels=True),
+                                        popup=folium.features.GeoJsonPopup(fields=popup_cols, 
+                                                                            sticky=False,
+                                                                            max_width=380))
+                            lyr_fc_a.add_to(grp_fc_a)
+                            grp_fc_a.add_to(map_all)
                         
                         fc_grps.append(grp_fc_a)
-            
-                        # Create a Legend for individual maps
-                        #legend colors and names
-                        legend_labels = zip(gdf_fc['color'], gdf_fc[label_col])
-                        
-                        #start the div tag and set the legend size and position
-                        legend_html = '''
-                                    <div id="legend" style="position: fixed; 
-                                    bottom: 200px; right: 30px; z-index: 1000; 
-                                    background-color: #fff; padding: 10px; 
-                                    border-radius: 5px; border: 1px solid grey;">
-                                    '''
-                                    
-                        #add the AOI item to the legend
-                        legend_html += '''
-                                    <div style="display: inline-block; 
-                                    margin-right: 10px;
-                                    background-color: transparent;
-                                    border: 2px solid red;
-                                    width: 15px; height: 15px;"></div>AOI<br>
-                                    '''
-                                    
-                        #add the AOI buffer item to the legend
-                        legend_html += '''
-                                    <div style="display: inline-block; 
-                                    margin-right: 10px;background-color: transparent; 
-                                    border: 2px solid orange;
-                                    width: 15px; height: 15px;"></div>AOI buffers<br>
-                                    '''            
                         
-                        #add a header to the legend            
-                        legend_html += '''
-                                    <div style="font-weight: bold; 
-                                    margin-bottom: 5px;">{}</div>
-                                    '''.format(label_col)
-                    
-                        #add items to the legend
-                        for color, name in legend_labels:
-                            legend_html += '''
-                                            <div style="display: inline-block; 
-                                            margin-right: 10px;background-color: {0}; 
-                                            width: 15px; height: 15px;"></div>{1}<br>
-                                            '''.format(color, name)
-                        #close the div tag
-                        legend_html += '</div>'
-            
-                        #add the legend to the individual maps
-                        map_one.get_root().html.add_child(folium.Element(legend_html))
-            
-                        # Add layer controls to the individual map
-                        lyr_cont_one = folium.LayerControl()
-                        lyr_cont_one.add_to(map_one)
-            
-                        #Add goups to the layer controls of the individual maps
-                        GroupedLayerControl(
-                        groups={
-                        "AREA OF INTEREST": aoi_grps_o,
-                        "LAYER": [grp_fc_o]
-                            },
-                        exclusive_groups=False,
-                        collapsed=True
-                            ).add_to(map_one)
-                    
-                        # Save the indivdiual map to html file
-                        map_one.save(os.path.join(self.out_loc, fc+'.html'))
+                        # Create an individual map
+                        if not self.lazy_layers:
+                            self.save_individual_map(gdf_fc, gdf_aoi, bf_gdfs, map_title, label_col,
+                                                     tooltip_cols, popup_cols, fc, Xcenter, Ycenter)
         
             
                 counter += 1
@@ -432,6 +480,11 @@ class HTMLGenerator:
         print('\nGenerating the all-layers map')
         map_all.save(os.path.join(self.out_loc, '00_all_layers.html'))
         
+        if self.lazy_layers:
+            html_size = os.path.getsize(os.path.join(self.out_loc, '00_all_layers.html'))
+            print ('..all-layers map: {} KB, layer files: {} KB'.format(round(html_size/1024),
+                                                                       round(sidecars_size/1024)))
+        
 
 
 if __name__ == "__main__":
@@ -443,7 +496,7 @@ if __name__ == "__main__":
     common_xls= r'P:\corp\script_whse\python\Utility_Misc\Ready\statusing_tools_arcpro\statusing_input_spreadsheets\one_status_common_datasets.xlsx'
     region_xls= r'P:\corp\script_whse\python\Utility_Misc\Ready\statusing_tools_arcpro\statusing_input_spreadsheets\one_status_west_coast_specific.xlsx'
 
-    html = HTMLGenerator(common_xls, region_xls, work_gdb, map_directory)
+    html = HTMLGenerator(common_xls, region_xls, work_gdb, map_directory, lazy_layers=False)
     html.generate_html_maps()
 
     finish_t = timeit.default_timer() #finish time
@@ -0,0 +1,152 @@
+"""
+Name:        Lazy GeoJSON layers
+Purpose:     Folium layer whose features are stored in a sidecar file next to
+             the HTML map, and only loaded when the layer is toggled on in
+             the layer control.
+
+Notes        Map pages only hold the layer definitions (style, tooltip, popup).
+             The features of each layer are written to layers/<key>.js.
+
+             Sidecars are JS files (window.lazyGeoJson[key] = {geojson}) loaded
+             with a script tag rather than fetched as .geojson: browsers block
+             fetch() on maps opened from the file system (file://), which is
+             how status maps are shared.
+
+             Feature values are HTML-escaped in tooltips and popups. Layer
+             keys (sidecar file names) are made from the layer name and its
+             index in the map, so layers whose names only differ by special
+             characters do not overwrite each other's sidecar.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import os
+import re
+import json
+
+from branca.element import Template
+from folium.map import Layer
+
+
+LAYERS_DIR = 'layers'
+
+
+
+class LazyGeoJson(Layer):
+    """ GeoJSON layer loaded from a sidecar file the first time it is shown"""
+
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+            function {{ this.get_name() }}_esc (v) {
+                return String(v).replace(/&/g, '&amp;').replace(/</g, '&lt;')
+                                .replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+            }
+
+            var {{ this.get_name() }} = L.geoJson(null, {
+                style: function (f) {
+                    var s = Object.assign({}, {{ this.style|tojson }});
+                    {%- if this.color_field %}
+                    s.color = f.properties[{{ this.color_field|tojson }}];
+                    s.fillColor = s.color;
+                    {%- endif %}
+                    return s;
+                },
+                pointToLayer: function (f, latlng) {
+                    return L.circleMarker(latlng, {radius: 5});
+                },
+                onEachFeature: function (f, l) {
+                    var tt = [];
+                    var tt_fields = {{ this.tooltip_fields|tojson }};
+                    var tt_aliases = {{ this.tooltip_aliases|tojson }};
+                    for (var i = 0; i < tt_fields.length; i++) {
+                        tt.push('<b>' + {{ this.get_name() }}_esc(tt_aliases[i]) + '</b> ' +
+                                {{ this.get_name() }}_esc(f.properties[tt_fields[i]]));
+                    }
+                    if (tt.length > 0) { l.bindTooltip(tt.join('<br>'), {sticky: true}); }
+
+                    var rows = '';
+                    var pp_fields = {{ this.popup_fields|tojson }};
+                    for (var j = 0; j < pp_fields.length; j++) {
+                        rows += '<tr><th>' + {{ this.get_name() }}_esc(pp_fields[j]) + '</th><td>' +
+                                {{ this.get_name() }}_esc(f.properties[pp_fields[j]]) + '</td></tr>';
+                    }
+                    if (rows !== '') { l.bindPopup('<table>' + rows + '</table>', {maxWidth: 380}); }
+                }
+            });
+
+            {{ this.get_name() }}.on('add', function () {
+                var lyr = this;
+                if (lyr._lazyRequested) { return; }
+                lyr._lazyRequested = true;
+                var s = document.createElement('script');
+                s.src = {{ this.data_url|tojson }};
+                s.onload = function () {
+                    lyr.addData(window.lazyGeoJson[{{ this.key|tojson }}]);
+                    delete window.lazyGeoJson[{{ this.key|tojson }}];
+                };
+                document.head.appendChild(s);
+            });
+            {%- if this.show %}
+            {{ this.get_name() }}.addTo({{ this._parent.get_name() }});
+            {%- endif %}
+        {% endmacro %}
+        """)
+
+    def __init__(self, data_url, key, name=None, style=None, color_field=None,
+                 tooltip_fields=None, tooltip_aliases=None, popup_fields=None,
+                 overlay=True, control=True, show=False):
+        super(LazyGeoJson, self).__init__(name=name, overlay=overlay,
+                                          control=control, show=show)
+        self._name = 'LazyGeoJson'
+        self.data_url = data_url
+        self.key = key
+        self.style = style or {'color': 'gray', 'weight': 2, 'fillOpacity': 0.5}
+        self.color_field = color_field
+        self.tooltip_fields = list(tooltip_fields or [])
+        self.tooltip_aliases = list(tooltip_aliases or self.tooltip_fields)
+        self.popup_fields = list(popup_fields or [])
+
+
+
+def get_layer_key (name, index=None):
+    """Returns a file-safe key of a layer name. The index of the layer
+       makes the key unique (names can only differ by special characters)"""
+    key = re.sub(r'[^A-Za-z0-9_-]+', '_', name).strip('_')
+    if index is not None:
+        key = '{}_{}'.format(key, index)
+
+    return key
+
+
+
+def write_sidecar (gdf, out_dir, key):
+    """Writes the features of a gdf (in WGS84) to the sidecar file of a layer.
+       Returns the url of the sidecar, relative to out_dir, and its size in bytes"""
+    layers_dir = os.path.join(out_dir, LAYERS_DIR)
+    if not os.path.exists(layers_dir):
+        os.makedirs(layers_dir)
+
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(4326)
+
+    path = os.path.join(layers_dir, key + '.js')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('window.lazyGeoJson = window.lazyGeoJson || {};\n')
+        f.write('window.lazyGeoJson[{}] = {};\n'.format(json.dumps(key), gdf.to_json()))
+
+    return LAYERS_DIR + '/' + key + '.js', os.path.getsize(path)
+
+
+
+def add_lazy_layer (parent, gdf, out_dir, name, index=None, **kwargs):
+    """Writes the sidecar of a gdf and adds its lazy layer to a map (or group).
+       index is the position of the layer in the map, to make its key unique.
+       Returns the layer and the size of its sidecar in bytes"""
+    key = get_layer_key (name, index)
+    data_url, size = write_sidecar (gdf, out_dir, key)
+
+    layer = LazyGeoJson(data_url, key, name=name, **kwargs)
+    layer.add_to(parent)
+
+    return layer, size
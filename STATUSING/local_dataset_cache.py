@@ -0,0 +1,272 @@
+"""
+Name:        Local dataset cache
+Purpose:     Caches local statusing sources (shapefiles and file geodatabase
+             featureclasses, often on network shares) as GeoParquet files
+             on the local disk.
+
+Notes        On first use, a source layer is read, reprojected to BC Albers,
+             sorted along a Z-order curve and written to GeoParquet in row
+             groups. The bounding box of every row group (packed spatial index)
+             and of every feature is stored with it.
+
+             Later reads only load the row groups, then the rows, that
+             intersect the requested bbox (e.g the AOI bbox + buffer distance).
+
+             The cache of a layer is rebuilt when the modification time or size
+             of the source changes. Each source has its own lock: building the
+             cache of a layer does not block the reads of other layers.
+
+             Layers with no coordinate system are cached as is, with no EPSG
+             code (a warning is printed).
+
+             With memory=True (long-lived processes, e.g the statusing
+             service), the cached tables are also kept in memory and filtered
+             there, until the source changes.
+
+             Requires pyarrow.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+
+import numpy as np
+import geopandas as gpd
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.ast_cache', 'datasets')
+
+BBOX_COLS = ['_XMIN', '_YMIN', '_XMAX', '_YMAX']
+
+
+
+def get_source_signature (source):
+    """Returns the modification time and size of a shp or featureclass (gdb).
+       For featureclasses, the whole gdb is checked"""
+    if '.gdb' in source:
+        gdb = source.split('.gdb')[0] + '.gdb'
+        files = [os.path.join(gdb, f) for f in os.listdir(gdb)]
+    else:
+        base = os.path.splitext(source)[0]
+        files = [base + ext for ext in ('.shp', '.dbf', '.shx', '.prj')]
+
+    stats = [os.stat(f) for f in files if os.path.isfile(f)]
+    if len(stats) == 0:
+        raise Exception('Source dataset not found: {}'.format(source))
+
+    mtime = max(st.st_mtime for st in stats)
+    size = sum(st.st_size for st in stats)
+
+    return {'mtime': mtime, 'size': size}
+
+
+
+def zorder_keys (bounds):
+    """Returns the Z-order (Morton) key of the bbox center of each feature"""
+    cx = (bounds[:, 0] + bounds[:, 2]) / 2
+    cy = (bounds[:, 1] + bounds[:, 3]) / 2
+
+    def quantize (v):
+        vmin, vmax = np.nanmin(v), np.nanmax(v)
+        span = vmax - vmin if vmax > vmin else 1
+        return ((np.nan_to_num(v, nan=vmin) - vmin) / span * 65535).astype(np.uint64)
+
+    def spread (v):
+        for shift, mask in ((8, 0x00FF00FF), (4, 0x0F0F0F0F), (2, 0x33333333), (1, 0x55555555)):
+            v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+        return v
+
+    return spread(quantize(cx)) | (spread(quantize(cy)) << np.uint64(1))
+
+
+
+def bbox_intersects (boxes, bbox):
+    """Returns a boolean array: True where boxes intersect bbox"""
+    xmin, ymin, xmax, ymax = bbox
+
+    return ((boxes[:, 0] <= xmax) & (boxes[:, 2] >= xmin) &
+            (boxes[:, 1] <= ymax) & (boxes[:, 3] >= ymin))
+
+
+
+class LocalDatasetCache:
+    """ GeoParquet cache of local statusing datasets"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, epsg=3005, row_group_size=10000, memory=False):
+        self.cache_dir = cache_dir
+        self.epsg = epsg
+        self.row_group_size = row_group_size
+        self.memory = memory
+        self._tables = {}
+        self._source_locks = {} # parquet path: lock
+        self._lock = threading.Lock() # guards the dicts
+
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+
+    def _paths(self, source):
+        """Returns the parquet and manifest paths of a source"""
+        key = hashlib.sha1(os.path.normcase(source).encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+
+        return base + '.parquet', base + '.json'
+
+
+    def _source_lock(self, parquet_path):
+        """Returns the lock of a cached layer"""
+        with self._lock:
+            if parquet_path not in self._source_locks:
+                self._source_locks[parquet_path] = threading.Lock()
+
+            return self._source_locks[parquet_path]
+
+
+    def _read_manifest(self, manifest_path):
+        """Returns the manifest of a cached layer (if any)"""
+        if not os.path.isfile(manifest_path):
+            return None
+        try:
+            with open(manifest_path, 'r') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return None
+
+
+    def _build(self, source, reader, parquet_path, manifest_path, signature):
+        """Reads the source layer and writes it to the cache"""
+        print ('.......caching {} to GeoParquet'.format(os.path.basename(source)))
+        gdf = reader(source)
+
+        if gdf.crs is None:
+            print ('.......WARNING: {} has no coordinate system. It is cached without reprojection'.format(
+                os.path.basename(source)))
+            epsg = None
+        else:
+            if gdf.crs.to_epsg() != self.epsg:
+                gdf = gdf.to_crs(epsg=self.epsg)
+            epsg = self.epsg
+
+        bounds = gdf.geometry.bounds.to_numpy()
+        if gdf.shape[0] > 0:
+            order = np.argsort(zorder_keys(bounds), kind='stable')
+            gdf = gdf.iloc[order].reset_index(drop=True)
+            bounds = bounds[order]
+
+        for i, col in enumerate(BBOX_COLS):
+            gdf[col] = bounds[:, i]
+
+        row_groups = []
+        for start in range(0, gdf.shape[0], self.row_group_size):
+            rg = bounds[start:start + self.row_group_size]
+            row_groups.append([float(np.nanmin(rg[:, 0])), float(np.nanmin(rg[:, 1])),
+                               float(np.nanmax(rg[:, 2])), float(np.nanmax(rg[:, 3]))])
+
+        tmp_path = parquet_path + '.tmp'
+        gdf.to_parquet(tmp_path, index=False, row_group_size=self.row_group_size)
+        os.replace(tmp_path, parquet_path)
+
+        manifest = {'source': source,
+                    'signature': signature,
+                    'epsg': epsg,
+                    'geometry': gdf.geometry.name,
+                    'feature_count': int(gdf.shape[0]),
+                    'row_groups': row_groups,
+                    'created': datetime.now().isoformat(timespec='seconds')}
+
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        return manifest
+
+
+    def get_manifest(self, source, reader):
+        """Returns the manifest of a source, (re)building the cache if
+           it does not exist or if the source has changed"""
+        parquet_path, manifest_path = self._paths(source)
+        signature = get_source_signature(source)
+
+        with self._source_lock(parquet_path):
+            manifest = self._read_manifest(manifest_path)
+
+            if (manifest is None or manifest['signature'] != signature
+                    or not os.path.isfile(parquet_path)):
+                manifest = self._build(source, reader, parquet_path, manifest_path, signature)
+
+        return manifest
+
+
+    def _read_memory(self, parquet_path, manifest, bbox):
+        """Returns the rows of a cached layer intersecting bbox, from the
+           in-memory copy of the layer (loaded on first use)"""
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        with self._source_lock(parquet_path):
+            with self._lock:
+                created, table = self._tables.get(parquet_path, (None, None))
+            if created != manifest['created']:
+                table = pq.read_table(parquet_path)
+                with self._lock:
+                    self._tables[parquet_path] = (manifest['created'], table)
+
+        if bbox is not None:
+            xmin, ymin, xmax, ymax = bbox
+            mask = pc.and_(pc.and_(pc.less_equal(table['_XMIN'], xmax), pc.greater_equal(table['_XMAX'], xmin)),
+                           pc.and_(pc.less_equal(table['_YMIN'], ymax), pc.greater_equal(table['_YMAX'], ymin)))
+            table = table.filter(mask)
+
+        return table
+
+
+    def clear_memory(self):
+        """Drops the in-memory copies of the cached layers"""
+        with self._lock:
+            self._tables = {}
+
+
+    def read(self, source, reader, bbox=None):
+        """Returns a gdf of the source layer. If a bbox (xmin, ymin, xmax, ymax)
+           in the cache CRS is provided, only the features intersecting it are returned.
+
+           reader: function returning a gdf from the source (e.g esri_to_gdf)"""
+        import pyarrow.parquet as pq
+
+        manifest = self.get_manifest(source, reader)
+        parquet_path = self._paths(source)[0]
+
+        if self.memory:
+            table = self._read_memory(parquet_path, manifest, bbox)
+
+        else:
+            pf = pq.ParquetFile(parquet_path)
+
+            if bbox is None:
+                groups = list(range(pf.num_row_groups))
+            else:
+                rg_boxes = np.array(manifest['row_groups'], dtype=float).reshape(-1, 4)
+                groups = np.flatnonzero(bbox_intersects(rg_boxes, bbox)).tolist()
+
+            if len(groups) > 0:
+                table = pf.read_row_groups(groups)
+            else:
+                table = pf.schema_arrow.empty_table()
+        df = table.to_pandas()
+
+        if bbox is not None and df.shape[0] > 0:
+            df = df.loc[bbox_intersects(df[BBOX_COLS].to_numpy(), bbox)]
+
+        geom_col = manifest['geometry']
+        crs = 'EPSG:{}'.format(manifest['epsg']) if manifest['epsg'] else None
+        geoms = gpd.GeoSeries.from_wkb(df[geom_col], index=df.index, crs=crs)
+        df = df.drop(columns=BBOX_COLS + [geom_col])
+
+        gdf = gpd.GeoDataFrame(df, geometry=geoms).reset_index(drop=True)
+        gdf = gdf.rename_geometry(geom_col) if geom_col != 'geometry' else gdf
+
+        return gdf
@@ -0,0 +1,222 @@
+"""
+Name:        Overlay result cache
+Purpose:     Stores the per-dataset overlay results of statusing runs on the
+             local disk, so that re-statusing an AOI only queries the datasets
+             whose inputs have changed.
+
+Notes        Results are keyed on a hash of:
+               - the normalized WKB of the AOI geometry (or geometries)
+               - the datasource
+               - the compiled definition query
+               - the buffer distance (radius)
+               - the selected columns
+               - a version of the source (e.g mtime/size of local datasets)
+               - the version of the overlay result format (RESULTS_VERSION)
+
+             Entries older than max_age_days are discarded. When the cache
+             grows over max_size_mb, the least recently used entries are
+             evicted.
+
+             BCGW datasets have no version in the key: their results are
+             reused for up to max_age_days (7 days by default), even if the
+             warehouse was updated since. Runs that need the latest data
+             refresh the cache (re-query every dataset and store the new
+             results) or bypass it:
+               - mode 'use': read and store results (default)
+               - mode 'refresh': ignore the cached results, store the new ones
+               - mode 'off': no reads, no writes
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import os
+import copy
+import json
+import time
+import pickle
+import hashlib
+import threading
+
+import numpy as np
+import shapely
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.ast_cache', 'results')
+
+CACHE_MODES = ['use', 'refresh', 'off']
+
+# bump when the overlay results change (columns, RESULT and band labels...),
+# to invalidate the cached results of earlier versions
+RESULTS_VERSION = 1
+
+
+
+def get_aoi_hash (gdf_aoi, id_col=None):
+    """Returns a hash of the AOI geometries. Geometries are normalized, so the
+       hash does not depend on vertex order or Z values"""
+    h = hashlib.sha256()
+    h.update(str(gdf_aoi.crs.to_epsg()).encode('utf-8'))
+
+    if id_col:
+        gdf_aoi = gdf_aoi.sort_values(id_col)
+        for aoi_id in gdf_aoi[id_col]:
+            h.update(str(aoi_id).encode('utf-8'))
+
+    geoms = shapely.normalize(np.asarray(gdf_aoi.geometry.values))
+    for geom_wkb in shapely.to_wkb(geoms, output_dimension=2):
+        h.update(geom_wkb)
+
+    return h.hexdigest()
+
+
+
+class OverlayResultCache:
+    """ Local cache of per-dataset overlay results"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size_mb=2048, max_age_days=7, mode='use'):
+        if mode not in CACHE_MODES:
+            raise ValueError('Possible cache modes are {}'.format(', '.join(CACHE_MODES)))
+
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.max_size = max_size_mb * 1024 * 1024
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index_file = os.path.join(self.cache_dir, 'index.json')
+
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        self._index = self._load_index()
+
+
+    def with_mode(self, mode):
+        """Returns a view of the cache (same entries) with another mode,
+           e.g for one job of a long-lived process"""
+        if mode not in CACHE_MODES:
+            raise ValueError('Possible cache modes are {}'.format(', '.join(CACHE_MODES)))
+
+        view = copy.copy(self)
+        view.mode = mode
+        view.hits = 0
+        view.misses = 0
+
+        return view
+
+
+    def _load_index(self):
+        """Returns the cache index: key -> created, last access and size"""
+        if not os.path.isfile(self._index_file):
+            return {}
+        try:
+            with open(self._index_file, 'r') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return {}
+
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + '.pkl')
+
+
+    def _remove(self, key):
+        """Removes an entry from the index and disk"""
+        self._index.pop(key, None)
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+
+    def make_key(self, aoi_hash, table, def_query, radius, cols, version=''):
+        """Returns the cache key of an overlay"""
+        if not isinstance(cols, str):
+            cols = ','.join(cols)
+
+        parts = [str(RESULTS_VERSION), aoi_hash, table.strip().upper(), def_query.strip(),
+                 str(radius), cols, str(version)]
+
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+    def get(self, key):
+        """Returns the cached overlay result of a key, or None"""
+        if self.mode != 'use':
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            entry = self._index.get(key)
+
+            if entry is not None and time.time() - entry['created'] > self.max_age:
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            try:
+                with open(self._entry_path(key), 'rb') as f:
+                    value = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            entry['accessed'] = time.time()
+            self.hits += 1
+
+        return value
+
+
+    def put(self, key, value):
+        """Stores an overlay result"""
+        if self.mode == 'off':
+            return
+
+        path = self._entry_path(key)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._lock:
+            self._index[key] = {'created': now,
+                                'accessed': now,
+                                'size': os.path.getsize(path)}
+
+
+    def evict(self):
+        """Removes expired entries, then the least recently used
+           entries until the cache is under its size limit"""
+        now = time.time()
+        with self._lock:
+            for key in [k for k, e in self._index.items() if now - e['created'] > self.max_age]:
+                self._remove(key)
+
+            total = sum(e['size'] for e in self._index.values())
+            for key in sorted(self._index, key=lambda k: self._index[k]['accessed']):
+                if total <= self.max_size:
+                    break
+                total -= self._index[key]['size']
+                self._remove(key)
+
+
+    def save(self):
+        """Evicts old entries and writes the cache index to disk"""
+        if self.mode == 'off':
+            return
+
+        self.evict()
+
+        with self._lock:
+            tmp_file = self._index_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump(self._index, f)
+            os.replace(tmp_file, self._index_file)
@@ -0,0 +1,184 @@
+"""
+Name:        Overlay store
+Purpose:     Holds the per-dataset overlay results of a statusing run within a
+             memory budget. Results that do not fit in the budget are dropped
+             from memory and read back from the run checkpoint (Parquet) by
+             the output stages, in chunks.
+
+Notes        Every completed dataset is already written to the run checkpoint,
+             so spilling a result only means releasing its dataframe.
+
+             Datasets resumed from a checkpoint are not loaded in memory.
+
+             Outputs read the spilled results one dataset at a time: the list
+             of conflicts in chunks of chunk_rows rows, the maps one layer at
+             a time. Peak memory is the budget plus the largest layer.
+
+             Requires pyarrow.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+from collections.abc import Mapping
+
+import pandas as pd
+
+
+DEFAULT_BUDGET_MB = 1024
+DEFAULT_CHUNK_ROWS = 50000
+
+
+
+def filter_aoi (df, aoi_id):
+    """Returns the rows of one AOI of a batch result, without the AOI_ID column"""
+    if aoi_id is None or 'AOI_ID' not in df.columns:
+        return df
+
+    return df.loc[df['AOI_ID'] == aoi_id].drop(columns='AOI_ID')
+
+
+
+def read_overlay (path, aoi_id=None):
+    """Returns the overlay results of a dataset from its Parquet file"""
+    return filter_aoi (pd.read_parquet(path), aoi_id)
+
+
+
+def iter_overlay (path, columns, aoi_id=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yields the columns of the overlay results of a dataset from its
+       Parquet file, in chunks of chunk_rows rows"""
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path)
+    read_cols = list(columns)
+    if aoi_id is not None and 'AOI_ID' in pf.schema_arrow.names and 'AOI_ID' not in read_cols:
+        read_cols.append('AOI_ID')
+
+    for batch in pf.iter_batches(batch_size=chunk_rows, columns=read_cols):
+        yield filter_aoi (batch.to_pandas(), aoi_id)[list(columns)]
+
+
+
+class OverlayStore:
+    """ Overlay results of a run: in memory up to a budget, on disk beyond"""
+
+    def __init__(self, checkpoint, budget_mb=DEFAULT_BUDGET_MB, chunk_rows=DEFAULT_CHUNK_ROWS):
+        self.checkpoint = checkpoint
+        self.budget = budget_mb * 1024 * 1024
+        self.chunk_rows = chunk_rows
+        self.memory_size = 0
+        self.spilled = 0
+        self._overlays = {} # index: (df_all or None if spilled, cols, col_lbl)
+
+
+    def __contains__(self, index):
+        return index in self._overlays
+
+
+    def __len__(self):
+        return len(self._overlays)
+
+
+    def add(self, index, overlay):
+        """Adds the overlay results of a dataset. Spills them if they do
+           not fit in the budget and are checkpointed"""
+        df_all, cols, col_lbl = overlay
+        size = int(df_all.memory_usage(deep=True).sum())
+
+        if self.memory_size + size > self.budget and self.checkpoint.is_done(index):
+            self._overlays[index] = (None, cols, col_lbl)
+            self.spilled += 1
+        else:
+            self._overlays[index] = overlay
+            self.memory_size += size
+
+
+    def add_checkpointed(self, index):
+        """Adds a dataset completed in a previous run, left on disk"""
+        entry = self.checkpoint.manifest['items'][str(index)]
+        self._overlays[index] = (None, entry['cols'], entry['col_lbl'])
+        self.spilled += 1
+
+
+    def is_spilled(self, index):
+        """Returns True if the results of a dataset are on disk"""
+        return self._overlays[index][0] is None
+
+
+    def get_path(self, index):
+        """Returns the Parquet file of a spilled dataset"""
+        return self.checkpoint.get_path(index)
+
+
+    def get_cols(self, index, aoi_id=None):
+        """Returns the result columns and map label column of a dataset"""
+        _, cols, col_lbl = self._overlays[index]
+        if aoi_id is not None:
+            cols = [col for col in cols if col != 'AOI_ID']
+
+        return cols, col_lbl
+
+
+    def count(self, index, aoi_id=None):
+        """Returns the number of results of a dataset (or of one AOI)"""
+        df_all = self._overlays[index][0]
+        if df_all is not None:
+            return filter_aoi (df_all, aoi_id).shape[0]
+
+        if aoi_id is None:
+            return self.checkpoint.manifest['items'][str(index)]['rows']
+
+        df_ids = pd.read_parquet(self.get_path(index), columns=['AOI_ID'])
+        return int((df_ids['AOI_ID'] == aoi_id).sum())
+
+
+    def get(self, index, aoi_id=None):
+        """Returns the overlay results (df_all, cols, col_lbl) of a dataset,
+           or of one AOI of a batch run"""
+        df_all = self._overlays[index][0]
+        if df_all is None:
+            df_all = read_overlay (self.get_path(index), aoi_id)
+        else:
+            df_all = filter_aoi (df_all, aoi_id)
+
+        cols, col_lbl = self.get_cols(index, aoi_id)
+
+        return df_all, cols, col_lbl
+
+
+    def iter_chunks(self, index, aoi_id=None):
+        """Yields the result columns of a dataset in chunks"""
+        df_all = self._overlays[index][0]
+        cols = self.get_cols(index, aoi_id)[0]
+
+        if df_all is None:
+            yield from iter_overlay (self.get_path(index), cols, aoi_id, self.chunk_rows)
+        else:
+            df_all = filter_aoi (df_all, aoi_id)
+            for start in range(0, max(df_all.shape[0], 1), self.chunk_rows):
+                yield df_all.iloc[start:start + self.chunk_rows][cols]
+
+
+
+class OverlayResults(Mapping):
+    """ Results of a run (item: result columns df), read from the store on access"""
+
+    def __init__(self, store, items, aoi_id=None):
+        self.store = store
+        self.items_index = items # item: dataset index
+        self.aoi_id = aoi_id
+
+
+    def __getitem__(self, item):
+        df_all, cols, col_lbl = self.store.get(self.items_index[item], self.aoi_id)
+
+        return df_all[cols]
+
+
+    def __iter__(self):
+        return iter(self.items_index)
+
+
+    def __len__(self):
+        return len(self.items_index)
@@ -0,0 +1,106 @@
+"""
+Name:        Proximity engine
+Purpose:     Classifies local (non-BCGW) target features into distance bands
+             from an AOI (INTERSECT, WITHIN 50 m, WITHIN 500 m...).
+
+Notes        The minimum distance from every target feature to the AOI is
+             computed in one vectorized pass: candidate pairs are found with
+             a STRtree 'dwithin' query at the largest band distance, then
+             distances are computed with shapely 2 array functions.
+             No buffer polygons are built.
+
+             Overlay (clipped) geometries are only computed if clip=True.
+
+             The distance column has the same name as in the BCGW proximity
+             queries (PROXIMITY_METERS, see proximity_sql), so local and BCGW
+             results can be combined.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import numpy as np
+import geopandas as gpd
+import shapely
+from shapely import STRtree
+
+from proximity_sql import DISTANCE_COL
+
+
+
+def get_band_labels (bands, intersect_label='INTERSECT', band_label='WITHIN {} m'):
+    """Returns the result label of each distance band"""
+    labels = [intersect_label]
+    for band in bands[1:]:
+        labels.append(band_label.format(band))
+
+    return np.array(labels, dtype=object)
+
+
+
+def get_distances (aoi_geoms, trg_geoms, max_distance):
+    """Returns the AOI index, target index and distance of all
+       AOI/target pairs within max_distance of each other"""
+    tree = STRtree(trg_geoms)
+
+    if max_distance > 0:
+        aoi_idx, trg_idx = tree.query(aoi_geoms, predicate='dwithin', distance=max_distance)
+        dist = shapely.distance(aoi_geoms[aoi_idx], trg_geoms[trg_idx])
+    else:
+        aoi_idx, trg_idx = tree.query(aoi_geoms, predicate='intersects')
+        dist = np.zeros(len(trg_idx))
+
+    return aoi_idx, trg_idx, dist
+
+
+
+def classify_proximity (gdf_aoi, gdf_trg, bands, aoi_id_col=None, clip=False,
+                        intersect_label='INTERSECT', band_label='WITHIN {} m'):
+    """Returns the target features within the largest distance band of the AOI,
+       with their minimum distance (PROXIMITY_METERS) and band label (RESULT).
+
+       bands:      distances in m, e.g [0, 50, 500]. 0 is the intersect band.
+       aoi_id_col: if provided, each target is classified against each AOI ID
+                   and tagged with it (batch mode). Otherwise the AOI features
+                   are treated as one AOI.
+       clip:       if True, the geometry of intersecting features is clipped
+                   to the AOI."""
+    bands = sorted(set([0] + [int(b) for b in bands]))
+    labels = get_band_labels (bands, intersect_label, band_label)
+
+    if gdf_trg.crs != gdf_aoi.crs:
+        gdf_trg = gdf_trg.to_crs(gdf_aoi.crs)
+
+    # one geometry per AOI
+    if aoi_id_col:
+        gdf_aoi = gdf_aoi.dissolve(by=aoi_id_col).reset_index()
+        aoi_ids = gdf_aoi[aoi_id_col].to_numpy()
+        aoi_geoms = np.asarray(gdf_aoi.geometry.values)
+    else:
+        aoi_geoms = np.array([shapely.union_all(np.asarray(gdf_aoi.geometry.values))])
+
+    trg_geoms = np.asarray(gdf_trg.geometry.values)
+
+    aoi_idx, trg_idx, dist = get_distances (aoi_geoms, trg_geoms, bands[-1])
+
+    band_idx = np.searchsorted(bands, dist, side='left')
+    band_idx = np.minimum(band_idx, len(bands) - 1)
+
+    order = np.lexsort((trg_idx, aoi_idx))
+    aoi_idx, trg_idx, dist, band_idx = aoi_idx[order], trg_idx[order], dist[order], band_idx[order]
+
+    gdf_res = gdf_trg.iloc[trg_idx].reset_index(drop=True)
+
+    if aoi_id_col:
+        gdf_res.insert(0, aoi_id_col, aoi_ids[aoi_idx])
+
+    gdf_res[DISTANCE_COL] = dist
+    gdf_res['RESULT'] = labels[band_idx]
+
+    if clip:
+        geoms = np.asarray(gdf_res.geometry.values)
+        intr = dist == 0
+        geoms[intr] = shapely.intersection(geoms[intr], aoi_geoms[aoi_idx[intr]])
+        gdf_res[gdf_res.geometry.name] = gpd.GeoSeries(geoms, index=gdf_res.index, crs=gdf_res.crs)
+
+    return gdf_res
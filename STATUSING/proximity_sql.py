@@ -0,0 +1,58 @@
+"""
+Name:        Proximity SQL
+Purpose:     Builds the SQL used to classify BCGW features into distance bands
+             from an AOI (INTERSECT, Within 50 m, Within 500 m...) on the
+             database side.
+
+Notes        Proximity queries make one spatial index scan
+             (SDO_WITHIN_DISTANCE) at the largest band distance, compute the
+             exact distance of each hit once in an inline view, and label
+             the hits with a CASE expression on that distance:
+
+                SELECT p.*, {band_case} AS RESULT
+                FROM (SELECT b.COL1, b.COL2,
+                             SDO_GEOM.SDO_DISTANCE(b.SHAPE, a.SHAPE, 0.5) PROXIMITY_METERS,
+                             ...
+                      WHERE SDO_WITHIN_DISTANCE (b.SHAPE, a.SHAPE,
+                                                 'distance = {radius}') = 'TRUE') p
+
+             Each hit is returned once, with its distance and band label,
+             in a single round-trip per dataset.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+
+DISTANCE_COL = 'PROXIMITY_METERS'
+
+
+
+def get_bands (bands):
+    """Returns the sorted distance bands, including the intersect band (0)"""
+    if not isinstance(bands, (list, tuple, set)):
+        bands = [bands]
+
+    return sorted(set([0] + [int(float(b)) for b in bands]))
+
+
+
+def get_band_case (bands, distance_col='p.' + DISTANCE_COL,
+                   intersect_label='INTERSECT', band_label='WITHIN {} m'):
+    """Returns the SQL CASE expression labelling a distance with its band.
+       Hits beyond the largest band (index tolerance) get the largest band label"""
+    bands = get_bands (bands)
+
+    def quote (label):
+        return "'" + label.replace("'", "''") + "'"
+
+    # intersect only: all hits are intersects
+    if len(bands) == 1:
+        return quote(intersect_label)
+
+    whens = ['WHEN {} = 0 THEN {}'.format(distance_col, quote(intersect_label))]
+    for band in bands[1:-1]:
+        whens.append('WHEN {} <= {} THEN {}'.format(distance_col, band, quote(band_label.format(band))))
+    whens.append('ELSE {}'.format(quote(band_label.format(bands[-1]))))
+
+    return 'CASE ' + ' '.join(whens) + ' END'
@@ -0,0 +1,138 @@
+"""
+Name:        Run checkpoint
+Purpose:     Checkpoints the per-dataset overlay results of a statusing run,
+             so that a failed run can be resumed without re-running the
+             datasets that already completed.
+
+Notes        Each completed dataset is written to the run directory as a
+             Parquet file. A manifest (json) lists the completed datasets,
+             their result columns and map label column.
+
+             The manifest also stores a run key (AOI hash, region...). A run
+             directory is only resumed if the run key matches.
+
+             When a new run starts, the run directory of the previous run is
+             kept as <run_dir>_prev (e.g to compare the two runs with
+             status_diff), replacing the one before it.
+
+             Requires pyarrow.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import os
+import json
+import shutil
+from datetime import datetime
+
+import pandas as pd
+from shapely.geometry.base import BaseGeometry
+
+
+
+class RunCheckpoint:
+    """ Checkpoint of the overlay results of a statusing run"""
+
+    def __init__(self, run_dir, run_key, resume=False):
+        self.run_dir = run_dir
+        self.run_key = run_key
+        self._manifest_file = os.path.join(run_dir, 'manifest.json')
+
+        manifest = None
+        if resume:
+            manifest = self._load_manifest()
+
+            if manifest is None:
+                print ('....no checkpoint found in {}: starting a new run'.format(run_dir))
+            elif manifest['run_key'] != run_key:
+                print ('....checkpoint inputs do not match this run: starting a new run')
+                manifest = None
+            else:
+                print ('....resuming run: {} datasets already completed'.format(len(manifest['items'])))
+
+        if manifest is None:
+            if os.path.exists(run_dir):
+                self._rotate()
+            os.makedirs(run_dir)
+            manifest = {'run_key': run_key,
+                        'created': datetime.now().isoformat(timespec='seconds'),
+                        'items': {}}
+
+        self.manifest = manifest
+        self._write_manifest()
+
+
+    def _rotate(self):
+        """Keeps the run directory of the previous run as <run_dir>_prev"""
+        prev_dir = self.run_dir.rstrip(os.sep) + '_prev'
+        if os.path.exists(prev_dir):
+            shutil.rmtree(prev_dir)
+
+        if os.path.isfile(self._manifest_file):
+            os.replace(self.run_dir, prev_dir)
+        else:
+            shutil.rmtree(self.run_dir)
+
+
+    def _load_manifest(self):
+        """Returns the manifest of the run directory (if any)"""
+        if not os.path.isfile(self._manifest_file):
+            return None
+        try:
+            with open(self._manifest_file, 'r') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return None
+
+
+    def _write_manifest(self):
+        """Writes the manifest to the run directory"""
+        tmp_file = self._manifest_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_file, self._manifest_file)
+
+
+    def is_done(self, index):
+        """Returns True if the dataset was completed in a previous run"""
+        return str(index) in self.manifest['items']
+
+
+    def save(self, index, item, overlay):
+        """Writes the overlay results of a dataset to the run directory"""
+        df_all, cols, col_lbl = overlay
+
+        # geometries are stored as WKB
+        df = df_all.copy()
+        if 'SHAPE' in df.columns:
+            df['SHAPE'] = [g.wkb if isinstance(g, BaseGeometry) else g for g in df['SHAPE']]
+
+        # parquet columns must hold a single type
+        for col in df.columns:
+            if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith('mixed'):
+                df[col] = df[col].astype(str)
+
+        filename = 'item_{}.parquet'.format(index)
+        df.reset_index(drop=True).to_parquet(os.path.join(self.run_dir, filename), index=False)
+
+        self.manifest['items'][str(index)] = {'item': item,
+                                              'file': filename,
+                                              'cols': list(cols),
+                                              'col_lbl': col_lbl,
+                                              'rows': int(df.shape[0]),
+                                              'completed': datetime.now().isoformat(timespec='seconds')}
+        self._write_manifest()
+
+
+    def get_path(self, index):
+        """Returns the Parquet file of a checkpointed dataset"""
+        return os.path.join(self.run_dir, self.manifest['items'][str(index)]['file'])
+
+
+    def load(self, index):
+        """Returns the checkpointed overlay results of a dataset"""
+        entry = self.manifest['items'][str(index)]
+        df_all = pd.read_parquet(self.get_path(index))
+
+        return df_all, entry['cols'], entry['col_lbl']
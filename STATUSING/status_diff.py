@@ -0,0 +1,385 @@
+"""
+Name:        Status diff
+Purpose:     Compares two AST_lite statusing runs of the same AOI(s) and reports
+             the features added, removed and changed in each dataset.
+
+Notes        A stored run is the run_checkpoint folder of an AST_lite workspace
+             (one Parquet file per dataset and a manifest). A new run in the
+             same workspace keeps the previous run as run_checkpoint_prev:
+             by default, a workspace is compared to its previous run.
+
+             Datasets are matched by name. Duplicate names in a run are
+             numbered in spreadsheet order, with a warning.
+
+             Hits of a dataset are matched on a feature key:
+               - a key column, if one is provided for the dataset (key_cols)
+               - otherwise a hash of the normalized geometry (independent of
+                 vertex order and Z values)
+               - or of the attributes, for results without geometry
+             In batch runs, the AOI ID is part of the key. Duplicate keys are
+             numbered in order of appearance.
+
+             Keys and attribute values are hashed to 64 bit integers, column
+             wise, and the two runs are joined on the key hash. Only the
+             matched hits whose attribute hash differs are compared column by
+             column.
+
+             Outputs: a change report (xlsx: summary and changes) and a map of
+             the added, removed and changed features (layers loaded when
+             toggled on, see lazy_geojson).
+
+Arguments:   new: workspace (or run_checkpoint folder) of the new run
+             --old: workspace (or run_checkpoint folder) of the previous run
+                    (default: run_checkpoint_prev of the new workspace)
+             --out: output folder (default: new workspace/diff)
+             --aoi: AOI file, drawn on the map
+             --key: key column of a dataset, as item=COLUMN (repeatable)
+             --no-map: report only
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import os
+import json
+import timeit
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+CHANGE_COLORS = {'ADDED': '#1b9e77', 'REMOVED': '#d95f02', 'CHANGED': '#7570b3'}
+GEOM_COL = 'SHAPE'
+
+
+
+def get_run_dir (path):
+    """Returns the run_checkpoint folder of a workspace (or the folder itself)"""
+    if os.path.isfile(os.path.join(path, 'manifest.json')):
+        return path
+
+    run_dir = os.path.join(path, 'run_checkpoint')
+    if not os.path.isfile(os.path.join(run_dir, 'manifest.json')):
+        raise Exception('No stored run in {}'.format(path))
+
+    return run_dir
+
+
+
+def get_prev_run_dir (path):
+    """Returns the run_checkpoint_prev folder (previous run) of a workspace
+       (or of a run_checkpoint folder)"""
+    run_dir = get_run_dir (path).rstrip(os.sep) + '_prev'
+    if not os.path.isfile(os.path.join(run_dir, 'manifest.json')):
+        raise Exception('No previous run in {}'.format(path))
+
+    return run_dir
+
+
+
+def load_run (path):
+    """Returns the datasets of a stored run: item: (Parquet file, cols, col_lbl).
+       Duplicate dataset names are numbered in spreadsheet order"""
+    run_dir = get_run_dir (path)
+    with open(os.path.join(run_dir, 'manifest.json'), 'r') as f:
+        manifest = json.load(f)
+
+    run = {}
+    for index in sorted(manifest['items'], key=int):
+        entry = manifest['items'][index]
+        item = entry['item']
+        if item in run:
+            nbr = 2
+            while '{} ({})'.format(item, nbr) in run:
+                nbr += 1
+            print ('....WARNING: duplicate dataset name in {}: {} (row {}) is compared as "{} ({})"'.format(
+                    run_dir, item, index, item, nbr))
+            item = '{} ({})'.format(item, nbr)
+
+        run[item] = (os.path.join(run_dir, entry['file']), entry['cols'], entry['col_lbl'])
+
+    return run
+
+
+
+def hash_columns (df):
+    """Returns a 64 bit hash of the values of each row"""
+    if df.shape[1] == 0:
+        return np.zeros(df.shape[0], dtype=np.uint64)
+
+    return pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()
+
+
+
+def get_geometry_keys (geoms):
+    """Returns a hash of each geometry (WKB or WKT), normalized so that it does
+       not depend on vertex order or Z values"""
+    import shapely
+
+    values = geoms.to_numpy()
+    is_wkb = np.array([isinstance(v, (bytes, bytearray, memoryview)) for v in values], dtype=bool)
+
+    parsed = np.empty(len(values), dtype=object)
+    if is_wkb.any():
+        parsed[is_wkb] = shapely.from_wkb(values[is_wkb], on_invalid='ignore')
+    if (~is_wkb).any():
+        parsed[~is_wkb] = shapely.from_wkt(values[~is_wkb].astype(str), on_invalid='ignore')
+
+    norm = shapely.to_wkb(shapely.normalize(parsed), output_dimension=2)
+
+    return pd.util.hash_pandas_object(pd.Series(norm, dtype=object), index=False).to_numpy()
+
+
+
+def get_feature_keys (df, key_col=None):
+    """Returns the feature key hash of each hit"""
+    if key_col is not None and key_col in df.columns:
+        keys = hash_columns (df[[key_col]])
+    elif GEOM_COL in df.columns:
+        keys = get_geometry_keys (df[GEOM_COL])
+    else:
+        keys = hash_columns (df.drop(columns=['AOI_ID', 'RESULT'], errors='ignore'))
+
+    if 'AOI_ID' in df.columns:
+        keys = hash_columns (pd.DataFrame({'key': keys, 'aoi': df['AOI_ID'].to_numpy()}))
+
+    # duplicate keys are numbered in order of appearance
+    dup_nbr = pd.Series(keys).groupby(keys).cumcount().to_numpy()
+    if dup_nbr.any():
+        keys = hash_columns (pd.DataFrame({'key': keys, 'nbr': dup_nbr}))
+
+    return keys
+
+
+
+def diff_dataset (df_old, df_new, cols, key_col=None):
+    """Returns the added, removed and changed hits of a dataset between two runs.
+       Changed hits hold the new values and the list of changed fields"""
+    cols = [col for col in cols if col in df_old.columns and col in df_new.columns]
+
+    df_old = df_old.reset_index(drop=True)
+    df_new = df_new.reset_index(drop=True)
+
+    keys_old = pd.DataFrame({'key': get_feature_keys (df_old, key_col),
+                             'hash_old': hash_columns (df_old[cols]),
+                             'row_old': np.arange(df_old.shape[0])})
+    keys_new = pd.DataFrame({'key': get_feature_keys (df_new, key_col),
+                             'hash_new': hash_columns (df_new[cols]),
+                             'row_new': np.arange(df_new.shape[0])})
+
+    df_join = keys_old.merge(keys_new, on='key', how='outer', indicator=True)
+
+    rows_add = df_join.loc[df_join['_merge'] == 'right_only', 'row_new'].astype(int)
+    rows_rem = df_join.loc[df_join['_merge'] == 'left_only', 'row_old'].astype(int)
+    df_chg = df_join.loc[(df_join['_merge'] == 'both') & (df_join['hash_old'] != df_join['hash_new'])]
+
+    added = df_new.iloc[rows_add.to_numpy()].copy()
+    added['CHANGE'] = 'ADDED'
+    added['CHANGED_FIELDS'] = ''
+
+    removed = df_old.iloc[rows_rem.to_numpy()].copy()
+    removed['CHANGE'] = 'REMOVED'
+    removed['CHANGED_FIELDS'] = ''
+
+    old_vals = df_old.iloc[df_chg['row_old'].astype(int).to_numpy()][cols].astype(str).reset_index(drop=True)
+    new_vals = df_new.iloc[df_chg['row_new'].astype(int).to_numpy()][cols].astype(str).reset_index(drop=True)
+
+    fields = pd.Series('', index=new_vals.index, dtype=object)
+    for col in cols:
+        diff = old_vals[col] != new_vals[col]
+        fields[diff] = fields[diff] + col + ': ' + old_vals.loc[diff, col] + ' -> ' + new_vals.loc[diff, col] + ' ; '
+
+    changed = df_new.iloc[df_chg['row_new'].astype(int).to_numpy()].copy()
+    changed['CHANGE'] = 'CHANGED'
+    changed['CHANGED_FIELDS'] = fields.str.rstrip(' ;').to_numpy()
+
+    return pd.concat([added, removed, changed], ignore_index=True)
+
+
+
+def diff_runs (old, new, key_cols=None):
+    """Returns the changes between two stored runs (one row per added, removed
+       or changed hit) and a summary per dataset"""
+    key_cols = key_cols or {}
+    run_old = load_run (old)
+    run_new = load_run (new)
+
+    changes = []
+    summary = []
+    for item in sorted(set(run_old).union(run_new)):
+        if item not in run_old or item not in run_new:
+            summary.append({'item': item, 'status': 'NOT IN {} RUN'.format('PREVIOUS' if item not in run_old else 'NEW'),
+                            'ADDED': 0, 'REMOVED': 0, 'CHANGED': 0})
+            continue
+
+        path_old, cols, col_lbl = run_old[item]
+        path_new, cols_new, col_lbl = run_new[item]
+        cols = [col for col in cols_new if col in cols and col != 'AOI_ID']
+
+        df_diff = diff_dataset (pd.read_parquet(path_old), pd.read_parquet(path_new),
+                                cols, key_cols.get(item))
+
+        counts = df_diff['CHANGE'].value_counts()
+        summary.append({'item': item,
+                        'status': 'CHANGED' if df_diff.shape[0] > 0 else 'NO CHANGE',
+                        'ADDED': int(counts.get('ADDED', 0)),
+                        'REMOVED': int(counts.get('REMOVED', 0)),
+                        'CHANGED': int(counts.get('CHANGED', 0))})
+
+        if df_diff.shape[0] > 0:
+            df_diff.insert(0, 'item', item)
+            df_diff['LABEL'] = df_diff[col_lbl].astype(str) if col_lbl in df_diff.columns else df_diff['CHANGE']
+            df_diff['DETAILS'] = get_details (df_diff, cols)
+            changes.append(df_diff[['item', 'CHANGE', 'LABEL', 'DETAILS', 'CHANGED_FIELDS'] +
+                                   (['AOI_ID'] if 'AOI_ID' in df_diff.columns else []) +
+                                   ([GEOM_COL] if GEOM_COL in df_diff.columns else [])])
+
+    if len(changes) > 0:
+        df_changes = pd.concat(changes, ignore_index=True)
+    else:
+        df_changes = pd.DataFrame(columns=['item', 'CHANGE', 'LABEL', 'DETAILS', 'CHANGED_FIELDS'])
+
+    df_summary = pd.DataFrame(summary, columns=['item', 'status', 'ADDED', 'REMOVED', 'CHANGED'])
+
+    return df_changes, df_summary
+
+
+
+def get_details (df, cols):
+    """Returns the values of the result columns of each hit joined by ','"""
+    cols = [col for col in cols if col in df.columns and col != 'RESULT']
+    if len(cols) == 0:
+        return ''
+
+    vals = df[cols].astype(str)
+    details = vals.iloc[:, 0]
+    for i in range(1, vals.shape[1]):
+        details = details + ',' + vals.iloc[:, i]
+
+    return details.to_numpy()
+
+
+
+def write_diff_report (df_changes, df_summary, filename):
+    """Writes the summary and the changes to a spreadsheet"""
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(filename, {'constant_memory': True,
+                                              'strings_to_formulas': False})
+    hdr_format = workbook.add_format({'bold': True, 'font_color': 'white', 'bg_color': '#4F81BD'})
+
+    sheets = [('Summary', df_summary, [60, 20, 10, 10, 10]),
+              ('Changes', df_changes.drop(columns=GEOM_COL, errors='ignore'), [60, 12, 30, 80, 80, 15])]
+    for sheetname, df, widths in sheets:
+        worksheet = workbook.add_worksheet(sheetname)
+        for i, width in enumerate(widths[:df.shape[1]]):
+            worksheet.set_column(i, i, width)
+
+        worksheet.write_row(0, 0, list(df.columns), hdr_format)
+        row_nbr = 0
+        for row_nbr, row in enumerate(df.astype(str).itertuples(index=False, name=None), 1):
+            worksheet.write_row(row_nbr, 0, row)
+
+        worksheet.autofilter(0, 0, row_nbr, max(df.shape[1] - 1, 0))
+        worksheet.freeze_panes(1, 0)
+
+    workbook.close()
+
+    return filename
+
+
+
+def write_diff_map (df_changes, out_dir, gdf_aoi=None, filename='status_changes.html'):
+    """Writes a map of the changed features: one layer per dataset and type of
+       change, loaded when toggled on. Returns the HTML file"""
+    import folium
+    import geopandas as gpd
+    from lazy_geojson import add_lazy_layer
+    from web_map_optimizer import optimize_for_web
+
+    m = folium.Map(tiles='openstreetmap')
+
+    df_geo = df_changes.loc[df_changes[GEOM_COL].notna()] if GEOM_COL in df_changes.columns else df_changes.iloc[0:0]
+    bounds = []
+
+    if gdf_aoi is not None:
+        gdf_aoi = optimize_for_web (gdf_aoi)
+        gdf_aoi.explore(m=m, tooltip=False, name='AOI',
+                        style_kwds=dict(fill=False, color='red', weight=3))
+        bounds.append(gdf_aoi.total_bounds)
+
+    for index, ((item, change), df) in enumerate(df_geo.groupby(['item', 'CHANGE'], sort=True)):
+        geoms = df[GEOM_COL]
+        if isinstance(geoms.iloc[0], str):
+            geoms = gpd.GeoSeries.from_wkt(geoms, crs=3005)
+        else:
+            geoms = gpd.GeoSeries.from_wkb(geoms.apply(bytes), crs=3005)
+
+        gdf = gpd.GeoDataFrame(df.drop(columns=GEOM_COL), geometry=geoms.values, crs=3005)
+        gdf = optimize_for_web (gdf)
+        gdf['_color'] = CHANGE_COLORS[change]
+        bounds.append(gdf.total_bounds)
+
+        add_lazy_layer (m, gdf, out_dir, '{} - {}'.format(item, change), index,
+                        color_field='_color',
+                        tooltip_fields=['CHANGE', 'LABEL'],
+                        popup_fields=['item', 'CHANGE', 'DETAILS', 'CHANGED_FIELDS'])
+
+    if len(bounds) > 0:
+        bounds = np.array(bounds)
+        m.fit_bounds([[bounds[:, 1].min(), bounds[:, 0].min()], [bounds[:, 3].max(), bounds[:, 2].max()]])
+
+    folium.LayerControl(collapsed=False).add_to(m)
+
+    out_html = os.path.join(out_dir, filename)
+    m.save(out_html)
+
+    return out_html
+
+
+
+def compare_runs (old, new, out_dir, gdf_aoi=None, key_cols=None, make_map=True):
+    """Compares two stored runs and writes the change report (and map) to
+       out_dir. Returns the changes and the summary"""
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+
+    start_t = timeit.default_timer()
+    df_changes, df_summary = diff_runs (old, new, key_cols)
+    print ('....compared {} datasets in {} s'.format(df_summary.shape[0], round(timeit.default_timer() - start_t, 3)))
+    print ('....added: {}, removed: {}, changed: {}'.format(
+            df_summary['ADDED'].sum(), df_summary['REMOVED'].sum(), df_summary['CHANGED'].sum()))
+
+    print ('\nWriting the change report')
+    write_diff_report (df_changes, df_summary, os.path.join(out_dir, 'AST_lite_changes.xlsx'))
+
+    if make_map and df_changes.shape[0] > 0:
+        print ('\nWriting the change map')
+        write_diff_map (df_changes, out_dir, gdf_aoi)
+
+    return df_changes, df_summary
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Changes between two AST_lite runs')
+    parser.add_argument('new', help='workspace (or run_checkpoint folder) of the new run')
+    parser.add_argument('--old', help='workspace (or run_checkpoint folder) of the previous run '
+                                      '(default: run_checkpoint_prev of the new workspace)')
+    parser.add_argument('--out', help='output folder (default: new workspace/diff)')
+    parser.add_argument('--aoi', help='AOI file, drawn on the map')
+    parser.add_argument('--key', action='append', default=[], help='key column of a dataset: item=COLUMN')
+    parser.add_argument('--no-map', action='store_true')
+    args = parser.parse_args()
+
+    key_cols = dict(k.split('=', 1) for k in args.key)
+    out_dir = args.out or os.path.join(args.new, 'diff')
+    old = args.old or get_prev_run_dir (args.new)
+
+    gdf_aoi = None
+    if args.aoi:
+        from AST_lite import esri_to_gdf
+        gdf_aoi = esri_to_gdf (args.aoi)
+
+    compare_runs (old, args.new, out_dir, gdf_aoi, key_cols, make_map=not args.no_map)
@@ -0,0 +1,254 @@
+"""
+Name:        Status map renderer
+Purpose:     Renders the AST_lite interactive HTML maps (AOI and overlapping
+             features of each dataset) in a process pool, once the overlay
+             queries are completed.
+
+Notes        The base map (basemaps, AOI layer, layer control, CSS and JS
+             headers) is rendered to HTML once. It holds an empty placeholder
+             layer for the dataset features.
+
+             Each worker receives the base template once (pool initializer),
+             then for each dataset only serializes the dataset features to
+             GeoJSON and injects them, with their styling, tooltip and popup,
+             into the placeholder layer.
+
+             Dataset features are coloured by their label column, using the
+             Dark2 palette.
+
+             Geometries are simplified and their coordinates rounded for the
+             web (see web_map_optimizer).
+
+             The features of a layer can be given as a function returning them
+             (e.g results spilled to disk): they are then loaded by the worker
+             rendering the map, one layer at a time.
+
+             Alternatively, render_index_map() writes a single index map where
+             each dataset is a layer loaded from a GeoJSON sidecar file only
+             when it is toggled on (see lazy_geojson).
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import folium
+
+from lazy_geojson import add_lazy_layer
+from web_map_optimizer import optimize_for_web, DEFAULT_PRECISION, DEFAULT_ZOOM
+
+
+PLACEHOLDER = '__AST_DATASET_LAYER__'
+DARK2 = ['#1b9e77', '#d95f02', '#7570b3', '#e7298a', '#66a61e', '#e6ab02', '#a6761d', '#666666']
+
+LAYER_JS = """
+(function() {{
+    var data = {geojson};
+    var colors = {colors};
+    var lbl = {col_lbl};
+
+    function esc (v) {{
+        return String(v).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+    }}
+
+    var layer = L.geoJson(data, {{
+        style: function (f) {{
+            return {{color: 'gray', weight: 2, fillOpacity: 0.5,
+                     fillColor: colors[f.properties[lbl]]}};
+        }},
+        pointToLayer: function (f, latlng) {{
+            return L.circleMarker(latlng, {{radius: 6}});
+        }},
+        onEachFeature: function (f, l) {{
+            l.bindTooltip(esc(f.properties[lbl]));
+            var rows = '';
+            for (var k in f.properties) {{
+                rows += '<tr><th>' + esc(k) + '</th><td>' + esc(f.properties[k]) + '</td></tr>';
+            }}
+            l.bindPopup('<table>' + rows + '</table>', {{maxWidth: 500}});
+        }}
+    }});
+    layer.addTo({layer_name});
+
+    var legend = L.control({{position: 'bottomright'}});
+    legend.onAdd = function () {{
+        var div = L.DomUtil.create('div');
+        div.style.cssText = 'background: white; padding: 6px; font-size: 12px; max-height: 300px; overflow-y: auto;';
+        var html = '<b>' + esc(lbl) + '</b>';
+        for (var v in colors) {{
+            html += '<br><i style="background:' + colors[v] + ';width:12px;height:12px;display:inline-block;margin-right:4px;"></i>' + esc(v);
+        }}
+        div.innerHTML = html;
+        return div;
+    }};
+    legend.addTo({map_name});
+}})();
+"""
+
+
+
+def make_base_template (gdf_aoi, precision=DEFAULT_PRECISION, zoom=DEFAULT_ZOOM):
+    """Returns the HTML of the base map (basemaps, AOI and an empty dataset layer),
+       the name of the map and the name of the placeholder dataset layer"""
+    gdf_aoi = optimize_for_web (gdf_aoi, precision, zoom)
+
+    m = folium.Map(tiles='openstreetmap')
+    xmin,ymin,xmax,ymax = gdf_aoi['geometry'].total_bounds
+    m.fit_bounds([[ymin, xmin], [ymax, xmax]])
+
+    gdf_aoi.explore(
+         m=m,
+         tooltip= False,
+         style_kwds=dict(fill= False, color="red", weight=3),
+         name="AOI")
+
+    layer = folium.FeatureGroup(name=PLACEHOLDER)
+    layer.add_to(m)
+
+    folium.TileLayer('stamenterrain', control=True).add_to(m)
+    folium.LayerControl().add_to(m)
+
+    html = m.get_root().render()
+
+    return html, m.get_name(), layer.get_name()
+
+
+
+def get_label_colors (values):
+    """Returns the colour of each label value (Dark2 palette)"""
+    labels = sorted(set(str(v) for v in values))
+
+    return {v: DARK2[i % len(DARK2)] for i, v in enumerate(labels)}
+
+
+
+def render_status_map (template, gdf_intr, col_lbl, item, out_html,
+                       precision=DEFAULT_PRECISION, zoom=DEFAULT_ZOOM):
+    """Writes the HTML map of a dataset from the base template.
+       gdf_intr can be a function returning the features"""
+    html, map_name, layer_name = template
+
+    if callable(gdf_intr):
+        gdf_intr = gdf_intr()
+
+    gdf_intr = optimize_for_web (gdf_intr, precision, zoom, report=True, name=item)
+    gdf_intr[col_lbl] = gdf_intr[col_lbl].astype(str)
+
+    layer_js = LAYER_JS.format(geojson=gdf_intr.to_json(),
+                               colors=json.dumps(get_label_colors(gdf_intr[col_lbl])),
+                               col_lbl=json.dumps(col_lbl),
+                               layer_name=layer_name,
+                               map_name=map_name)
+
+    html = html.replace(json.dumps(PLACEHOLDER), json.dumps(item))
+    head, tail = html.rsplit('</html>', 1)
+    html = head + '<script>' + layer_js + '</script>\n</html>' + tail
+
+    with open(out_html, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+    return out_html
+
+
+
+_TEMPLATE = None
+
+def _init_worker (template):
+    """Stores the base template in the worker process"""
+    global _TEMPLATE
+    _TEMPLATE = template
+
+
+def _render_worker (gdf_intr, col_lbl, item, out_html, precision, zoom):
+    return render_status_map (_TEMPLATE, gdf_intr, col_lbl, item, out_html, precision, zoom)
+
+
+
+def render_status_maps (gdf_aoi, layers, maps_dir, workers=None,
+                        precision=DEFAULT_PRECISION, zoom=DEFAULT_ZOOM):
+    """Renders the HTML maps of a list of (item, gdf_intr, col_lbl) layers
+       to maps_dir, in a process pool. Returns the list of HTML files.
+       gdf_intr can be a (picklable) function returning the features
+
+       precision: number of decimals of the map coordinates
+       zoom: largest zoom level the geometries are simplified for"""
+    if len(layers) == 0:
+        return []
+
+    if not os.path.exists(maps_dir):
+        os.makedirs(maps_dir)
+
+    template = make_base_template (gdf_aoi, precision, zoom)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(layers))
+
+    tasks = [(gdf_intr, col_lbl, item, os.path.join(maps_dir, item + '.html'), precision, zoom)
+             for item, gdf_intr, col_lbl in layers]
+
+    if workers <= 1:
+        return [render_status_map (template, *task) for task in tasks]
+
+    out_htmls = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(template,)) as executor:
+        futures = [executor.submit(_render_worker, *task) for task in tasks]
+        for future in as_completed(futures):
+            out_htmls.append(future.result())
+
+    return out_htmls
+
+
+
+def render_index_map (gdf_aoi, layers, maps_dir, filename='00_all_layers.html',
+                      precision=DEFAULT_PRECISION, zoom=DEFAULT_ZOOM):
+    """Writes a single index map of a list of (item, gdf_intr, col_lbl) layers to
+       maps_dir. The features of each dataset are written to a sidecar file and
+       loaded when the layer is toggled on. Returns the index HTML file"""
+    if not os.path.exists(maps_dir):
+        os.makedirs(maps_dir)
+
+    gdf_aoi = optimize_for_web (gdf_aoi, precision, zoom)
+
+    m = folium.Map(tiles='openstreetmap')
+    xmin,ymin,xmax,ymax = gdf_aoi['geometry'].total_bounds
+    m.fit_bounds([[ymin, xmin], [ymax, xmax]])
+
+    gdf_aoi.explore(
+         m=m,
+         tooltip= False,
+         style_kwds=dict(fill= False, color="red", weight=3),
+         name="AOI")
+
+    sidecars_size = 0
+    for index, (item, gdf_intr, col_lbl) in enumerate(layers):
+        if callable(gdf_intr):
+            gdf_intr = gdf_intr()
+        gdf_intr = optimize_for_web (gdf_intr, precision, zoom, report=True, name=item)
+        gdf_intr[col_lbl] = gdf_intr[col_lbl].astype(str)
+        colors = get_label_colors (gdf_intr[col_lbl])
+        gdf_intr['_color'] = gdf_intr[col_lbl].map(colors)
+
+        popup_cols = [col for col in gdf_intr.columns
+                      if col not in (gdf_intr.geometry.name, '_color')]
+
+        layer, size = add_lazy_layer (m, gdf_intr, maps_dir, item, index,
+                                      color_field='_color',
+                                      tooltip_fields=[col_lbl],
+                                      popup_fields=popup_cols)
+        sidecars_size += size
+
+    folium.TileLayer('stamenterrain', control=True).add_to(m)
+    folium.LayerControl().add_to(m)
+
+    out_html = os.path.join(maps_dir, filename)
+    m.save(out_html)
+
+    print ('....index map: {} KB, {} layer files: {} KB'.format(
+            round(os.path.getsize(out_html)/1024), len(layers), round(sidecars_size/1024)))
+
+    return out_html
@@ -0,0 +1,163 @@
+"""
+Name:        Status report writer
+Purpose:     Writes the AST_lite TAB3 spreadsheet (Conflicts & Constraints):
+             one row per AST dataset with its list of conflicts and a link
+             to its map.
+
+Notes        The list of conflicts of each dataset is built with column-wise
+             string joins (no row by row apply), and joined to the AST datasets
+             by dataset name in one merge.
+
+             The spreadsheet is written row by row in xlsxwriter constant
+             memory mode: only the current row is held in memory.
+
+             The list of conflicts can also be built from chunks of a dataset
+             result (e.g results spilled to disk): chunks are read until the
+             list reaches the size of an Excel cell (32767 characters), the
+             longest text xlsxwriter writes to a cell.
+
+             Map links follow the map mode of the run: one map per dataset
+             ('maps'), the index map of all the datasets ('index'), or no
+             link ('none').
+
+             Datasets that were not run (e.g invalid rules) are listed with
+             the reason in their list of conflicts, and no map link.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import os
+
+import pandas as pd
+import xlsxwriter
+
+
+ITEM_COL = 'Featureclass_Name(valid characters only)'
+REPORT_COLS = ['Category', 'item', 'List of conflicts', 'Map']
+MAX_CELL_CHARS = 32767
+INDEX_MAP = '00_all_layers.html'
+
+
+
+def get_conflicts (df):
+    """Returns the list of conflicts of a dataset result: the values of
+       each row joined by ',' and the rows joined by ' ; '"""
+    df = df.drop(columns='RESULT', errors='ignore').astype(str)
+
+    if df.shape[1] == 0:
+        return ''
+
+    rows = df.iloc[:, 0]
+    for i in range(1, df.shape[1]):
+        rows = rows + ',' + df.iloc[:, i]
+
+    return ' ; '.join(rows.tolist())
+
+
+
+def get_chunked_conflicts (chunks, max_chars=MAX_CELL_CHARS):
+    """Returns the list of conflicts of a dataset result read in chunks (dfs).
+       Stops reading chunks once the list is max_chars long"""
+    parts = []
+    length = 0
+    for df in chunks:
+        if df.shape[0] == 0:
+            continue
+        parts.append(get_conflicts (df))
+        length += len(parts[-1]) + 3
+        if length > max_chars:
+            break
+
+    return ' ; '.join(parts)[:max_chars]
+
+
+
+def build_report (results, df_stat, workspace, map_mode='maps'):
+    """Returns the TAB3 report df: AST datasets joined to their conflicts.
+       map_mode 'none' leaves the map links empty (spreadsheet only runs)"""
+    conflicts = {k: get_conflicts (v) for k, v in results.items() if v.shape[0] > 0}
+
+    return build_conflicts_report (conflicts, df_stat, workspace, map_mode)
+
+
+
+def build_conflicts_report (conflicts, df_stat, workspace, map_mode='maps', not_run=None):
+    """Returns the TAB3 report df from the list of conflicts of each dataset
+       with results (item: conflicts). map_mode: 'maps' links each dataset
+       to its map, 'index' to the index map, 'none' leaves the links empty.
+       not_run: reason of each dataset that was not run (item: reason)"""
+    df_res = df_stat[['Category', ITEM_COL]].rename(columns={ITEM_COL: 'item'})
+
+    df_conf = pd.DataFrame({'item': list(conflicts.keys()),
+                            'List of conflicts': list(conflicts.values())},
+                           dtype=object)
+
+    maps_dir = os.path.join(workspace, 'maps')
+    if map_mode == 'maps':
+        df_conf['Map'] = '=HYPERLINK("' + maps_dir + os.sep + df_conf['item'] + '.html", "View Map")'
+    elif map_mode == 'index':
+        df_conf['Map'] = '=HYPERLINK("' + os.path.join(maps_dir, INDEX_MAP) + '", "View Map")'
+    else:
+        df_conf['Map'] = ''
+
+    df_res = df_res.merge(df_conf, on='item', how='left')
+    df_res[['List of conflicts', 'Map']] = df_res[['List of conflicts', 'Map']].fillna('')
+
+    for item, reason in (not_run or {}).items():
+        df_res.loc[df_res['item'] == item, ['List of conflicts', 'Map']] = ['NOT RUN: ' + reason, '']
+
+    return df_res[REPORT_COLS]
+
+
+
+def write_report (df_res, filename, sheetname='Conflicts & Constraints'):
+    """Writes the TAB3 report df to a spreadsheet, one row at a time"""
+    workbook = xlsxwriter.Workbook(filename, {'constant_memory': True,
+                                              'strings_to_formulas': False})
+    worksheet = workbook.add_worksheet(sheetname)
+
+    hdr_format = workbook.add_format({'bold': True, 'font_color': 'white', 'bg_color': '#4F81BD'})
+    txt_format = workbook.add_format({'text_wrap': True})
+    lnk_format = workbook.add_format({'underline': True, 'font_color': 'blue'})
+    worksheet.set_column(0, 0, 30)
+    worksheet.set_column(1, 1, 60)
+    worksheet.set_column(2, 2, 80, txt_format)
+    worksheet.set_column(3, 3, 20)
+
+    worksheet.write_row(0, 0, REPORT_COLS, hdr_format)
+
+    row_nbr = 0
+    for row_nbr, (category, item, conflicts, link) in enumerate(df_res[REPORT_COLS].itertuples(index=False, name=None), 1):
+        worksheet.write_string(row_nbr, 0, str(category))
+        worksheet.write_string(row_nbr, 1, str(item))
+        worksheet.write_string(row_nbr, 2, conflicts, txt_format)
+        if link:
+            worksheet.write_formula(row_nbr, 3, link, lnk_format, 'View Map')
+
+    worksheet.autofilter(0, 0, row_nbr, len(REPORT_COLS) - 1)
+    worksheet.freeze_panes(1, 0)
+
+    workbook.close()
+
+
+
+def write_xlsx (results, df_stat, workspace, map_mode='maps'):
+    """Writes results to a spreadsheet"""
+    df_res = build_report (results, df_stat, workspace, map_mode)
+
+    filename = os.path.join(workspace, 'AST_lite_TAB3.xlsx')
+    write_report (df_res, filename)
+
+    return df_res
+
+
+
+def write_conflicts_xlsx (conflicts, df_stat, workspace, map_mode='maps', not_run=None):
+    """Writes the list of conflicts of each dataset (item: conflicts) to a spreadsheet"""
+    df_res = build_conflicts_report (conflicts, df_stat, workspace, map_mode, not_run)
+
+    filename = os.path.join(workspace, 'AST_lite_TAB3.xlsx')
+    write_report (df_res, filename)
+
+    return df_res
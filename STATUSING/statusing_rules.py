@@ -0,0 +1,240 @@
+"""
+Name:        Statusing rules registry
+Purpose:     Parses the AST datasets spreadsheets (common and region specific)
+             into typed rules: dataset name, category, datasource, columns,
+             map label, definition query and buffer distance.
+
+Notes        The rules are validated when parsed and compiled to a local
+             cache keyed by the hash of the spreadsheets. Later loads of the
+             same spreadsheets read the compiled cache instead of parsing
+             the excel files.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import os
+import re
+import pickle
+import hashlib
+from dataclasses import dataclass, astuple
+
+import pandas as pd
+
+from def_query_compiler import compile_def_query
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.ast_cache', 'rules')
+
+# bump when the rules parsing changes, to invalidate compiled caches
+RULES_VERSION = 1
+
+ITEM_COL = 'Featureclass_Name(valid characters only)'
+FIELD_COLS = ['Fields_to_Summarize'] + ['Fields_to_Summarize' + str(f) for f in range(2, 7)]
+REQUIRED_COLS = ['Category', ITEM_COL, 'Datasource', 'map_label_field',
+                 'Definition_Query', 'Buffer_Distance'] + FIELD_COLS
+
+
+
+@dataclass(frozen=True)
+class StatusRule:
+    """ A dataset of the AST datasets spreadsheets"""
+    index: int
+    item: str
+    category: str
+    table: str
+    fields: tuple
+    label: str
+    def_query: str
+    radius: int
+
+    @property
+    def is_bcgw(self):
+        return self.table.startswith('WHSE') or self.table.startswith('REG')
+
+
+
+def get_files_hash (xls_files):
+    """Returns a hash of the content of the spreadsheets"""
+    h = hashlib.sha1(str(RULES_VERSION).encode('utf-8'))
+    for xls in xls_files:
+        with open(xls, 'rb') as f:
+            h.update(f.read())
+
+    return h.hexdigest()
+
+
+
+def get_rules_hash (rules):
+    """Returns a hash of the content of the rules (e.g to key the run
+       checkpoints: any edit of a rule changes it)"""
+    h = hashlib.sha1(str(RULES_VERSION).encode('utf-8'))
+    for rule in rules:
+        h.update(repr(astuple(rule)).encode('utf-8'))
+
+    return h.hexdigest()
+
+
+
+def clean_value (value):
+    """Returns a stripped string of a spreadsheet cell ('' if empty)"""
+    if pd.isnull(value):
+        return ''
+
+    return str(value).strip()
+
+
+
+def parse_rules (df_stat):
+    """Returns a list of rules from the AST datasets spreadsheet records"""
+    missing = [col for col in REQUIRED_COLS if col not in df_stat.columns]
+    if len(missing) > 0:
+        raise Exception('Columns missing from the AST datasets spreadsheets: {}'.format(missing))
+
+    rules = []
+    for index, row in zip(df_stat.index, df_stat.to_dict('records')):
+        fields = [clean_value(row[col]) for col in FIELD_COLS]
+        fields = [f for f in fields if f != '']
+
+        label = clean_value(row['map_label_field'])
+        if label != '' and label not in fields:
+            fields.append(label)
+
+        radius = row['Buffer_Distance']
+        radius = 0 if pd.isnull(radius) else int(radius)
+
+        rules.append(StatusRule(index=int(index),
+                                item=clean_value(row[ITEM_COL]),
+                                category=clean_value(row['Category']),
+                                table=clean_value(row['Datasource']),
+                                fields=tuple(fields),
+                                label=label,
+                                def_query=clean_value(row['Definition_Query']),
+                                radius=radius))
+
+    return rules
+
+
+
+def validate_rule (rule):
+    """Returns a list of issues found in a rule"""
+    issues = []
+    name = rule.item or 'row {}'.format(rule.index)
+
+    if rule.item == '':
+        issues.append('{}: no dataset name'.format(name))
+
+    if rule.table == '':
+        issues.append('{}: no datasource'.format(name))
+    elif rule.is_bcgw and len(rule.table.split('.')) != 2:
+        issues.append('{}: BCGW datasource is not OWNER.TABLE: {}'.format(name, rule.table))
+    elif not rule.is_bcgw and '.shp' not in rule.table and '.gdb' not in rule.table:
+        issues.append('{}: datasource is not a BCGW table, shp or featureclass: {}'.format(name, rule.table))
+
+    if rule.radius < 0:
+        issues.append('{}: negative buffer distance'.format(name))
+
+    for field in rule.fields:
+        if not re.match(r'^[A-Za-z_][A-Za-z0-9_#$]*$', field):
+            issues.append('{}: invalid column name: {}'.format(name, field))
+
+    return issues
+
+
+
+def validate_rules (rules):
+    """Returns a list of issues found in the rules"""
+    issues = []
+    items = set()
+    for rule in rules:
+        issues.extend(validate_rule (rule))
+
+        if rule.item != '' and rule.item in items:
+            issues.append('{}: duplicate dataset name'.format(rule.item))
+        items.add(rule.item)
+
+    return issues
+
+
+
+def split_invalid_rules (rules):
+    """Returns the valid rules and the issues of the invalid rules (index: issues).
+       Invalid rules are left out of the runs"""
+    valid = []
+    invalid = {}
+    for rule in rules:
+        issues = validate_rule (rule)
+        if len(issues) > 0:
+            invalid[rule.index] = issues
+        else:
+            valid.append(rule)
+
+    return valid, invalid
+
+
+
+def read_rules_spreadsheets (xls_files):
+    """Returns a df of the AST datasets spreadsheets"""
+    dfs = [pd.read_excel(xls) for xls in xls_files]
+
+    df_stat = pd.concat(dfs)
+    df_stat.dropna(how='all', inplace=True)
+    df_stat = df_stat.reset_index(drop=True)
+
+    return df_stat
+
+
+
+def load_rules (xls_files, cache_dir=DEFAULT_CACHE_DIR, force_refresh=False):
+    """Returns the rules of the AST datasets spreadsheets, in spreadsheet order.
+       The compiled rules are cached, keyed by the hash of the spreadsheets"""
+    files_hash = get_files_hash (xls_files)
+    cache_file = os.path.join(cache_dir, 'rules_{}.pkl'.format(files_hash))
+
+    if not force_refresh and os.path.isfile(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+    df_stat = read_rules_spreadsheets (xls_files)
+    rules = parse_rules (df_stat)
+
+    for issue in validate_rules (rules):
+        print ('....WARNING: {}'.format(issue))
+
+    # not an issue: these are sent to Oracle without binds
+    for rule in rules:
+        if compile_def_query (rule.def_query, fallback=True).raw:
+            print ('....NOTE: {}: definition query not compiled, passed as is: {}'.format(rule.item, rule.def_query))
+
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+
+    tmp_file = cache_file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        pickle.dump(rules, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+
+    return rules
+
+
+
+def get_rule (rules, item):
+    """Returns the rule of a dataset name"""
+    for rule in rules:
+        if rule.item == item:
+            return rule
+
+    raise KeyError('Dataset not found in the AST datasets spreadsheets: {}'.format(item))
+
+
+
+def rules_to_df (rules):
+    """Returns a df of the rules categories and dataset names, indexed like the rules"""
+    df_stat = pd.DataFrame({'Category': [rule.category for rule in rules],
+                            ITEM_COL: [rule.item for rule in rules]},
+                           index=[rule.index for rule in rules])
+
+    return df_stat
@@ -0,0 +1,14 @@
+"""
+Name:        Tests configuration
+Purpose:     Makes the STATUSING modules importable by the tests.
+
+Notes        Run from the STATUSING folder: python -m pytest tests
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,110 @@
+"""
+Name:        Tests - Arrow query reader
+Purpose:     Conversion of the query results to pandas, including dates out
+             of the pandas datetime64[ns] range (BCGW sentinel dates).
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+
+from arrow_query_reader import read_query, read_query_arrow, table_to_pandas
+
+
+class DbType:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeCursor:
+    """ Cursor returning fixed rows"""
+    def __init__(self, description, rows):
+        self.description = description
+        self._rows = list(rows)
+
+    def execute(self, query, bvars):
+        pass
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+
+def get_cursor (rows):
+    description = [('FILE_NBR', DbType('DB_TYPE_VARCHAR'), None, None, None, None, True),
+                   ('EXPIRY_DATE', DbType('DB_TYPE_DATE'), None, None, None, None, True)]
+    return FakeCursor (description, rows)
+
+
+def test_in_range_dates ():
+    rows = [('0001', datetime(2020, 1, 1)), ('0002', None)]
+    df = read_query (get_cursor (rows), 'SELECT 1 FROM DUAL', batch_size=1)
+
+    assert pd.api.types.is_datetime64_any_dtype(df['EXPIRY_DATE'])
+    assert df['EXPIRY_DATE'].iloc[0] == pd.Timestamp(2020, 1, 1)
+    assert pd.isnull(df['EXPIRY_DATE'].iloc[1])
+
+
+def test_out_of_range_dates ():
+    rows = [('0001', datetime(2020, 1, 1)), ('0002', datetime(9999, 12, 31)), ('0003', None)]
+    df = read_query (get_cursor (rows), 'SELECT 1 FROM DUAL', batch_size=2)
+
+    assert list(df.columns) == ['FILE_NBR', 'EXPIRY_DATE']
+    assert df['EXPIRY_DATE'].dtype == object
+    assert df['EXPIRY_DATE'].iloc[0] == datetime(2020, 1, 1)
+    assert df['EXPIRY_DATE'].iloc[1] == datetime(9999, 12, 31)
+    assert pd.isnull(df['EXPIRY_DATE'].iloc[2])
+
+
+def test_only_out_of_range_columns_are_objects ():
+    table = pa.table({'START_DATE': pa.array([datetime(2020, 1, 1)], pa.timestamp('us')),
+                      'END_DATE': pa.array([datetime(9999, 12, 31)], pa.timestamp('us'))})
+    df = table_to_pandas (table)
+
+    assert pd.api.types.is_datetime64_any_dtype(df['START_DATE'])
+    assert df['END_DATE'].dtype == object
+
+
+def get_number_cursor (rows, precision, scale):
+    description = [('OBJECTID', DbType('DB_TYPE_NUMBER'), None, None, precision, scale, True)]
+    return FakeCursor (description, rows)
+
+
+def test_number_38_is_int64 ():
+    df = read_query (get_number_cursor ([(911845,), (911846,)], 38, 0), 'SELECT 1 FROM DUAL')
+
+    assert df['OBJECTID'].dtype == 'int64'
+    assert df['OBJECTID'].astype(str).tolist() == ['911845', '911846']
+
+
+def test_unconstrained_number ():
+    table = read_query_arrow (get_number_cursor ([(911845,), (911846,)], 0, -127), 'SELECT 1 FROM DUAL')
+    assert table.schema.field('OBJECTID').type == pa.int64()
+    assert table.column('OBJECTID').to_pylist() == [911845, 911846]
+
+    table = read_query_arrow (get_number_cursor ([(1,), (2.5,)], 0, -127), 'SELECT 1 FROM DUAL')
+    assert table.schema.field('OBJECTID').type == pa.float64()
+
+
+def test_unconstrained_number_batches_are_unified ():
+    rows = [(1,), (2,), (2.5,)]
+    table = read_query_arrow (get_number_cursor (rows, 0, -127), 'SELECT 1 FROM DUAL', batch_size=2)
+
+    assert table.schema.field('OBJECTID').type == pa.float64()
+    assert table.column('OBJECTID').to_pylist() == [1.0, 2.0, 2.5]
+
+
+def test_number_above_2_53 ():
+    big = 2**53 + 1
+    huge = 10**30
+    table = read_query_arrow (get_number_cursor ([(big,)], 38, 0), 'SELECT 1 FROM DUAL')
+    assert table.schema.field('OBJECTID').type == pa.int64()
+    assert table.column('OBJECTID').to_pylist() == [big]
+
+    table = read_query_arrow (get_number_cursor ([(1,), (huge,)], 38, 0), 'SELECT 1 FROM DUAL', batch_size=1)
+    assert pa.types.is_decimal(table.schema.field('OBJECTID').type)
+    assert [int(v) for v in table.column('OBJECTID').to_pylist()] == [1, huge]
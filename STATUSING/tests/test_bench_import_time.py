@@ -0,0 +1,29 @@
+"""
+Name:        Tests - import time benchmark
+Purpose:     Parsing of the python -X importtime output.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+from bench_import_time import parse_importtime
+
+
+IMPORTTIME = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      1500 |       1500 |     pandas._libs
+import time:      2000 |       3500 |   pandas
+import time:       380 |        380 | statusing_rules
+some other stderr line
+"""
+
+
+def test_parse_importtime ():
+    total_ms, packages = parse_importtime (IMPORTTIME)
+
+    assert total_ms == 4.0
+    assert packages == {'_io', 'pandas', 'statusing_rules'}
+
+
+def test_parse_importtime_empty ():
+    assert parse_importtime ('') == (0, set())
@@ -0,0 +1,91 @@
+"""
+Name:        Tests - Definition query compiler
+Purpose:     Compilation of the definition queries: date literals, Oracle
+             functions and expressions, and the pass-through of the
+             definition queries the compiler does not support.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+from datetime import datetime
+
+import pytest
+
+from def_query_compiler import compile_def_query, DefQueryError
+
+
+def test_date_literal():
+    compiled = compile_def_query ("EXPIRY_DATE >= DATE '2020-01-01'")
+
+    assert compiled.sql == 'b.EXPIRY_DATE >= :dq0'
+    assert compiled.binds == (('dq0', datetime(2020, 1, 1)),)
+
+
+def test_date_literal_with_time():
+    compiled = compile_def_query ("EXPIRY_DATE >= DATE '2020-01-01 00:00:00'")
+
+    assert compiled.sql == 'b.EXPIRY_DATE >= :dq0'
+    assert compiled.binds == (('dq0', datetime(2020, 1, 1)),)
+
+
+def test_timestamp_literal():
+    compiled = compile_def_query ("UPDATED BETWEEN TIMESTAMP '2020-01-01 08:30:00' AND DATE '2020-12-31'")
+
+    assert compiled.binds == (('dq0', datetime(2020, 1, 1, 8, 30)),
+                              ('dq1', datetime(2020, 12, 31)))
+
+
+def test_invalid_date_literal():
+    with pytest.raises(DefQueryError):
+        compile_def_query ("EXPIRY_DATE >= DATE '01/01/2020'")
+
+
+def test_sysdate_arithmetic():
+    compiled = compile_def_query ("EXPIRY_DATE >= SYSDATE - 30")
+
+    assert compiled.sql == 'b.EXPIRY_DATE >= SYSDATE - :dq0'
+    assert compiled.binds == (('dq0', 30),)
+
+
+def test_to_date():
+    compiled = compile_def_query ("EXPIRY_DATE > TO_DATE('2020-01-01', 'YYYY-MM-DD')")
+
+    assert compiled.sql == 'b.EXPIRY_DATE > TO_DATE(:dq0, :dq1)'
+    assert compiled.binds == (('dq0', '2020-01-01'), ('dq1', 'YYYY-MM-DD'))
+
+
+def test_column_operands():
+    compiled = compile_def_query ("AREA_A <> AREA_B")
+
+    assert compiled.sql == 'b.AREA_A <> b.AREA_B'
+    assert compiled.binds == ()
+
+
+def test_numeric_literals():
+    compiled = compile_def_query ("AREA_HA > .5 AND AREA_M2 < 1e3 AND DEPTH >= -2")
+
+    assert [v for _, v in compiled.binds] == [0.5, 1000.0, -2]
+
+
+def test_substr_and_extract():
+    compiled = compile_def_query ("SUBSTR(CODE, 1, 2) = 'AB' AND EXTRACT(YEAR FROM START_DATE) >= 2020")
+
+    assert compiled.sql == '(SUBSTR(b.CODE, :dq0, :dq1) = :dq2 AND EXTRACT(YEAR FROM b.START_DATE) >= :dq3)'
+
+
+def test_parenthesized_expression():
+    compiled = compile_def_query ("(AREA_HA * 10000) > 5 OR (STATUS = 'A' AND NAME IS NOT NULL)")
+
+    assert compiled.sql == '((b.AREA_HA * :dq0) > :dq1 OR (b.STATUS = :dq2 AND b.NAME IS NOT NULL))'
+
+
+def test_unsupported_query_passed_through():
+    with pytest.raises(DefQueryError):
+        compile_def_query ("MY_FUNC(CODE) = 1")
+
+    compiled = compile_def_query ("MY_FUNC(CODE) = 1", fallback=True)
+
+    assert compiled.raw
+    assert compiled.sql == '(b.MY_FUNC(CODE) = 1)'
+    assert compiled.binds == ()
@@ -0,0 +1,66 @@
+"""
+Name:        Tests - invalid rules
+Purpose:     An AST_lite run with an invalid rule: the other datasets are
+             run and the invalid rule is listed in the spreadsheet.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import pandas as pd
+import pytest
+
+import AST_lite
+import status_report_writer
+from overlay_result_cache import OverlayResultCache
+from statusing_rules import StatusRule, split_invalid_rules
+
+
+class FakeMetadataCache:
+    hits = 0
+    misses = 0
+
+    def save(self):
+        pass
+
+
+@pytest.fixture
+def rules ():
+    return [StatusRule(index=0, item='roads', category='Roads', table='WHSE_BASEMAPPING.ROADS',
+                       fields=('NAME',), label='NAME', def_query='', radius=0),
+            StatusRule(index=1, item='parks', category='Parks', table='',
+                       fields=('PARK_NAME',), label='PARK_NAME', def_query='', radius=0)]
+
+
+def test_split_invalid_rules (rules):
+    valid, invalid = split_invalid_rules (rules)
+
+    assert [rule.item for rule in valid] == ['roads']
+    assert list(invalid) == [1]
+    assert invalid[1] == ['parks: no datasource']
+
+
+def test_run_with_invalid_rule (rules, tmp_path, monkeypatch):
+    overlays = []
+    def fake_run_overlay (connection, cursor, sql, md_cache, ds_cache, rs_cache, rule, *args):
+        overlays.append(rule.item)
+        df_all = pd.DataFrame({'NAME': ['HWY 19'], 'RESULT': ['INTERSECT']})
+        return df_all, ['NAME', 'RESULT'], 'NAME'
+
+    reports = []
+    monkeypatch.setattr(AST_lite, 'read_aoi', lambda *args: (None, {'aoi_hash': 'aoi'}, 'AOI'))
+    monkeypatch.setattr(AST_lite, 'run_overlay', fake_run_overlay)
+    monkeypatch.setattr(status_report_writer, 'write_report', lambda df_res, filename: reports.append(df_res))
+
+    job = {'workspace': str(tmp_path), 'region': 'west_coast', 'map_mode': 'none'}
+    results = AST_lite.run_status ({}, FakeMetadataCache(), None,
+                                   OverlayResultCache(cache_dir=str(tmp_path / 'cache')),
+                                   rules, job, connection=object(), cursor=object())
+
+    assert overlays == ['roads']
+    assert list(results) == ['roads']
+
+    df_res = reports[0].set_index('item')
+    assert df_res.loc['roads', 'List of conflicts'] == 'HWY 19'
+    assert df_res.loc['parks', 'List of conflicts'] == 'NOT RUN: invalid rule: parks: no datasource'
+    assert df_res.loc['parks', 'Map'] == ''
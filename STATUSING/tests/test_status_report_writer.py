@@ -0,0 +1,56 @@
+"""
+Name:        Tests - status report writer
+Purpose:     Map links of the TAB3 report for each map mode.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from status_report_writer import ITEM_COL, INDEX_MAP, build_conflicts_report
+
+
+WORKSPACE = os.path.join('C:', 'status', 'file_1234')
+MAPS_DIR = os.path.join(WORKSPACE, 'maps')
+
+
+@pytest.fixture
+def df_stat ():
+    return pd.DataFrame({'Category': ['Tenures', 'Parks', 'Roads'],
+                         ITEM_COL: ['tenures', 'parks', 'roads']})
+
+
+@pytest.fixture
+def conflicts ():
+    return {'tenures': '1234,LEASE', 'roads': 'HWY 19'}
+
+
+def get_links (df_res):
+    return dict(zip(df_res['item'], df_res['Map']))
+
+
+def test_links_maps (df_stat, conflicts):
+    links = get_links (build_conflicts_report (conflicts, df_stat, WORKSPACE, 'maps'))
+
+    assert links['tenures'] == '=HYPERLINK("{}", "View Map")'.format(os.path.join(MAPS_DIR, 'tenures.html'))
+    assert links['roads'] == '=HYPERLINK("{}", "View Map")'.format(os.path.join(MAPS_DIR, 'roads.html'))
+    assert links['parks'] == ''
+
+
+def test_links_index (df_stat, conflicts):
+    links = get_links (build_conflicts_report (conflicts, df_stat, WORKSPACE, 'index'))
+
+    index_link = '=HYPERLINK("{}", "View Map")'.format(os.path.join(MAPS_DIR, INDEX_MAP))
+    assert links['tenures'] == index_link
+    assert links['roads'] == index_link
+    assert links['parks'] == ''
+
+
+def test_links_none (df_stat, conflicts):
+    links = get_links (build_conflicts_report (conflicts, df_stat, WORKSPACE, 'none'))
+
+    assert set(links.values()) == {''}
@@ -0,0 +1,111 @@
+"""
+Name:        Web map optimizer
+Purpose:     Reduces the size of the geometries written to interactive HTML
+             maps (folium): scale-dependent simplification and coordinate
+             quantization.
+
+Notes        Geometries are:
+               - flattened to 2D
+               - simplified with a tolerance derived from the largest zoom level
+                 the map is meant to be viewed at (pixel_tolerance pixels at
+                 that zoom). Simplification preserves topology: polygons stay
+                 valid and rings do not collapse
+               - reprojected to WGS84
+               - rounded to a number of decimals (6 decimals ~ 0.1 m).
+                 Geometries that become invalid when rounded keep their
+                 full precision coordinates
+
+             The size of the GeoJSON before and after optimization can be
+             reported, to tune the precision and zoom of each output.
+
+Author:      Moez Labiadh
+Created:     2026-10-18
+"""
+
+import math
+
+import numpy as np
+import shapely
+import geopandas as gpd
+
+
+DEFAULT_PRECISION = 6
+DEFAULT_ZOOM = 17
+
+# ground resolution (m per pixel) of web mercator zoom level 0, at the equator
+ZOOM0_RESOLUTION = 156543.03
+
+
+
+def get_zoom_tolerance (zoom, latitude, pixel_tolerance=0.5):
+    """Returns the simplification tolerance (m) matching pixel_tolerance
+       pixels at a web map zoom level and latitude"""
+    resolution = ZOOM0_RESOLUTION * math.cos(math.radians(latitude)) / 2 ** zoom
+
+    return resolution * pixel_tolerance
+
+
+
+def round_coordinates (geoms, precision):
+    """Returns geometries with coordinates rounded to precision decimals.
+       Geometries that become invalid keep their original coordinates"""
+    rounded = shapely.transform(geoms, lambda coords: np.round(coords, precision))
+
+    broken = ~shapely.is_valid(rounded) & shapely.is_valid(geoms)
+    rounded[broken] = geoms[broken]
+
+    return rounded
+
+
+
+def get_geojson_size (gdf):
+    """Returns the size (bytes) of a gdf written as GeoJSON in WGS84"""
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(4326)
+
+    return len(gdf.to_json(default=str).encode('utf-8'))
+
+
+
+def set_geoms (gdf, geoms):
+    """Sets the geometries of gdf (same CRS)"""
+    gdf[gdf.geometry.name] = gpd.GeoSeries(geoms, index=gdf.index, crs=gdf.crs)
+
+    return gdf
+
+
+
+def optimize_for_web (gdf, precision=DEFAULT_PRECISION, zoom=DEFAULT_ZOOM,
+                      pixel_tolerance=0.5, report=False, name='layer'):
+    """Returns a copy of gdf in WGS84, simplified for display up to zoom level
+       'zoom' and with coordinates rounded to 'precision' decimals.
+       zoom=None disables simplification, precision=None disables rounding."""
+    if report:
+        size_before = get_geojson_size (gdf)
+
+    gdf = gdf.copy()
+    geoms = shapely.force_2d(np.asarray(gdf.geometry.values))
+
+    if zoom is not None and gdf.shape[0] > 0:
+        latitude = gdf.to_crs(4326).geometry.total_bounds[[1, 3]].mean()
+        tolerance = get_zoom_tolerance (zoom, latitude, pixel_tolerance)
+
+        # tolerance in degrees for geographic layers
+        if gdf.crs is not None and gdf.crs.is_geographic:
+            tolerance = tolerance / 111320
+
+        geoms = shapely.simplify(geoms, tolerance, preserve_topology=True)
+
+    gdf = set_geoms (gdf, geoms)
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(4326)
+
+    if precision is not None:
+        geoms = round_coordinates (np.asarray(gdf.geometry.values), precision)
+        gdf = set_geoms (gdf, geoms)
+
+    if report:
+        size_after = get_geojson_size (gdf)
+        print ('.......{}: {} KB -> {} KB'.format(name, round(size_before/1024), round(size_after/1024)))
+
+    return gdf
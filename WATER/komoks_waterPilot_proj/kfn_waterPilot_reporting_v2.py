@@ -24,24 +24,18 @@ import warnings
 warnings.simplefilter(action='ignore')
 
 import os
+import sys
 import json
-import cx_Oracle
 import pandas as pd
 import geopandas as gpd
 from shapely import wkb
-import folium
-from folium.plugins import HeatMap
-from folium.plugins import Search
-from folium.plugins import MiniMap
-from folium.plugins import GroupedLayerControl
-from branca.element import Template, MacroElement
 from datetime import datetime
 import timeit
-from openpyxl.workbook import Workbook
-from openpyxl.worksheet.table import Table, TableStyleInfo
-from openpyxl.utils.dataframe import dataframe_to_rows
 
-import mapstyle
+# cx_Oracle, folium and openpyxl are imported by the stages using them
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'STATUSING'))
+from web_map_optimizer import optimize_for_web
 
 
 class OracleConnector:
@@ -61,6 +55,7 @@ class OracleConnector:
     
     def connect_to_db(self):
         """ Connects to Oracle DB and create a cursor"""
+        import cx_Oracle
         try:
             self.connection = cx_Oracle.connect(self.cnxinfo['username'], 
                                                 self.cnxinfo['password'], 
@@ -386,8 +381,21 @@ def export_shp (gdf, out_dir, shp_name):
     gdf.to_file(shp_f, driver="ESRI Shapefile")
     
 
-def create_html_map(gdf_skfn, gdf_kfn_pip, gdf_wapp, gdf_hydr, gdf_obsw):
-    """Creates a HTML map"""
+def create_html_map(gdf_skfn, gdf_kfn_pip, gdf_wapp, gdf_hydr, gdf_obsw, precision=6, zoom=15):
+    """Creates a HTML map. Layer coordinates are rounded to precision decimals
+       and simplified for display up to the zoom level"""
+    import folium
+    from folium.plugins import HeatMap, Search, MiniMap, GroupedLayerControl
+    from branca.element import Template, MacroElement
+    import mapstyle
+    
+    print ('....optimizing layers for the web')
+    gdf_skfn = optimize_for_web(gdf_skfn, precision, zoom, report=True, name='KFN Southern Area')
+    gdf_kfn_pip = optimize_for_web(gdf_kfn_pip, precision, zoom, report=True, name='KFN Consultation Area')
+    gdf_wapp = optimize_for_web(gdf_wapp, precision, zoom, report=True, name='Water Applications')
+    gdf_hydr = optimize_for_web(gdf_hydr, precision, zoom, report=True, name='Hydrometric Gauges')
+    gdf_obsw = optimize_for_web(gdf_obsw, precision, zoom, report=True, name='GW Observation Wells')
+    
     # Create a map object
     m = folium.Map()
     
@@ -689,6 +697,10 @@ def create_html_map(gdf_skfn, gdf_kfn_pip, gdf_wapp, gdf_hydr, gdf_obsw):
     
 def make_xlsx(df_dict, xlsx_path):
     """Exports dataframes to an .xlsx file"""
+    from openpyxl.workbook import Workbook
+    from openpyxl.worksheet.table import Table, TableStyleInfo
+    from openpyxl.utils.dataframe import dataframe_to_rows
+    
     # Create a new workbook
     workbook = Workbook()
 
@@ -1,11 +1,16 @@
 import os
 import sys
-import re
 #import arcpy
 import cx_Oracle
 import pandas as pd
 from datetime import date
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'STATUSING'))
+from bcgw_metadata_cache import MetadataCache
+from statusing_rules import load_rules, get_rule, validate_rule
+from def_query_compiler import compile_def_query
+from proximity_sql import get_bands, get_band_case
+
 def connect_to_DB (username,password,hostname):
     """ Returns a connection to Oracle database"""
     try:
@@ -17,64 +22,56 @@ def connect_to_DB (username,password,hostname):
     return connection
 
 
-def get_table_cols (item,status_xls):
-    """Returns table and field names based on the Status tool common datasets spreadsheet"""
-    excel = pd.ExcelFile(status_xls)
-    df_stat = pd.read_excel(excel)
-    df_stat = df_stat.loc[df_stat['Featureclass_Name(valid characters only)'] == item]
-    df_stat.fillna(value='nan',inplace=True)
-
-    table = df_stat['Datasource'].iloc[0]
+def get_table_cols (rule):
+    """Returns table and field names based on the Status tool common datasets rule"""
+    table = rule.table
 
-    fields = []
-    fields.append('b.' + str(df_stat['Fields_to_Summarize'].iloc[0].strip()))
-
-    for f in range (2,7):
-        for i in df_stat['Fields_to_Summarize' + str(f)].tolist():
-            if i != 'nan':
-                fields.append('b.' + str(i.strip()))
+    fields = ['b.' + x for x in rule.fields]
+    if len(fields) == 0:
+        fields = ['b.OBJECTID']
 
     cols = ','.join(x for x in fields)
 
     return table, cols
 
-def get_def_query (item,status_xls):
-    """Returns a definition query based on the Status tool common datasets spreadsheet"""
-    excel = pd.ExcelFile(status_xls)
-    df_stat = pd.read_excel(excel)
-    df_stat = df_stat.loc[df_stat['Featureclass_Name(valid characters only)'] == item]
-    df_stat.fillna(value='nan',inplace=True)
-
-    def_query = df_stat['Definition_Query'].iloc[0].strip()
+def get_def_query (rule):
+    """Returns a definition query based on the Status tool common datasets rule
+       and its bind variables"""
+    compiled = compile_def_query (rule.def_query, fallback=True)
 
-    if def_query == 'nan':
+    if compiled.sql == '':
         def_query = " "
     else:
-       def_query = def_query.replace('"', '')
-       def_query = re.sub(r'(\bAND\b)', r'\1 b.', def_query)
-       def_query = re.sub(r'(\bOR\b)', r'\1 b.', def_query)
-       
-       if def_query[0] == "(":
-           def_query = "(b." + def_query[1:]  
-       else:
-           def_query = "b." + def_query
-    
-    
-    return def_query
-
-def get_geom_colname (table, connection):
+        def_query = 'AND ' + compiled.sql
+
+    return def_query, dict(compiled.binds)
+
+def get_valid_rules (rules, items):
+    """Returns the rules of the selected datasets. Datasets that are not in
+       the spreadsheet, or whose rule is invalid, are skipped with a warning"""
+    valid = []
+    for item in items:
+        try:
+            rule = get_rule (rules, item)
+        except KeyError as e:
+            arcpy.AddWarning ('....skipped: {}'.format(e))
+            continue
+
+        issues = validate_rule (rule)
+        if len(issues) > 0:
+            for issue in issues:
+                arcpy.AddWarning ('....skipped: {}'.format(issue))
+            continue
+
+        valid.append(rule)
+
+    return valid
+
+def get_geom_colname (table, connection, md_cache):
     """ Returns the geometry column name: can be either SHAPE or GEOMETRY"""
-    el_list = table.split('.')
-
-    geom_query = """
-                    SELECT column_name GEOM_NAME
-                    FROM  ALL_SDO_GEOM_METADATA
-                    WHERE owner = '{owner}'
-                    AND table_name = '{tab_name}'
-                       """. format (owner =el_list[0].strip(),
-                                    tab_name =el_list[1].strip())
-    df_col = df = pd.read_sql(geom_query, con=connection)
-    geom_col = df_col ['GEOM_NAME'].iloc[0]
+    cursor = connection.cursor()
+    geom_col = md_cache.get_geom_colname(cursor, table)
+    cursor.close()
 
     return geom_col
 
@@ -124,7 +121,7 @@ def main ():
     disp_list = sys.argv[3].replace(" ", "")
     radius = sys.argv[4]
     selected = sys.argv[5]
-    items = selected.split(';')
+    items = [item.replace("'", "") for item in selected.split(';')]
     workspace = sys.argv[6]
 
     arcpy.AddMessage ('Connecting to BCGW ...')
@@ -133,64 +130,61 @@ def main ():
     status_xls = r'\\GISWHSE.ENV.GOV.BC.CA\whse_np\corp\script_whse\python\Utility_Misc\Ready\statusing_tools\statusing_input_spreadsheets\one_status_common_datasets.xls'
 
 
+    md_cache = MetadataCache()
+    rules = load_rules ([status_xls])
+
+    valid_rules = get_valid_rules (rules, items)
+    if len(valid_rules) == 0:
+        raise Exception('None of the selected datasets has a valid rule. Please check the AST datasets spreadsheet')
+
+    bands = get_bands (radius)
+    band_case = get_band_case (bands)
+
     arcpy.AddMessage ('Executing Queries ...')
     df_list = []
     sheet_list = []
     counter = 1
-    for item in items:
-        item = item.replace("'", "")
-
-        arcpy.AddWarning('..{} of {}: {}'.format(counter, len(items),item))
-        table, cols = get_table_cols (item,status_xls)
-        geom_col = get_geom_colname (table, connection)
-        def_query = get_def_query (item,status_xls)
-
-        query_interact = """
-                       SELECT a.CROWN_LANDS_FILE, a.DISPOSITION_TRANSACTION_SID, a.INTRID_SID, {cols}
-                       FROM WHSE_TANTALIS.TA_CROWN_TENURES_SVW a,
-                            {table} b
-                       WHERE a.DISPOSITION_TRANSACTION_SID in ({disp_list})
-                         {def_query}
-                         AND SDO_ANYINTERACT (b.{geom_col}, a.SHAPE) = 'TRUE'
-
-                    """. format(cols = cols ,
-                                table = table,
-                                disp_list = disp_list,
-                                def_query = def_query,
-                                geom_col = geom_col)
-
-        query_buffer =  """
-                       SELECT a.CROWN_LANDS_FILE, a.DISPOSITION_TRANSACTION_SID, a.INTRID_SID, {cols}
-                       FROM WHSE_TANTALIS.TA_CROWN_TENURES_SVW a,
-                            {table} b
-                       WHERE a.DISPOSITION_TRANSACTION_SID in ({disp_list})
-                         {def_query}
-                         AND SDO_WITHIN_DISTANCE (b.{geom_col}, a.SHAPE,'distance = {radius}') = 'TRUE'
+    for rule in valid_rules:
+        item = rule.item
+
+        arcpy.AddWarning('..{} of {}: {}'.format(counter, len(valid_rules),item))
+        table, cols = get_table_cols (rule)
+        geom_col = get_geom_colname (table, connection, md_cache)
+        def_query, def_binds = get_def_query (rule)
+
+        # one index scan at the buffer distance, hits labelled by distance band.
+        # bands are computed on the exact distance, only the reported distance is rounded
+        query_proximity = """
+                       SELECT p.*, {band_case} AS "SPATIAL OVERLAY"
+                       FROM (
+                           SELECT a.CROWN_LANDS_FILE, a.DISPOSITION_TRANSACTION_SID, a.INTRID_SID, {cols},
+                                  SDO_GEOM.SDO_DISTANCE(b.{geom_col}, a.SHAPE, 0.5) PROXIMITY_METERS
+                           FROM WHSE_TANTALIS.TA_CROWN_TENURES_SVW a,
+                                {table} b
+                           WHERE a.DISPOSITION_TRANSACTION_SID in ({disp_list})
+                             {def_query}
+                             AND SDO_WITHIN_DISTANCE (b.{geom_col}, a.SHAPE,'distance = {radius}') = 'TRUE'
+                            ) p
 
                     """. format(cols = cols ,
                                 table = table,
                                 disp_list = disp_list,
                                 def_query = def_query,
                                 geom_col = geom_col,
-                                radius = radius)
+                                radius = bands[-1],
+                                band_case = band_case)
 
-        df_interact = pd.read_sql(query_interact, con=connection)
-        df_buffer = pd.read_sql(query_buffer, con=connection)
-
-        df_interact ['SPATIAL OVERLAY'] = 'INTERSECT'
-        df_buffer ['SPATIAL OVERLAY'] = 'WITHIN {} m'.format(str(radius))
-
-        df_all = pd.concat([df_interact, df_buffer])
-        df_all.sort_values(by='SPATIAL OVERLAY', ascending=True, inplace = True)
-        cols = list(df_all.columns)
-        cols.remove('SPATIAL OVERLAY')
+        df_all = pd.read_sql(query_proximity, con=connection, params=def_binds)
 
+        df_all.sort_values(by='PROXIMITY_METERS', ascending=True, inplace = True)
+        cols = [col for col in df_all.columns if col not in ('SPATIAL OVERLAY', 'PROXIMITY_METERS')]
         df_all.drop_duplicates(subset=cols, keep='first', inplace=True)
+        df_all['PROXIMITY_METERS'] = df_all['PROXIMITY_METERS'].round(2)
 
         df_all.sort_values(by= ['CROWN_LANDS_FILE','DISPOSITION_TRANSACTION_SID',
                                 'INTRID_SID','SPATIAL OVERLAY'], inplace = True)
         arcpy.AddMessage ('....found {} hits!'.format(df_all.shape[0]))
-        cols.insert(3,'SPATIAL OVERLAY')
+        cols[3:3] = ['SPATIAL OVERLAY', 'PROXIMITY_METERS']
 
         df_all = df_all[cols]
         df_all.rename(columns={'DISPOSITION_TRANSACTION_SID': 'DISPOSITION_ID',
@@ -207,6 +201,8 @@ def main ():
 
         counter +=1
 
+    md_cache.save()
+
     generate_report (workspace, df_list, sheet_list)
 
     arcpy.AddMessage  ('Processing Completed. Please check the output folder for results!')